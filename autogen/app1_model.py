@@ -1,18 +1,18 @@
 # Import necessary libraries
 import streamlit as st  # Streamlit for building the web app interface
-from openai import AzureOpenAI  # Azure OpenAI client for interacting with the OpenAI API
-from dotenv import load_dotenv  # To load environment variables from a .env file
-import os  # For accessing environment variables
+import time  # For measuring latency
+import runtime  # Shared per-process state: .env settings and timed lazy imports
 
-# Load environment variables from the .env file
-load_dotenv()
+# Environment variables from the .env file, read once per process (not on every rerun)
+config = runtime.settings()
 
 # Initialize the Azure OpenAI client with credentials and configuration
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),  # API key for authentication
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),  # API version to use
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),  # Azure endpoint URL
-    azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+# (the openai package is imported on first use, and only once per process)
+client = runtime.load("openai", "AzureOpenAI")(
+    api_key=config.api_key,  # API key for authentication
+    api_version=config.api_version,  # API version to use
+    azure_endpoint=config.endpoint,  # Azure endpoint URL
+    azure_deployment=config.deployment,
     # Deployment name for the model
 )
 
@@ -21,13 +21,63 @@ st.title("Azure OpenAI Model Demo")
 
 # Create a text input field for the user to enter their message
 user_input = st.text_input("Enter your message:")
+# Streaming shows tokens as they arrive instead of after the whole completion
+use_stream = st.toggle("Stream response", value=True)
+
+
+def stream_completion(messages, stats):
+    """Yield response text as it arrives and fill `stats` with latency metrics."""
+    start = time.perf_counter()
+    stream = client.chat.completions.create(
+        model=config.deployment,
+        stream=True,  # Server-sent events: the model response is sent as it is generated
+        stream_options={"include_usage": True},  # Final chunk carries the token usage
+        messages=messages,
+    )
+    chunks = 0
+    for chunk in stream:
+        if chunk.usage is not None:
+            stats["completion_tokens"] = chunk.usage.completion_tokens
+        # Azure sends chunks without choices (e.g. content filter results); skip them
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        if "ttft" not in stats:
+            stats["ttft"] = time.perf_counter() - start
+        chunks += 1
+        yield chunk.choices[0].delta.content
+    stats["total"] = time.perf_counter() - start
+    # Each content chunk is roughly one token if the usage chunk is missing
+    stats.setdefault("completion_tokens", chunks)
+
+
+def show_metrics(stats):
+    ttft = stats.get("ttft", stats["total"])
+    # Decode rate after the first token; fall back to the whole request when not streamed
+    generation_time = stats["total"] - ttft if stats["total"] > ttft else stats["total"]
+    tokens_per_sec = stats["completion_tokens"] / generation_time if generation_time > 0 else 0.0
+    cols = st.columns(3)
+    cols[0].metric("Time to first token", f"{ttft:.2f}s")
+    cols[1].metric("Tokens/sec", f"{tokens_per_sec:.1f}")
+    cols[2].metric("Total latency", f"{stats['total']:.2f}s")
+
 
 # Check if the user has entered any input
 if user_input:
-    # Call the Azure OpenAI model to generate a response
-    response = client.chat.completions.create(
-        model=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),  # Specify the model deployment name
-        stream=False,  #Disable streaming for simplicity | If set to true, the model response data will be streamed to the client as it is generated using server-sent events. 
-        messages=[{"role": "user", "content": user_input}]  # Pass the user input as a message
-    )
-    st.write("**Model Response:**", response.choices[0].message.content)
+    messages = [{"role": "user", "content": user_input}]  # Pass the user input as a message
+    if use_stream:
+        st.write("**Model Response:**")
+        stats = {}
+        st.write_stream(stream_completion(messages, stats))
+        show_metrics(stats)
+    else:
+        # Call the Azure OpenAI model to generate a response
+        start = time.perf_counter()
+        response = client.chat.completions.create(
+            model=config.deployment,  # Specify the model deployment name
+            stream=False,  #Disable streaming for simplicity | If set to true, the model response data will be streamed to the client as it is generated using server-sent events. 
+            messages=messages
+        )
+        total = time.perf_counter() - start
+        st.write("**Model Response:**", response.choices[0].message.content)
+        # Without streaming the first token arrives with the last one
+        show_metrics({"ttft": total, "total": total, "completion_tokens": response.usage.completion_tokens})
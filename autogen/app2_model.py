@@ -1,76 +1,142 @@
-#GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-#GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME")
+import streamlit as st
+import asyncio
+import os
+import time
+import runtime
+
+# autogen is imported lazily by runtime; start loading it while the page renders
+runtime.prewarm("autogen_core.models", "autogen_ext.models.openai", "autogen_ext.models.ollama")
+
+# .env is read once per process, not on every rerun
+azure = runtime.settings()
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME")
 
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL")
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
 
-# Instantiate Ollama client pointing to local server
-ollama_client = OllamaChatCompletionClient(
-    model=OLLAMA_MODEL,                        # e.g., "ollama-model"
-    host=OLLAMA_HOST,
-)
+# Every provider whose credentials are set
+PROVIDERS = [name for name, configured in [
+    ("Azure OpenAI", all([azure.api_key, azure.endpoint, azure.api_version, azure.model, azure.deployment])),
+    ("Gemini", GEMINI_API_KEY and GEMINI_MODEL_NAME),
+    ("Ollama", OLLAMA_MODEL),
+] if configured]
+
+
+def get_clients() -> dict:
+    """Clients of the configured providers, created once per process on first use."""
+    clients = {}
+    if "Azure OpenAI" in PROVIDERS:
+        # Azure OpenAI client for chat completions
+        clients["Azure OpenAI"] = runtime.get_client(
+            runtime.load("autogen_ext.models.openai", "AzureOpenAIChatCompletionClient"),
+            model=azure.model,                         # e.g., "gpt-4o-mini"
+            api_key=azure.api_key,
+            api_version=azure.api_version,
+            azure_endpoint=azure.endpoint,
+            azure_deployment=azure.deployment,
+            max_tokens=1000,
+            temperature=0.7,
+        )
+    if "Gemini" in PROVIDERS:
+        # Gemini client for chat completions
+        clients["Gemini"] = runtime.get_client(
+            runtime.load("autogen_ext.models.openai", "OpenAIChatCompletionClient"),
+            model=GEMINI_MODEL_NAME,                  # e.g., "gemini-pro"
+            api_key=GEMINI_API_KEY,
+        )
+    if "Ollama" in PROVIDERS:
+        # Ollama client pointing to local server
+        clients["Ollama"] = runtime.get_client(
+            runtime.load("autogen_ext.models.ollama", "OllamaChatCompletionClient"),
+            model=OLLAMA_MODEL,                        # e.g., "ollama-model"
+            host=OLLAMA_HOST,
+        )
+    return clients
+
+
+async def ask_provider(name, client, user_input):
+    """Query one provider and return (name, content, latency, error)."""
+    from autogen_core.models import UserMessage
+
+    start = time.perf_counter()
+    try:
+        response = await client.create(
+            messages=[UserMessage(content=user_input, source="user")]
+        )
+        return name, response.content, time.perf_counter() - start, None
+    except Exception as e:
+        return name, None, time.perf_counter() - start, e
+
+
+async def fan_out(user_input):
+    """Send the prompt to every provider at once and yield answers as they arrive."""
+    tasks = [asyncio.create_task(ask_provider(name, client, user_input))
+             for name, client in get_clients().items()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def hedged(user_input):
+    """Return the first successful answer and cancel the slower providers."""
+    pending = {asyncio.create_task(ask_provider(name, client, user_input))
+               for name, client in get_clients().items()}
+    failures = []
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result[3] is None:
+                    return result, failures
+                failures.append(result)
+        return None, failures
+    finally:
+        for task in pending:
+            task.cancel()
 
-# # Validate that required credentials are set
-# if not all([AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_VERSION,
-#             AZURE_OPENAI_MODEL, AZURE_OPENAI_DEPLOYMENT_NAME,
-#             GEMINI_API_KEY, GEMINI_MODEL_NAME, OLLAMA_MODEL]):
-#     st.error("One or more environment variables are missing. Please check your .env file.")
-#     st.stop()
-
-# Instantiate Azure OpenAI client for chat completions
-# azure_client = AzureOpenAIChatCompletionClient(
-#     model=AZURE_OPENAI_MODEL,                  # e.g., "gpt-4o-mini"
-#     api_key=AZURE_OPENAI_API_KEY,
-#     api_version=AZURE_OPENAI_API_VERSION,
-#     azure_endpoint=AZURE_OPENAI_ENDPOINT,
-#     azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME,
-#     max_tokens=1000,
-#     temperature=0.7,
-# )
-
-# Instantiate Gemini client for chat completions
-# gemini_client = OpenAIChatCompletionClient(
-#     model=GEMINI_MODEL_NAME,                  # e.g., "gemini-pro"
-#     api_key=GEMINI_API_KEY,
-# )
-
-# Instantiate Ollama client pointing to local server
-ollama_client = OllamaChatCompletionClient(
-    model=OLLAMA_MODEL,                        # e.g., "ollama-model"
-    host=OLLAMA_HOST,
-)
 
 # Streamlit UI setup
 st.title("Multi-Model Chat Demo: Azure OpenAI | Gemini | Ollama")
 
+if not PROVIDERS:
+    st.error("No model provider is configured. Please check your .env file.")
+    st.stop()
+
+mode = st.radio(
+    "Mode:",
+    ["Compare all (fan-out)", "Fastest wins (hedged)"],
+    help="Fan-out waits for the slowest provider; hedged returns the first successful answer.",
+)
+
 # Text input for user's message
 user_input = st.text_input("Enter your message:")
 
 if user_input:
     # Echo user message
     st.write("**User:**", user_input)
+    start = time.perf_counter()
 
-    # 1️⃣ Azure OpenAI response
-    # Run the async call in the event loop
-    # azure_response = asyncio.run(
-    #     azure_client.create(
-    #         messages=[UserMessage(content=user_input, source="user")]
-    #     )
-    # )
-    # st.write("**Azure OpenAI Response:**", azure_response.content)
-
-    # 2️⃣ Gemini response
-    # gemini_response = asyncio.run(
-    #     gemini_client.create(
-    #         messages=[UserMessage(content=user_input, source="user")]
-    #     )
-    # )
-    # st.write("**Gemini Response:**", gemini_response.content)
-
-    # 3️⃣ Ollama response
-    ollama_response = asyncio.run(
-        ollama_client.create(
-            messages=[UserMessage(content=user_input, source="user")]
-        )
-    )
-    st.write("**Ollama Response:**", ollama_response.content)
+    if mode.startswith("Compare"):
+        # All providers run concurrently; each answer is shown as soon as it arrives
+        for name, content, latency, error in runtime.iterate(fan_out(user_input)):
+            if error is not None:
+                st.error(f"**{name}** failed after {latency:.2f}s: {error}")
+            else:
+                st.write(f"**{name} Response** ({latency:.2f}s):", content)
+    else:
+        winner, failures = runtime.run(hedged(user_input))
+        for name, _, latency, error in failures:
+            st.warning(f"**{name}** failed after {latency:.2f}s: {error}")
+        if winner is None:
+            st.error("All providers failed.")
+        else:
+            name, content, latency, _ = winner
+            st.write(f"**{name} Response** ({latency:.2f}s, fastest):", content)
+
+    st.caption(f"Total wall time: {time.perf_counter() - start:.2f}s")
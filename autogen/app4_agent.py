@@ -1,63 +1,83 @@
 import streamlit as st
-import asyncio
 import json
-from dotenv import load_dotenv
 import os
-from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
-from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.messages import TextMessage
-from autogen_core import CancellationToken
+from book_catalog import get_catalog, page
+from book_store import get_store
+import runtime
+import tracing
+from tracing import traced_tool
 
-# Load environment variables
-load_dotenv()
+# autogen is imported lazily by runtime; start loading it while the page renders
+runtime.prewarm("autogen_agentchat.agents", "autogen_ext.models.openai")
 
-# Azure OpenAI settings
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-AZURE_OPENAI_MODEL = os.getenv("AZURE_OPENAI_MODEL")
-AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+# .env is read once per process, not on every rerun
+runtime.settings()
+BOOKS_PATH = os.getenv("BOOKS_PATH", "data/books.json")
+# Optional SQLite/FTS5 backend for large catalogs (build it with book_store.py)
+BOOKS_DB_PATH = os.getenv("BOOKS_DB_PATH")
+
+# Book catalog: parsed once per process, indexed by author and category,
+# and reloaded only when the JSON file changes on disk
+catalog = None if BOOKS_DB_PATH else get_catalog(BOOKS_PATH)
+store = get_store(BOOKS_DB_PATH) if BOOKS_DB_PATH else None
 
 # Define tool functions
-def load_books():
-    with open("data/books.json", "r", encoding="utf-8") as f:
-        return json.load(f)
-
-async def search_book_by_author(author: str) -> str:
-    books = load_books()
-    filtered = [b for b in books if b.get("author") == author]
-    return json.dumps(filtered or {"message": "No books found."}, ensure_ascii=False, indent=2)
-
-async def search_book_by_category(category: str) -> str:
-    books = load_books()
-    filtered = [b for b in books if b.get("category") == category]
-    return json.dumps(filtered or {"message": "No books found."}, ensure_ascii=False, indent=2)
-
-# Azure OpenAI client
-model_client = AzureOpenAIChatCompletionClient(
-    model=AZURE_OPENAI_MODEL,
-    api_key=AZURE_OPENAI_API_KEY,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME,
-    api_version=AZURE_OPENAI_API_VERSION
-)
-
-# Initialize agent with tools
-agent = AssistantAgent(
-    name="assistant",
-    model_client=model_client,
-    tools=[search_book_by_author, search_book_by_category],
-    system_message="You can search books by author or category."
-)
-
-# Helper to run async calls
-def run_agent(query: str) -> str:
-    async def _run():
+def format_page(page: dict) -> str:
+    if not page["books"]:
+        return json.dumps({"message": "No books found."}, ensure_ascii=False, indent=2)
+    return json.dumps(page, ensure_ascii=False, indent=2)
+
+@traced_tool
+async def search_book_by_author(author: str, cursor: str = "") -> str:
+    """Search books by author. Pass next_cursor from a previous result to get the next page."""
+    if store:
+        return format_page(store.by_author(author, cursor))
+    return format_page(page(catalog.by_author(author), cursor))
+
+@traced_tool
+async def search_book_by_category(category: str, cursor: str = "") -> str:
+    """Search books by category. Pass next_cursor from a previous result to get the next page."""
+    if store:
+        return format_page(store.by_category(category, cursor))
+    return format_page(page(catalog.by_category(category), cursor))
+
+@traced_tool
+async def search_books(query: str, cursor: str = "") -> str:
+    """Full-text search over title, author and category. Pass next_cursor to get the next page."""
+    return format_page(store.search(query, cursor))
+
+book_tools = [search_book_by_author, search_book_by_category]
+if store:
+    book_tools.append(search_books)
+
+# Agents are built once per process (per tool set) and reset between requests
+# Explicit "tool_name:args" prompts run the tool directly; free-form queries use the model
+def build_agent():
+    from tool_dispatch import DirectToolAgent
+
+    return DirectToolAgent(
+        name="assistant",
+        model_client=runtime.azure_client(),
+        tools=book_tools,
+        system_message="You can search books by author or category."
+    )
+
+agents = runtime.pool("app4.assistant", build_agent, tools=[tool.__name__ for tool in book_tools])
+
+# Core agent call
+async def ask_agent(query: str) -> str:
+    from autogen_agentchat.messages import TextMessage
+    from autogen_core import CancellationToken
+
+    async with agents.lease() as agent:
         resp = await agent.on_messages([
             TextMessage(content=query, source="User")
         ], CancellationToken())
-        return resp.chat_message.to_text()
-    return asyncio.run(_run())
+    return resp.chat_message.to_text()
+
+# Helper to run async calls on the shared background event loop
+def run_agent(query: str) -> str:
+    return runtime.run(ask_agent(query))
 
 # Streamlit UI
 st.title("Book Search Assistant")
@@ -74,8 +94,14 @@ if st.button("Search Books"):
             prompt = f"search_book_by_author:{user_input}"  # function syntax recognized by agent
         else:
             prompt = f"search_book_by_category:{user_input}"
-        result = run_agent(prompt)
-        st.text(result)
+        with tracing.span("request", app="app4_agent", mode=mode):
+            result = run_agent(prompt)
+            with tracing.span("ui.render"):
+                st.text(result)
+
+# Optional per-request waterfall (model calls, tools, cache hits)
+tracing.render_sidebar(st)
+st.sidebar.caption(runtime.startup_summary())
 
 # Ensure script only runs in Streamlit context
 if __name__ == "__main__":
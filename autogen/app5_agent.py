@@ -1,107 +1,182 @@
 import streamlit as st
-import asyncio
 import json
-from dotenv import load_dotenv
 import os
-import aiohttp
-from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
-from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.messages import TextMessage
-from autogen_core import CancellationToken
-
-# Load environment variables
-load_dotenv()
-
-# Azure OpenAI settings
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
-AZURE_OPENAI_MODEL = os.getenv("AZURE_OPENAI_MODEL")
-AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+import re
+from weather_client import error_message, get_weather_client
+import runtime
+import tracing
+from tracing import traced_tool
+
+# autogen is imported lazily by runtime; start loading it while the page renders
+runtime.prewarm("autogen_agentchat.agents", "autogen_ext.models.openai")
 
-# Configure Azure OpenAI client
-model_client = AzureOpenAIChatCompletionClient(
-    model=AZURE_OPENAI_MODEL,
-    api_key=AZURE_OPENAI_API_KEY,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT,
-    api_version=AZURE_OPENAI_API_VERSION
-)
+# .env is read once per process, not on every rerun
+runtime.settings()
+OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+# Parallel OpenWeatherMap requests per bulk lookup
+WEATHER_CONCURRENCY = int(os.getenv("WEATHER_CONCURRENCY", "8"))
 
 # Async weather function
+@traced_tool
 async def get_current_weather(city: str) -> str:
     """Fetch weather data from OpenWeatherMap API"""
     if not OPENWEATHER_API_KEY:
         return json.dumps({"error": "Missing API credentials"})
     
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
-            async with session.get(url, timeout=10) as response:
-                response.raise_for_status()
-                data = await response.json()
-                return json.dumps({
-                    "city": data["name"],
-                    "temp": data["main"]["temp"],
-                    "humidity": data["main"]["humidity"],
-                    "conditions": data["weather"][0]["description"],
-                    "wind": data["wind"]["speed"]
-                }, ensure_ascii=False)
+        # Cached per city (WEATHER_CACHE_TTL seconds) and fetched over one pooled session
+        weather = get_weather_client(OPENWEATHER_API_KEY)
+        runtime.on_shutdown(weather.close)
+        data = await weather.get(city)
+        return json.dumps(data, ensure_ascii=False)
     except Exception as e:
-        return json.dumps({"error": str(e)})
-
-# Initialize agent with weather tool
-weather_agent = AssistantAgent(
-    name="WeatherExpert",
-    model_client=model_client,
-    tools=[get_current_weather],
-    system_message="""You are a weather specialist. Use get_current_weather for data.
-    Format responses as: City | Conditions | Temperature(°C) | Humidity(%) | Wind(m/s)
-    Add relevant weather insights.""",
-)
-
-# Async execution helper
-def run_agent_query(query: str) -> str:
-    async def _run():
+        return json.dumps({"error": error_message(e)})
+
+def split_cities(text: str) -> list:
+    """City names (or OpenWeatherMap city IDs), one per line or separated by ';'."""
+    return [c.strip() for c in re.split(r"[\n;]+", text) if c.strip()]
+
+# Bulk lookup: all cities fetched concurrently over the same pooled session;
+# cities with a known OpenWeatherMap ID are fetched 20 per request
+@traced_tool
+async def get_weather_many(cities: str) -> str:
+    """Fetch weather for several cities at once (separated by ';' or new lines)"""
+    if not OPENWEATHER_API_KEY:
+        return json.dumps({"error": "Missing API credentials"})
+
+    weather = get_weather_client(OPENWEATHER_API_KEY)
+    runtime.on_shutdown(weather.close)
+    rows = await weather.get_many(split_cities(cities), concurrency=WEATHER_CONCURRENCY)
+    return json.dumps(rows, ensure_ascii=False)
+
+# One model call for the whole table instead of one per city
+async def summarize_weather(rows: list) -> str:
+    from autogen_core.models import SystemMessage, UserMessage
+
+    table = "\n".join(
+        f"{r['city']} | {r['conditions']} | {r['temp']}°C | {r['humidity']}% | {r['wind']} m/s" for r in rows
+    )
+    result = await runtime.azure_client().create([
+        SystemMessage(content="You are a weather specialist. Summarize the current weather across these cities "
+                              "in a few sentences: notable extremes, groupings and relevant insights."),
+        UserMessage(content=f"City | Conditions | Temperature | Humidity | Wind\n{table}", source="User"),
+    ])
+    return result.content
+
+# Initialize agent with weather tool (built once per process, reset between requests)
+# "get_current_weather:<city>" (or "get_weather_many:<city>; <city>") runs the tool
+# directly and returns its JSON unchanged
+def build_weather_agent():
+    from tool_dispatch import DirectToolAgent
+
+    return DirectToolAgent(
+        name="WeatherExpert",
+        model_client=runtime.azure_client(),
+        tools=[get_current_weather, get_weather_many],
+        system_message="""You are a weather specialist. Use get_current_weather for data,
+        or get_weather_many once for several cities.
+        Format responses as: City | Conditions | Temperature(°C) | Humidity(%) | Wind(m/s)
+        Add relevant weather insights.""",
+    )
+
+weather_agents = runtime.pool("app5.weather", build_weather_agent)
+
+# Async execution helper (runs on the shared background event loop)
+async def query_agent(query: str) -> str:
+    from autogen_agentchat.messages import TextMessage
+    from autogen_core import CancellationToken
+
+    async with weather_agents.lease() as weather_agent:
         response = await weather_agent.on_messages([
             TextMessage(content=query, source="User")
         ], CancellationToken())
-        return response.chat_message.to_text()
-    return asyncio.run(_run())
+    return response.chat_message.to_text()
+
+def run_agent_query(query: str) -> str:
+    return runtime.run(query_agent(query))
 
 # Streamlit interface
 st.title("AI Weather Assistant")
 st.markdown("### Get real-time weather updates")
 
-city_input = st.text_input("Enter city name:", placeholder="e.g., London, Tokyo")
-search_btn = st.button("Get Weather Report")
-
-if search_btn:
-    if not city_input.strip():
-        st.error("Please enter a valid city name")
-    else:
-        with st.spinner("Analyzing weather patterns..."):
-            try:
-                # Format query for agent tool recognition
-                result = run_agent_query(f"get_current_weather:{city_input}")
-                weather_data = json.loads(result)
+mode = st.radio("Mode:", ["Single city", "Many cities"], horizontal=True)
+
+if mode == "Single city":
+    city_input = st.text_input("Enter city name:", placeholder="e.g., London, Tokyo")
+    search_btn = st.button("Get Weather Report")
+
+    if search_btn:
+        if not city_input.strip():
+            st.error("Please enter a valid city name")
+        else:
+            with st.spinner("Analyzing weather patterns..."), tracing.span("request", app="app5_agent"):
+                try:
+                    # Format query for agent tool recognition
+                    result = run_agent_query(f"get_current_weather:{city_input}")
+                    weather_data = json.loads(result)
                 
-                if "error" in weather_data:
-                    st.error(f"Error: {weather_data['error']}")
-                else:
-                    st.subheader(f"Weather in {weather_data['city']}")
-                    cols = st.columns(4)
-                    metrics = [
-                        ("🌤️ Conditions", weather_data["conditions"]),
-                        ("🌡️ Temperature", f"{weather_data['temp']}°C"),
-                        ("💧 Humidity", f"{weather_data['humidity']}%"),
-                        ("🍃 Wind Speed", f"{weather_data['wind']} m/s")
-                    ]
+                    if "error" in weather_data:
+                        st.error(f"Error: {weather_data['error']}")
+                    else:
+                        st.subheader(f"Weather in {weather_data['city']}")
+                        cols = st.columns(4)
+                        metrics = [
+                            ("🌤️ Conditions", weather_data["conditions"]),
+                            ("🌡️ Temperature", f"{weather_data['temp']}°C"),
+                            ("💧 Humidity", f"{weather_data['humidity']}%"),
+                            ("🍃 Wind Speed", f"{weather_data['wind']} m/s")
+                        ]
                     
-                    for col, (label, value) in zip(cols, metrics):
-                        col.metric(label, value)
+                        for col, (label, value) in zip(cols, metrics):
+                            col.metric(label, value)
                         
-            except json.JSONDecodeError:
-                st.error("Invalid response format")
-            except Exception as e:
-                st.error(f"Service error: {str(e)}")
+                except json.JSONDecodeError:
+                    st.error("Invalid response format")
+                except Exception as e:
+                    st.error(f"Service error: {str(e)}")
+else:
+    cities_input = st.text_area("Cities, one per line or separated by ';' (names or OpenWeatherMap city IDs):",
+                                placeholder="London\nTokyo\n2643743")
+
+    if st.button("Get Weather Table"):
+        cities = split_cities(cities_input)
+        if not cities:
+            st.error("Please enter at least one city name")
+        else:
+            with st.spinner(f"Fetching weather for {len(cities)} cities..."), \
+                    tracing.span("request", app="app5_agent", mode="bulk", cities=len(cities)):
+                try:
+                    # One direct tool call fetches every city; no model call per city
+                    rows = json.loads(run_agent_query(f"get_weather_many:{'; '.join(cities)}"))
+                    if isinstance(rows, dict):
+                        st.error(f"Error: {rows['error']}")
+                    else:
+                        found = [r for r in rows if "error" not in r]
+                        failed = [r for r in rows if "error" in r]
+                        st.subheader(f"Weather in {len(found)} cities")
+                        st.dataframe([
+                            {
+                                "City": r["city"],
+                                "Conditions": r["conditions"],
+                                "Temperature (°C)": r["temp"],
+                                "Humidity (%)": r["humidity"],
+                                "Wind (m/s)": r["wind"],
+                            }
+                            for r in found
+                        ], hide_index=True)
+                        if failed:
+                            st.warning("No data for: " + ", ".join(f"{r['city']} ({r['error']})" for r in failed))
+
+                        # A single model call summarizes the whole table
+                        if found:
+                            with st.spinner("Summarizing..."):
+                                st.markdown(runtime.run(summarize_weather(found)))
+
+                except json.JSONDecodeError:
+                    st.error("Invalid response format")
+                except Exception as e:
+                    st.error(f"Service error: {str(e)}")
+
+# Optional per-request waterfall (model calls, tools, cache hits)
+tracing.render_sidebar(st)
+st.sidebar.caption(runtime.startup_summary())
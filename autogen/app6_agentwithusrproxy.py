@@ -1,30 +1,30 @@
 from autogen_agentchat.agents import AssistantAgent, UserProxyAgent
-from autogen_agentchat.conditions import TextMentionTermination
 from autogen_agentchat.teams import RoundRobinGroupChat
 from autogen_agentchat.messages import  TextMessage
 from autogen_core import CancellationToken
 from autogen_agentchat.ui import Console
 from autogen_agentchat.base import TaskResult
 from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
-from dotenv import load_dotenv
-import os
 import asyncio
+import runtime
+from termination import TeamUsageLimits, usage_summary
+from draft_context import DraftCompactingContext
 
-load_dotenv(override=True)
+# Same .env handling as the Streamlit apps: exported variables win over .env
+config = runtime.settings()
 
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-AZURE_OPENAI_MODEL = os.getenv("AZURE_OPENAI_MODEL")
-AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+# Hard caps so a long approve/regenerate session cannot run up unbounded cost
+TEAM_LIMITS = TeamUsageLimits(turn_limit=21, total_tokens_limit=60000, time_limit=1800)
+# Prompt budget per regeneration: task + summary of rejected drafts + latest draft and feedback
+CONTEXT_TOKEN_LIMIT = 4000
 
 async def main(task:str, cancellation_token:CancellationToken):
     model_client = AzureOpenAIChatCompletionClient(
-        model=AZURE_OPENAI_MODEL,
-        api_key=AZURE_OPENAI_API_KEY,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        azure_deployment= AZURE_OPENAI_DEPLOYMENT_NAME,
-        api_version=AZURE_OPENAI_API_VERSION,
+        model=config.model,
+        api_key=config.api_key,
+        azure_endpoint=config.endpoint,
+        azure_deployment=config.deployment,
+        api_version=config.api_version,
         max_tokens=2000,
         temperature=0.7
     )
@@ -34,7 +34,13 @@ async def main(task:str, cancellation_token:CancellationToken):
         return input(prompt)
     
     # Create the agents.
-    assistant = AssistantAgent("assistant", model_client=model_client)
+    # Only the task, a short summary of rejected drafts, and the latest draft with its
+    # feedback are sent back to the model, so each regeneration costs about the same.
+    assistant = AssistantAgent(
+        "assistant",
+        model_client=model_client,
+        model_context=DraftCompactingContext(model_client, token_limit=CONTEXT_TOKEN_LIMIT),
+    )
     user_proxy = UserProxyAgent("user_proxy", input_func=user_input_func)  
     # Use input() to get user input from console.
     # The user_proxy agent will take the user input and send it to the assistant agent.
@@ -42,8 +48,9 @@ async def main(task:str, cancellation_token:CancellationToken):
     # The user_proxy agent will then send the response back to the user.
     # The user_proxy agent will also handle the termination condition.
     
-    # Create the termination condition which will end the conversation when the user says "APPROVE".
-    termination = TextMentionTermination("APPROVE")
+    # Create the termination condition which will end the conversation when the user says "APPROVE",
+    # or when the turn, token or time caps in TEAM_LIMITS are reached.
+    termination = TEAM_LIMITS.termination("APPROVE")
 
     # Create the team.
     # The team will consist of the assistant and user_proxy agents.
@@ -54,9 +61,19 @@ async def main(task:str, cancellation_token:CancellationToken):
     # The task is to write a short story about a monkey and farmer.
     # The cancellation token will be used to cancel the conversation.
     stream = team.run_stream(task=task, cancellation_token=cancellation_token)
-    await Console(stream)
+    # output_stats prints the prompt/completion tokens of every turn as it happens
+    result = await Console(stream, output_stats=True)
     await model_client.close()
 
+    # Report what the run used, also when a cap cut it short
+    usage = usage_summary(result.messages, result.stop_reason, "APPROVE")
+    if usage["stopped_early"]:
+        print(f"Stopped early: {usage['stop_reason']}")
+    print(f"Usage: {usage['model_calls']} model calls, {usage['prompt_tokens']} prompt + "
+          f"{usage['completion_tokens']} completion tokens")
+    turn_prompts = [m.models_usage.prompt_tokens for m in result.messages if m.models_usage]
+    print(f"Prompt tokens per turn: {turn_prompts}")
+
 
 cancellation_token = CancellationToken()
 asyncio.run(main("Write a short story about a monkey and farmer", cancellation_token))
@@ -1,45 +1,40 @@
 import streamlit as st
 import asyncio
-import os
-from dotenv import load_dotenv
-from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
-from autogen_agentchat.conditions import TextMentionTermination
-
-# Load environment variables
-load_dotenv(override=True)
-
-# Azure OpenAI Config
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-AZURE_OPENAI_MODEL = os.getenv("AZURE_OPENAI_MODEL")
-AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+import time
+import runtime
+import tracing
+from termination import TeamUsageLimits, usage_summary
+
+# autogen is imported lazily by runtime; start loading it while the page renders
+runtime.prewarm("autogen_agentchat.agents", "autogen_agentchat.teams", "autogen_ext.models.openai")
+
+# Hard caps so the team stops even if the manager never says the sentinel.
+# The time limit sits below RUN_TIMEOUT so the partial transcript is kept.
+TEAM_LIMITS = TeamUsageLimits(turn_limit=9, total_tokens_limit=8000, time_limit=45)
+SENTINEL = "ALL_TRANSLATIONS_COMPLETED"
+# Stop reason of a concurrent run in which every specialist replied
+COMPLETED = "All specialists completed"
 
 # Safe async runner
 # This is a workaround for Streamlit's async limitations
 # Streamlit's run_async is not available in all versions
 # and can cause issues with asyncio event loops.
-# This function creates a new event loop and runs the coroutine until completion.
-def run_async(coro, timeout=50):
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(asyncio.wait_for(coro, timeout=timeout))
-    finally:
-        loop.close()
-
-# Core translation logic
-async def translate_with_manager(task: str) -> list:
-    client = AzureOpenAIChatCompletionClient(
-        model=AZURE_OPENAI_MODEL,
-        api_key=AZURE_OPENAI_API_KEY,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME,
-        api_version=AZURE_OPENAI_API_VERSION,
-    )
+# The coroutine runs on the shared long-lived loop in runtime.py, so the
+# model client's connection pool stays alive between clicks.
+RUN_TIMEOUT = 50
+
+def run_async(coro, timeout=RUN_TIMEOUT):
+    return runtime.run(coro, timeout=timeout)
+
+# Shared Azure OpenAI client, created once per process and closed at shutdown
+# (.env is read once per process, on first use)
+def get_model_client():
+    return runtime.azure_client()
+
+# Agents: one specialist per language, plus the manager in round robin mode
+def build_specialists(client):
+    from autogen_agentchat.agents import AssistantAgent
 
-    # Specialized agents
     spanish_agent = AssistantAgent(
         name="Spanish_Agent",
         model_client=client,
@@ -55,9 +50,12 @@ async def translate_with_manager(task: str) -> list:
         model_client=client,
         system_message="Translate any given English sentence into Italian."
     )
+    return [spanish_agent, french_agent, italian_agent]
+
+def build_manager(client):
+    from autogen_agentchat.agents import AssistantAgent
 
-    # Manager agent
-    manager = AssistantAgent(
+    return AssistantAgent(
         name="Manager",
         model_client=client,
         system_message=(
@@ -67,34 +65,146 @@ async def translate_with_manager(task: str) -> list:
         )
     )
 
+# Teams and agents are built once per process and reset between requests
+def build_round_robin_team():
+    from autogen_agentchat.teams import RoundRobinGroupChat
+
+    client = get_model_client()
+    manager, specialists = build_manager(client), build_specialists(client)
+
     # GroupChat: Manager + Specialists
-    termination = TextMentionTermination("ALL_TRANSLATIONS_COMPLETED")
+    termination = TEAM_LIMITS.termination(SENTINEL)
 
-    team = RoundRobinGroupChat(
-        [manager, spanish_agent, french_agent, italian_agent],
+    return RoundRobinGroupChat(
+        [manager, *specialists],
         termination_condition=termination
     )
 
-    
-    result = await team.run(task=task)
-    #await client.close()
-    return result.messages
+def build_concurrent_agents():
+    return build_specialists(get_model_client())
+
+round_robin_teams = runtime.pool("app7.round_robin", build_round_robin_team, limits=TEAM_LIMITS)
+concurrent_agents = runtime.pool("app7.concurrent", build_concurrent_agents)
+
+# Core translation logic (sequential group chat)
+# Yields each message as soon as its agent produces it, then the TaskResult
+async def stream_with_manager(task: str):
+    from autogen_agentchat.base import TaskResult
+
+    async with round_robin_teams.lease() as team:
+        with tracing.span("team.run", team="round_robin") as span:
+            # Closes the team's stream too if our caller stops early
+            async with runtime.team_stream(team, task) as stream:
+                async for item in stream:
+                    if isinstance(item, TaskResult):
+                        span.set(stop_reason=item.stop_reason, messages=len(item.messages))
+                    yield item
+
+# Concurrent team: all specialists run at the same time. The manager would
+# only hand out the sentence and announce completion, so it is not called:
+# each specialist receives the source sentence, latency is the slowest single
+# call, and the run ends when every specialist replied. Replies are yielded
+# in the order they finish.
+async def stream_concurrently(task: str):
+    from autogen_agentchat.base import TaskResult
+    from autogen_agentchat.messages import TextMessage
+    from autogen_core import CancellationToken
+
+    task_message = TextMessage(content=task, source="user")
+    messages = [task_message]
+    yield task_message
+    # The team's caps apply here too: turns and tokens are checked as replies
+    # arrive, and the time limit is a deadline for the whole fan-out
+    caps = TEAM_LIMITS.termination()
+    await caps([task_message])
+    stop_reason = COMPLETED
+    async with concurrent_agents.lease() as specialists:
+        with tracing.span("team.run", team="concurrent") as span:
+            cancellation = CancellationToken()
+            runs = [asyncio.ensure_future(agent.on_messages([task_message], cancellation))
+                    for agent in specialists]
+            try:
+                for replies, pending in enumerate(asyncio.as_completed(runs, timeout=TEAM_LIMITS.time_limit), 1):
+                    response = await pending
+                    messages.append(response.chat_message)
+                    yield response.chat_message
+                    stop = await caps([response.chat_message])
+                    if stop is not None and replies < len(runs):
+                        # A cap was hit with specialists still running
+                        stop_reason = stop.content
+                        break
+            except asyncio.TimeoutError:
+                stop_reason = f"Timeout of {TEAM_LIMITS.time_limit} seconds reached"
+            finally:
+                # Stop the specialists still running once a cap is hit (or the caller stops early)
+                cancellation.cancel()
+                for run in runs:
+                    run.cancel()
+                await asyncio.gather(*runs, return_exceptions=True)
+            span.set(stop_reason=stop_reason, messages=len(messages))
+
+    yield TaskResult(messages=messages, stop_reason=stop_reason)
+
+# Return the (possibly partial) transcript and its usage summary once the run is over
+async def collect(stream, sentinel: str = None) -> tuple:
+    async for item in stream:
+        result = item
+    return result.messages, usage_summary(result.messages, result.stop_reason, sentinel)
+
+async def translate_with_manager(task: str) -> tuple:
+    return await collect(stream_with_manager(task), SENTINEL)
+
+async def translate_concurrently(task: str) -> tuple:
+    return await collect(stream_concurrently(task), COMPLETED)
 
 # Streamlit UI
 st.set_page_config(page_title="🌍 Manager Pattern Translator", layout="centered")
 st.title("🌍 Manager Pattern Multilingual Translator")
 
 user_task = st.text_input("Enter sentence to translate into Spanish, French, and Italian:")
+mode = st.radio(
+    "Team mode:",
+    ["Concurrent specialists", "Round robin"],
+    help="Concurrent mode sends the sentence to all specialists at once, without the manager.",
+)
 
 if st.button("Translate"):
     if not user_task.strip():
         st.warning("Please enter a valid sentence.")
     else:
-        with st.spinner("Manager and specialists are working..."):
-            messages = run_async(translate_with_manager(user_task))
+        from autogen_agentchat.base import TaskResult
 
+        stream = stream_concurrently if mode == "Concurrent specialists" else stream_with_manager
+        with st.spinner("Manager and specialists are working..."), \
+                tracing.span("request", app="app7_decentralized_pattern1", mode=mode) as request_span:
             st.subheader("🌟 Translations Collected")
-            for m in messages:
-                role = getattr(m, "source", getattr(m, "role", ""))
-                content = getattr(m, "content", "")
+            # Render every message as it arrives instead of after the whole conversation
+            started = last = time.perf_counter()
+            first_reply = None
+            for item in runtime.iterate(stream(user_task), timeout=RUN_TIMEOUT):
+                if isinstance(item, TaskResult):
+                    result = item
+                    continue
+                now = time.perf_counter()
+                role = getattr(item, "source", getattr(item, "role", ""))
+                content = getattr(item, "content", "")
                 st.markdown(f"**{role}:** {content}")
+                if role != "user":
+                    first_reply = first_reply or now - started
+                    st.caption(f"⏱ {now - last:.1f}s this turn · {now - started:.1f}s elapsed")
+                last = now
+            request_span.set(first_reply_ms=(first_reply or 0) * 1000)
+
+            usage = usage_summary(result.messages, result.stop_reason,
+                                  SENTINEL if stream is stream_with_manager else COMPLETED)
+            if usage["stopped_early"]:
+                st.warning(f"Stopped early: {usage['stop_reason']}. Showing the partial transcript.")
+            st.caption(
+                f"{usage['model_calls']} model calls · {usage['prompt_tokens']} prompt + "
+                f"{usage['completion_tokens']} completion tokens · first reply after "
+                f"{first_reply or 0:.1f}s of {last - started:.1f}s"
+            )
+
+# Optional per-request waterfall (model calls, tools, cache hits)
+tracing.render_sidebar(st)
+st.sidebar.caption(runtime.startup_summary())
@@ -1,37 +1,35 @@
 import streamlit as st
-import asyncio
-import os
-from dotenv import load_dotenv
-from autogen_agentchat.agents import AssistantAgent
-from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_agentchat.conditions import TextMentionTermination
-from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
+import time
+import runtime
+import tracing
+from triage_router import TriageRouter
+from termination import TeamUsageLimits, usage_summary
 
 # ---------------- Environment Setup ----------------
-load_dotenv(override=True)
-
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-AZURE_OPENAI_MODEL = os.getenv("AZURE_OPENAI_MODEL")
-AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
+# autogen is imported lazily by runtime; start loading it while the page renders.
+# .env is read once per process, on the first model client.
+runtime.prewarm("autogen_agentchat.agents", "autogen_agentchat.teams", "autogen_ext.models.openai")
 
 # ---------------- Helper Functions ----------------
-def run_async(coro, timeout=60):
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(asyncio.wait_for(coro, timeout=timeout))
-    finally:
-        loop.close()
-
-async def triage_app(task: str) -> list:
-    client = AzureOpenAIChatCompletionClient(
-        model=AZURE_OPENAI_MODEL,
-        api_key=AZURE_OPENAI_API_KEY,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME,
-        api_version=AZURE_OPENAI_API_VERSION,
-    )
+# Hard caps in case no specialist ends with FINAL_ANSWER; the time limit
+# sits below RUN_TIMEOUT so the partial transcript is kept
+TEAM_LIMITS = TeamUsageLimits(turn_limit=8, total_tokens_limit=8000, time_limit=55)
+
+# Runs on the shared long-lived loop in runtime.py
+RUN_TIMEOUT = 60
+
+def run_async(coro, timeout=RUN_TIMEOUT):
+    return runtime.run(coro, timeout=timeout)
+
+# Shared Azure OpenAI client, created once per process and closed at shutdown
+def get_model_client():
+    return runtime.azure_client()
+
+# Compiled once per process: keyword rules from the Support_Agent prompt
+router = TriageRouter()
+
+def build_specialists(client):
+    from autogen_agentchat.agents import AssistantAgent
 
     # Specialist agents
     orders_agent = AssistantAgent(
@@ -52,7 +50,13 @@ async def triage_app(task: str) -> list:
         system_message="You are a repair and issues specialist. Handle product complaints, damages, or repairs. End your final reply with 'FINAL_ANSWER'."
     )
 
-    # Triage agent
+    return {agent.name: agent for agent in [orders_agent, sales_agent, issues_agent]}
+
+def build_triage_team():
+    from autogen_agentchat.agents import AssistantAgent
+    from autogen_agentchat.teams import RoundRobinGroupChat
+
+    client = get_model_client()
     triage_agent = AssistantAgent(
         name="Support_Agent",
         model_client=client,
@@ -66,17 +70,64 @@ async def triage_app(task: str) -> list:
     )
 
     # Termination Condition
-    termination = TextMentionTermination("FINAL_ANSWER")
+    termination = TEAM_LIMITS.termination("FINAL_ANSWER")
 
     # Team (Decentralized)
-    team = RoundRobinGroupChat(
-        [triage_agent, orders_agent, sales_agent, issues_agent],
+    return RoundRobinGroupChat(
+        [triage_agent, *build_specialists(client).values()],
         termination_condition=termination
     )
 
-    result = await team.run(task=task)
-    await client.close()
-    return result.messages
+# Built once per process and reset between requests
+specialist_pool = runtime.pool("app8.specialists", lambda: build_specialists(get_model_client()))
+triage_teams = runtime.pool("app8.llm_triage", build_triage_team, limits=TEAM_LIMITS)
+
+# Yields each message as soon as it is produced, then the TaskResult
+async def stream_triage(task: str):
+    from autogen_agentchat.base import TaskResult
+    from autogen_agentchat.messages import TextMessage
+    from autogen_core import CancellationToken
+
+    # Fast path: a clear keyword match goes straight to the one right specialist,
+    # skipping the triage model call and the irrelevant specialist turns
+    with tracing.span("router.route") as span:
+        decision = router.route(task)
+        span.set(route=decision.route)
+    if decision.route is not None:
+        task_message = TextMessage(content=task, source="user")
+        routing_note = TextMessage(
+            content=f"Routed to {decision.route} (matched: {', '.join(k for k, _ in decision.matches)})",
+            source="Router",
+        )
+        yield task_message
+        yield routing_note
+        async with specialist_pool.lease() as specialists:
+            response = await specialists[decision.route].on_messages([task_message], CancellationToken())
+        yield response.chat_message
+        messages = [task_message, routing_note, response.chat_message]
+        yield TaskResult(messages=messages, stop_reason=f"Routed locally to {decision.route}")
+        return
+
+    # Ambiguous or no match: let the LLM triage agent decide
+    async with triage_teams.lease() as team:
+        with tracing.span("team.run", team="llm_triage") as span:
+            # Closes the team's stream too if our caller stops early
+            async with runtime.team_stream(team, task) as stream:
+                async for item in stream:
+                    if isinstance(item, TaskResult):
+                        span.set(stop_reason=item.stop_reason, messages=len(item.messages))
+                    yield item
+
+# Token usage of a finished run; only team runs have to end with FINAL_ANSWER
+def summarize(result) -> dict:
+    routed = any(getattr(m, "source", None) == "Router" for m in result.messages)
+    return usage_summary(result.messages, result.stop_reason, None if routed else "FINAL_ANSWER")
+
+# Returns the (possibly partial) transcript and its usage summary
+async def triage_app(task: str) -> tuple:
+    async for item in stream_triage(task):
+        result = item
+    return result.messages, summarize(result)
 
 # ---------------- Streamlit UI ----------------
 st.set_page_config(page_title="📦 Customer Triage Bot", layout="centered")
@@ -88,11 +139,41 @@ if st.button("Ask Specialist"):
     if not user_query.strip():
         st.warning("Please enter a query.")
     else:
-        with st.spinner("Triage bot analyzing and routing..."):
-            messages = run_async(triage_app(user_query))
+        from autogen_agentchat.base import TaskResult
 
+        with st.spinner("Triage bot analyzing and routing..."), \
+                tracing.span("request", app="app8_decentralized_pattern2") as request_span:
             st.subheader("📢 Response")
-            for m in messages:
-                role = getattr(m, "source", getattr(m, "role", ""))
-                content = getattr(m, "content", "")
+            # Render every message as it arrives and stop at the final answer
+            started = last = time.perf_counter()
+            messages, result = [], None
+            for item in runtime.iterate(stream_triage(user_query), timeout=RUN_TIMEOUT):
+                if isinstance(item, TaskResult):
+                    result = item
+                    break
+                now = time.perf_counter()
+                messages.append(item)
+                role = getattr(item, "source", getattr(item, "role", ""))
+                content = getattr(item, "content", "")
+                if not isinstance(content, str):
+                    content = str(content)
                 st.markdown(f"**{role}:** {content.replace('FINAL_ANSWER', '').strip()}")
+                if role not in ("user", "Router"):
+                    st.caption(f"⏱ {now - last:.1f}s this turn · {now - started:.1f}s elapsed")
+                last = now
+                if "FINAL_ANSWER" in content:
+                    # Done: don't wait for the rest of the team to wind down
+                    break
+            request_span.set(answer_ms=(last - started) * 1000)
+
+            usage = summarize(result) if result else usage_summary(messages, "FINAL_ANSWER received", "FINAL_ANSWER")
+            if usage["stopped_early"]:
+                st.warning(f"Stopped early: {usage['stop_reason']}. Showing the partial transcript.")
+            st.caption(
+                f"{usage['model_calls']} model calls · {usage['prompt_tokens']} prompt + "
+                f"{usage['completion_tokens']} completion tokens · answered after {last - started:.1f}s"
+            )
+
+# Optional per-request waterfall (model calls, tools, cache hits)
+tracing.render_sidebar(st)
+st.sidebar.caption(runtime.startup_summary())
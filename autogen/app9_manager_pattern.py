@@ -1,28 +1,21 @@
 import streamlit as st
-import asyncio
 import os
-from dotenv import load_dotenv
-from autogen_agentchat.agents import AssistantAgent
-from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
-from autogen_agentchat.messages import TextMessage
-from autogen_core import CancellationToken
-
-# Load environment variables
-load_dotenv(override=True)
-
-AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
-AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION")
-AZURE_OPENAI_MODEL = os.getenv("AZURE_OPENAI_MODEL")
-AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME")
-
-# Safe async runner
+import tempfile
+import runtime
+import tracing
+from batch_runner import ResultWriter, BatchStats, read_sentences, run_batch
+
+# autogen is imported lazily by runtime; start loading it while the page renders.
+# .env is read once per process, on the first model client.
+runtime.prewarm("autogen_agentchat.agents", "autogen_ext.models.openai")
+
+# Safe async runner (shared long-lived loop from runtime.py)
 def run_async(coro, timeout=50):
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(asyncio.wait_for(coro, timeout=timeout))
-    finally:
-        loop.close()
+    return runtime.run(coro, timeout=timeout)
+
+# Shared Azure OpenAI client, created once per process and closed at shutdown
+def get_model_client():
+    return runtime.azure_client()
 
 # Translation tool implementations (simple functions)
 def spanish_tool_fn(input: str) -> str:
@@ -34,41 +27,105 @@ def french_tool_fn(input: str) -> str:
 def italian_tool_fn(input: str) -> str:
     return f"[Italian] Ciao! Translation of: '{input}'"
 
-# Unified assistant using simple tools
-async def run_translator_agent(text: str):
-    client = AzureOpenAIChatCompletionClient(
-        model=AZURE_OPENAI_MODEL,
-        api_key=AZURE_OPENAI_API_KEY,
-        azure_endpoint=AZURE_OPENAI_ENDPOINT,
-        azure_deployment=AZURE_OPENAI_DEPLOYMENT_NAME,
-        api_version=AZURE_OPENAI_API_VERSION,
-    )
+TRANSLATION_TOOLS = {
+    "spanish": spanish_tool_fn,
+    "french": french_tool_fn,
+    "italian": italian_tool_fn,
+}
+
+# Unified assistant using simple tools (built once per process, reset between requests)
+def build_translator_agent():
+    from autogen_agentchat.agents import AssistantAgent
 
-    agent = AssistantAgent(
+    return AssistantAgent(
         name="Translator",
-        model_client=client,
-        tools=[spanish_tool_fn, french_tool_fn, italian_tool_fn],
+        model_client=get_model_client(),
+        tools=list(TRANSLATION_TOOLS.values()),
         system_message=(
             "You are a multilingual assistant. Given an English sentence, call all your translation tools to produce translations into Spanish, French, and Italian."
-        )
+        ),
+        # Return the tool outputs as-is instead of spending another model call summarizing them
+        reflect_on_tool_use=False,
     )
 
+translator_agents = runtime.pool("app9.translator", build_translator_agent)
+
+async def run_translator_agent(text: str):
+    from autogen_agentchat.messages import TextMessage
+    from autogen_core import CancellationToken
+
     user_msg = TextMessage(content=text, source="user")
-    response = await agent.on_messages([user_msg], cancellation_token=CancellationToken())
-    await client.close()
+    async with translator_agents.lease() as agent:
+        response = await agent.on_messages([user_msg], cancellation_token=CancellationToken())
     return response.chat_message.to_text()
 
+# Batch mode: every sentence needs all three tools, so call them directly
+# instead of asking the model to pick them each time. They are cheap string
+# functions, so they run inline rather than in worker threads.
+async def translate_sentence(text: str) -> dict:
+    return {language: fn(text) for language, fn in TRANSLATION_TOOLS.items()}
+
 # Streamlit UI
 st.set_page_config(page_title="🌍 Unified Translator Agent", layout="centered")
 st.title("🌍 Unified Translator with Tools")
 
-user_input = st.text_input("Enter sentence to translate into Spanish, French, and Italian:")
+mode = st.radio("Mode:", ["Single sentence", "Batch"], horizontal=True)
+
+if mode == "Single sentence":
+    user_input = st.text_input("Enter sentence to translate into Spanish, French, and Italian:")
+
+    if st.button("Translate"):
+        if not user_input.strip():
+            st.warning("Please enter a valid sentence.")
+        else:
+            with st.spinner("Translating via tools..."), \
+                    tracing.span("request", app="app9_manager_pattern", mode="single"):
+                reply = run_async(run_translator_agent(user_input))
+                st.subheader("🌟 Translations")
+                st.write(reply)
+else:
+    uploaded = st.file_uploader("Sentences file (.txt one per line, .csv first column, .jsonl with 'text')",
+                                type=["txt", "csv", "jsonl"])
+    pasted = st.text_area("...or paste sentences, one per line:")
+    concurrency = st.slider("Concurrency", min_value=1, max_value=64, value=16)
+    output_format = st.selectbox("Output format", ["jsonl", "csv"])
+
+    if st.button("Translate batch"):
+        skipped = []
+        if uploaded:
+            sentences, skipped = read_sentences(uploaded.name, uploaded.getvalue().decode("utf-8"))
+        else:
+            sentences = [l for l in pasted.splitlines() if l.strip()]
+        if skipped:
+            st.warning(f"Skipped {len(skipped)} unreadable lines: " + "; ".join(skipped[:5]))
+        if not sentences:
+            st.warning("Please provide at least one sentence.")
+        else:
+            output_path = os.path.join(tempfile.mkdtemp(), f"translations.{output_format}")
+            fields = ["index", "input", *TRANSLATION_TOOLS, "latency_ms", "error"]
+            stats = BatchStats()
+            progress = st.progress(0.0, text="Translating...")
+            # Results are written to the output file in completion order as they arrive
+            with ResultWriter(output_path, output_format, fields) as writer, \
+                    tracing.span("request", app="app9_manager_pattern", mode="batch", items=len(sentences)):
+                for item in runtime.iterate(run_batch(sentences, translate_sentence, concurrency)):
+                    writer.write(item)
+                    stats.add(item)
+                    done = len(stats.latencies)
+                    if done % 50 == 0 or done == len(sentences):
+                        progress.progress(done / len(sentences), text=f"{done}/{len(sentences)} translated")
+
+            summary = stats.summary()
+            cols = st.columns(4)
+            cols[0].metric("Sentences", summary["items"])
+            cols[1].metric("Throughput", f"{summary['throughput_per_s']:.0f}/s")
+            cols[2].metric("p50 latency", f"{summary['p50_ms']:.1f} ms")
+            cols[3].metric("p95 latency", f"{summary['p95_ms']:.1f} ms")
+            if summary["errors"]:
+                st.warning(f"{summary['errors']} sentences failed; see the 'error' column.")
+            with open(output_path, "rb") as f:
+                st.download_button("Download results", f, file_name=os.path.basename(output_path))
 
-if st.button("Translate"):
-    if not user_input.strip():
-        st.warning("Please enter a valid sentence.")
-    else:
-        with st.spinner("Translating via tools..."):
-            reply = run_async(run_translator_agent(user_input))
-            st.subheader("🌟 Translations")
-            st.write(reply)
+# Optional per-request waterfall (model calls, tools, cache hits)
+tracing.render_sidebar(st)
+st.sidebar.caption(runtime.startup_summary())
@@ -0,0 +1,167 @@
+"""Bounded-concurrency batch execution with streaming output and latency stats."""
+import asyncio
+import csv
+import io
+import json
+import time
+from dataclasses import dataclass, field
+
+
+@dataclass
+class BatchItem:
+    index: int
+    input: object
+    output: object = None
+    error: str = None
+    latency: float = 0.0
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[rank]
+
+
+@dataclass
+class BatchStats:
+    started: float = field(default_factory=time.perf_counter)
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+
+    def add(self, item: BatchItem) -> None:
+        self.latencies.append(item.latency)
+        if item.error is not None:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        latencies = sorted(self.latencies)
+        return {
+            "items": len(latencies),
+            "errors": self.errors,
+            "elapsed_s": elapsed,
+            "throughput_per_s": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        }
+
+
+async def run_batch(items, worker, concurrency: int = 8):
+    """Run `await worker(item)` for every item with at most `concurrency` in flight.
+
+    Yields BatchItems in completion order. Items are pulled lazily from the
+    iterable, so arbitrarily large inputs never sit in memory all at once. If
+    the iterable raises, the items already pulled are still yielded and the
+    exception is then re-raised.
+    """
+    todo = asyncio.Queue(maxsize=concurrency * 2)
+    done = asyncio.Queue()
+    feed_errors = []
+
+    async def feed():
+        try:
+            for index, item in enumerate(items):
+                await todo.put(BatchItem(index, item))
+        except Exception as e:
+            # Raised to the consumer once the items already queued are done
+            feed_errors.append(e)
+        # Always stop the workers, or they (and the consumer) would wait forever
+        for _ in range(concurrency):
+            await todo.put(None)
+
+    async def work():
+        while True:
+            entry = await todo.get()
+            if entry is None:
+                await done.put(None)
+                return
+            start = time.perf_counter()
+            try:
+                entry.output = await worker(entry.input)
+            except Exception as e:
+                entry.error = f"{type(e).__name__}: {e}"
+            entry.latency = time.perf_counter() - start
+            await done.put(entry)
+
+    tasks = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(concurrency)]
+    try:
+        finished_workers = 0
+        while finished_workers < concurrency:
+            entry = await done.get()
+            if entry is None:
+                finished_workers += 1
+            else:
+                yield entry
+    finally:
+        for task in tasks:
+            task.cancel()
+    if feed_errors:
+        raise feed_errors[0]
+
+
+def read_sentences(name: str, text: str) -> tuple:
+    """(sentences, skipped) from a .txt (one per line), .csv (first column) or .jsonl file's text.
+
+    A .jsonl record is an object with a "text" field or a bare string.
+    Unreadable lines are skipped and described in `skipped` as "line N: why",
+    so one bad record does not cost the whole batch.
+    """
+    if name.endswith(".csv"):
+        rows = csv.reader(io.StringIO(text))
+        return [row[0] for row in rows if row and row[0].strip()], []
+    if not name.endswith(".jsonl"):
+        return [line for line in text.splitlines() if line.strip()], []
+    sentences, skipped = [], []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            skipped.append(f"line {number}: invalid JSON ({e.msg})")
+            continue
+        if isinstance(record, dict):
+            if not isinstance(record.get("text"), str):
+                skipped.append(f"line {number}: no \"text\" field")
+                continue
+            record = record["text"]
+        sentences.append(str(record))
+    return sentences, skipped
+
+
+class ResultWriter:
+    """Append batch results to a CSV or JSONL file as they complete."""
+
+    def __init__(self, path: str, fmt: str = "jsonl", fields: list = None):
+        self.fmt = fmt
+        self.fields = fields
+        self._file = open(path, "w", encoding="utf-8", newline="")
+        self._csv = None
+
+    def write(self, item: BatchItem) -> None:
+        row = {"index": item.index, "input": item.input, "latency_ms": round(item.latency * 1000, 3),
+               "error": item.error}
+        if isinstance(item.output, dict):
+            row.update(item.output)
+        else:
+            row["output"] = item.output
+        if self.fmt == "csv":
+            if self._csv is None:
+                self._csv = csv.DictWriter(self._file, fieldnames=self.fields or list(row),
+                                           extrasaction="ignore")
+                self._csv.writeheader()
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
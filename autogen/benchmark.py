@@ -0,0 +1,293 @@
+"""Offline benchmark for the agent apps.
+
+Runs each app's core coroutine against ScriptedChatCompletionClient (and the
+pydantic-ai ScriptedModel) at several concurrency levels and reports latency
+percentiles, throughput, model calls and tokens per request. No network.
+
+    python autogen/benchmark.py --concurrency 1 8 32 --requests 64
+    python autogen/benchmark.py --save-baseline bench_baseline.json
+    python autogen/benchmark.py --baseline bench_baseline.json   # exit 1 on regression
+
+The response and weather caches are off, so every level measures real work.
+A level where any request raised is marked FAILED and the run exits 1.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+from autogen_core.models import FunctionExecutionResultMessage, SystemMessage
+
+import runtime
+from batch_runner import percentile
+from mock_client import ScriptedChatCompletionClient, call_all_tools
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PYDANTIC_AI_DIR = os.path.join(os.path.dirname(HERE), "pydantic-ai")
+
+# Metrics where a higher value is worse, and those where a lower value is worse
+HIGHER_IS_WORSE = ("p50_ms", "p95_ms", "p99_ms", "model_calls_per_request", "tokens_per_request")
+LOWER_IS_WORSE = ("throughput_per_s",)
+
+
+def demo_responder(messages, tools):
+    """Plausible replies for every agent in the apps, keyed on its system message."""
+    system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+    last = messages[-1] if messages else None
+    if isinstance(last, FunctionExecutionResultMessage):
+        return "Here are the results."
+    if tools and "multilingual" in system:
+        return call_all_tools(messages, tools)
+    if "You are a manager" in system:
+        if any(getattr(m, "source", None) == "Italian_Agent" for m in messages):
+            return "ALL_TRANSLATIONS_COMPLETED"
+        return "Spanish_Agent, French_Agent, Italian_Agent: please translate the sentence."
+    if "Translate any given English sentence into" in system:
+        language = system.rsplit(" ", 1)[-1].rstrip(".")
+        return f"[{language}] translated sentence."
+    if "triage bot" in system:
+        return "Forwarding to Orders_Agent."
+    if "specialist" in system:
+        return "Thanks for reaching out, here is what I found. FINAL_ANSWER"
+    return "OK"
+
+
+@dataclass
+class Scenario:
+    name: str
+    setup: callable  # () -> request(i) coroutine function, or (request, meter)
+
+
+def load_app(module_name: str):
+    """Import an app module. Its Streamlit UI runs in bare mode and renders nothing."""
+    import streamlit.config
+    import streamlit.logger
+
+    # Silence the "missing ScriptRunContext" warnings every bare-mode widget logs.
+    # Parse the config first: parsing it resets the log level to logger.level.
+    streamlit.config.get_config_options()
+    streamlit.logger.set_log_level("error")
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    return importlib.import_module(module_name)
+
+
+def write_books(count: int = 5000) -> str:
+    path = os.path.join(tempfile.mkdtemp(), "books.json")
+    books = [{"title": f"Book {i}", "author": f"Author {i % 200}", "category": f"Category {i % 20}"}
+             for i in range(count)]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(books, f)
+    return path
+
+
+def setup_app4():
+    os.environ["BOOKS_PATH"] = write_books()
+    app = load_app("app4_agent")
+    return lambda i: app.ask_agent(f"search_book_by_author:Author {i % 200}")
+
+
+def setup_app5(tool_latency: float = 0.05):
+    os.environ.setdefault("OPENWEATHER_API_KEY", "benchmark")
+    import weather_client
+
+    async def fake_fetch(self, city):
+        await asyncio.sleep(tool_latency)
+        return {"city": city, "temp": 20.0, "humidity": 50, "conditions": "clear sky", "wind": 3.0}
+
+    weather_client.WeatherClient._fetch = fake_fetch
+    app = load_app("app5_agent")
+    # A distinct city per request, so concurrent requests are not coalesced into one lookup
+    return lambda i: app.query_agent(f"get_current_weather:City {i}")
+
+
+def setup_app7_round_robin():
+    app = load_app("app7_decentralized_pattern1")
+    return lambda i: app.translate_with_manager(f"The weather is nice today ({i}).")
+
+
+def setup_app7_concurrent():
+    app = load_app("app7_decentralized_pattern1")
+    return lambda i: app.translate_concurrently(f"The weather is nice today ({i}).")
+
+
+def setup_app8_routed():
+    app = load_app("app8_decentralized_pattern2")
+    return lambda i: app.triage_app(f"Where is my order #{i}?")
+
+
+def setup_app8_llm_triage():
+    app = load_app("app8_decentralized_pattern2")
+    return lambda i: app.triage_app(f"I have a question about account {i}.")
+
+
+def setup_app9_agent():
+    app = load_app("app9_manager_pattern")
+    return lambda i: app.run_translator_agent(f"Good morning, friend number {i}.")
+
+
+def setup_app9_batch_item():
+    app = load_app("app9_manager_pattern")
+    return lambda i: app.translate_sentence(f"Good morning, friend number {i}.")
+
+
+def setup_pydantic_agent(latency: float = 0.05):
+    if PYDANTIC_AI_DIR not in sys.path:
+        sys.path.insert(0, PYDANTIC_AI_DIR)
+    from pydantic_ai import Agent, UsageLimits
+    from mock_model import ScriptedModel
+
+    model = ScriptedModel(["Charles Babbage"], latency=latency, output_tokens=(40, 10))
+    agent = Agent(model)
+
+    async def request(i):
+        return await agent.run(f"Who invented the computer? ({i})",
+                               usage_limits=UsageLimits(response_tokens_limit=200))
+    return request, lambda: (model.calls, model.tokens)
+
+
+SCENARIOS = [
+    Scenario("app4_book_search", setup_app4),
+    Scenario("app5_weather", setup_app5),
+    Scenario("app7_round_robin", setup_app7_round_robin),
+    Scenario("app7_concurrent", setup_app7_concurrent),
+    Scenario("app8_routed", setup_app8_routed),
+    Scenario("app8_llm_triage", setup_app8_llm_triage),
+    Scenario("app9_agent", setup_app9_agent),
+    Scenario("app9_batch_item", setup_app9_batch_item),
+    Scenario("pydantic_agent", setup_pydantic_agent),
+]
+
+
+def client_meter(client):
+    """(model calls, tokens) so far for a ScriptedChatCompletionClient."""
+    def meter():
+        usage = client.total_usage()
+        return client.calls, usage.prompt_tokens + usage.completion_tokens
+    return meter
+
+
+async def run_level(request, concurrency: int, requests: int, meter) -> dict:
+    """Fire `requests` calls with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], []
+    calls_before, tokens_before = meter()
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await request(i)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    calls, tokens = meter()
+    calls, tokens = calls - calls_before, tokens - tokens_before
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput_per_s": requests / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "model_calls_per_request": calls / requests,
+        "tokens_per_request": tokens / requests,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Return human-readable regressions of `results` against `baseline`."""
+    regressions = []
+    for scenario, levels in results.items():
+        for level, metrics in levels.items():
+            base = baseline.get(scenario, {}).get(level)
+            if not base:
+                continue
+            for key in HIGHER_IS_WORSE:
+                if base.get(key) and metrics[key] > base[key] * (1 + threshold):
+                    regressions.append(f"{scenario} c={level} {key}: {base[key]:.2f} -> {metrics[key]:.2f}")
+            for key in LOWER_IS_WORSE:
+                if base.get(key) and metrics[key] < base[key] * (1 - threshold):
+                    regressions.append(f"{scenario} c={level} {key}: {base[key]:.2f} -> {metrics[key]:.2f}")
+    return regressions
+
+
+async def run_benchmarks(scenarios, levels, requests, latency, seed) -> dict:
+    random.seed(seed)
+    client = ScriptedChatCompletionClient(responder=demo_responder, latency=latency, seed=seed)
+    # Every app asks runtime.get_client() for its model client; hand them all the mock
+    runtime.set_client_factory(lambda cls, **kwargs: client)
+    results = {}
+    for scenario in scenarios:
+        request = scenario.setup()
+        meter = client_meter(client)
+        if isinstance(request, tuple):
+            request, meter = request
+        results[scenario.name] = {}
+        for level in levels:
+            metrics = await run_level(request, level, requests, meter)
+            results[scenario.name][str(level)] = metrics
+            print(f"{scenario.name:<20} c={level:<4} "
+                  f"p50={metrics['p50_ms']:8.1f}ms p95={metrics['p95_ms']:8.1f}ms p99={metrics['p99_ms']:8.1f}ms "
+                  f"{metrics['throughput_per_s']:8.1f} req/s  "
+                  f"calls/req={metrics['model_calls_per_request']:.2f} tokens/req={metrics['tokens_per_request']:.0f}"
+                  + (f"  FAILED errors={metrics['errors']} ({metrics['first_error']})" if metrics["errors"] else ""))
+    await runtime.aclose()
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="*", help="subset of: " + ", ".join(s.name for s in SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05, help="mock model latency in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="compare against this baseline JSON; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--save-baseline", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    # Measure orchestration, not the response or weather caches: otherwise every
+    # level after the first would time cache hits warmed by the levels before it
+    os.environ["MODEL_CACHE"] = "0"
+    os.environ["WEATHER_CACHE_TTL"] = "0"
+    scenarios = [s for s in SCENARIOS if not args.scenarios or s.name in args.scenarios]
+    results = asyncio.run(run_benchmarks(scenarios, args.concurrency, args.requests, args.latency, args.seed))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+    # Latencies of failing requests mean nothing, so errors fail the run
+    failed = [f"{name} c={level}" for name, levels in results.items()
+              for level, metrics in levels.items() if metrics["errors"]]
+    if failed:
+        print("FAILED (requests raised errors): " + ", ".join(failed))
+        return 1
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+import unicodedata
+
+
+# Books per tool result, for both the JSON catalog and the SQLite store
+PAGE_SIZE = 20
+
+
+def normalize_key(value) -> str:
+    """Normalize a lookup key: unicode NFKC, case-folded, single-spaced."""
+    if value is None:
+        return ""
+    text = unicodedata.normalize("NFKC", str(value))
+    return " ".join(text.casefold().split())
+
+
+def page(books: list, cursor: str = "", page_size: int = PAGE_SIZE) -> dict:
+    """One page of `books` in BookStore's {"books", "next_cursor"} shape; the cursor is an offset.
+
+    A cursor that is not one of ours (the model may make one up) gives an empty page.
+    """
+    cursor = str(cursor or "0").strip()
+    if not (cursor.isascii() and cursor.isdigit()):
+        return {"books": [], "next_cursor": None}
+    start = int(cursor)
+    end = start + page_size
+    return {"books": books[start:end], "next_cursor": str(end) if end < len(books) else None}
+
+
+class BookCatalog:
+    """In-memory book catalog with author and category hash indexes.
+
+    The JSON file is parsed once and re-parsed only when its mtime (or size)
+    changes, so each lookup is a single dict access instead of a full scan.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._signature = None
+        self._books = []
+        self._by_author = {}
+        self._by_category = {}
+
+    def _file_signature(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _build(self, books):
+        by_author, by_category = {}, {}
+        for book in books:
+            by_author.setdefault(normalize_key(book.get("author")), []).append(book)
+            by_category.setdefault(normalize_key(book.get("category")), []).append(book)
+        return by_author, by_category
+
+    def refresh(self) -> None:
+        """Reload the file if it changed since the last load."""
+        signature = self._file_signature()
+        if signature == self._signature:
+            return
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            signature = self._file_signature()
+            if signature == self._signature:
+                return
+            with open(self.path, "r", encoding="utf-8") as f:
+                books = json.load(f)
+            by_author, by_category = self._build(books)
+            # Swap all indexes together so readers never see a half-built catalog
+            self._books, self._by_author, self._by_category = books, by_author, by_category
+            self._signature = signature
+
+    def books(self) -> list:
+        self.refresh()
+        return self._books
+
+    def by_author(self, author: str) -> list:
+        self.refresh()
+        return self._by_author.get(normalize_key(author), [])
+
+    def by_category(self, category: str) -> list:
+        self.refresh()
+        return self._by_category.get(normalize_key(category), [])
+
+
+# One catalog per file for the whole process, shared across Streamlit reruns
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path: str) -> BookCatalog:
+    key = os.path.abspath(path)
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = _catalogs[key] = BookCatalog(key)
+        return catalog
@@ -0,0 +1,218 @@
+"""SQLite/FTS5 storage backend for large book catalogs.
+
+Build the database once from the JSON catalog:
+
+    python autogen/book_store.py data/books.json data/books.db
+
+then point app4 at it with BOOKS_DB_PATH=data/books.db. Queries go through
+indexes and return one page at a time, so memory stays bounded and the app
+never parses the JSON file at startup.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from book_catalog import PAGE_SIZE, normalize_key
+
+SCHEMA = """
+CREATE TABLE books (
+    id INTEGER PRIMARY KEY,
+    title TEXT,
+    author TEXT,
+    category TEXT,
+    author_key TEXT NOT NULL,
+    category_key TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE books_fts USING fts5(
+    title, author, category, content='books', content_rowid='id'
+);
+"""
+
+# Created after the bulk insert, which is much faster than maintaining them row by row
+INDEXES = """
+CREATE INDEX books_author ON books(author_key, id);
+CREATE INDEX books_category ON books(category_key, id);
+INSERT INTO books_fts(books_fts) VALUES ('rebuild');
+"""
+
+_WHITESPACE = re.compile(r"\s*")
+# What could still follow a number cut off at the end of a chunk ("12" + "34", "1." + "5", "1e" + "3")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+        # "open": before "["; "first": after "["; "value": after ","; "next": after an element
+        state = "open"
+        while True:
+            pos = _WHITESPACE.match(buf, pos).end()
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"{path}: unexpected end of JSON array")
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            ch = buf[pos]
+            if state == "open":
+                if ch != "[":
+                    raise ValueError(f"{path}: expected a JSON array of books")
+                state, pos = "first", pos + 1
+            elif state == "next":
+                if ch == "]":
+                    return
+                if ch != ",":
+                    raise ValueError(f"{path}: expected ',' or ']' after an array element")
+                state, pos = "value", pos + 1
+            elif ch == "]" and state == "first":
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    item, end = None, None
+                    if eof:
+                        raise
+                # Undecodable yet, or a number that may continue in the next chunk: read more
+                if end is None or (not eof and _NUMBER_TAIL.fullmatch(buf, end)):
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buf, pos = buf[pos:] + chunk, 0
+                    continue
+                state, pos = "next", end
+                yield item
+
+
+def import_books(json_path: str, db_path: str, batch_size: int = 5000) -> int:
+    """Stream the JSON catalog into a fresh SQLite database. Returns the row count."""
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    count = 0
+    try:
+        # One-off bulk load into a temp file: durability is not needed until the rename
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript(SCHEMA)
+        batch = []
+        for book in iter_json_array(json_path):
+            author, category = book.get("author"), book.get("category")
+            batch.append((
+                book.get("title"), author, category,
+                normalize_key(author), normalize_key(category),
+                json.dumps(book, ensure_ascii=False),
+            ))
+            if len(batch) >= batch_size:
+                conn.executemany(
+                    "INSERT INTO books (title, author, category, author_key, category_key, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", batch)
+                count += len(batch)
+                batch.clear()
+        if batch:
+            conn.executemany(
+                "INSERT INTO books (title, author, category, author_key, category_key, data) "
+                "VALUES (?, ?, ?, ?, ?, ?)", batch)
+            count += len(batch)
+        conn.executescript(INDEXES)
+        conn.commit()
+    finally:
+        conn.close()
+    # Swap in atomically so running apps never open a half-written database
+    os.replace(tmp_path, db_path)
+    return count
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query that ANDs quoted terms (no syntax errors)."""
+    terms = re.findall(r"\w+", text or "")
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def _parse_cursor(cursor: str):
+    """The row id encoded in a next_cursor, 0 for no cursor, or None if it is not one of ours."""
+    if not cursor:
+        return 0
+    cursor = str(cursor).strip()
+    if not (cursor.isascii() and cursor.isdigit()):
+        return None
+    return int(cursor)
+
+
+class BookStore:
+    """Read-only, paginated queries over a database built by import_books()."""
+
+    def __init__(self, db_path: str, page_size: int = PAGE_SIZE):
+        self.db_path = db_path
+        self.page_size = page_size
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+        return conn
+
+    def _page(self, sql: str, params: tuple, cursor: str, limit: int = None) -> dict:
+        limit = limit or self.page_size
+        after = _parse_cursor(cursor)
+        if after is None:
+            # Cursors come back from the model; an unrecognised one is an empty page, not a crash
+            return {"books": [], "next_cursor": None}
+        rows = self._conn().execute(sql, params + (after, limit + 1)).fetchall()
+        books = [json.loads(data) for _, data in rows[:limit]]
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        return {"books": books, "next_cursor": next_cursor}
+
+    def by_author(self, author: str, cursor: str = "", limit: int = None) -> dict:
+        return self._page(
+            "SELECT id, data FROM books WHERE author_key = ? AND id > ? ORDER BY id LIMIT ?",
+            (normalize_key(author),), cursor, limit)
+
+    def by_category(self, category: str, cursor: str = "", limit: int = None) -> dict:
+        return self._page(
+            "SELECT id, data FROM books WHERE category_key = ? AND id > ? ORDER BY id LIMIT ?",
+            (normalize_key(category),), cursor, limit)
+
+    def search(self, text: str, cursor: str = "", limit: int = None) -> dict:
+        query = fts_query(text)
+        if not query:
+            return {"books": [], "next_cursor": None}
+        return self._page(
+            "SELECT b.id, b.data FROM books_fts JOIN books b ON b.id = books_fts.rowid "
+            "WHERE books_fts MATCH ? AND books_fts.rowid > ? ORDER BY books_fts.rowid LIMIT ?",
+            (query,), cursor, limit)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(db_path: str) -> BookStore:
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = BookStore(key)
+        return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a JSON book catalog into SQLite/FTS5.")
+    parser.add_argument("json_path", nargs="?", default="data/books.json")
+    parser.add_argument("db_path", nargs="?", default="data/books.db")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    rows = import_books(args.json_path, args.db_path)
+    print(f"Imported {rows} books into {args.db_path} in {time.perf_counter() - start:.1f}s")
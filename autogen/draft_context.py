@@ -0,0 +1,89 @@
+"""Bounded model context for approve/regenerate loops.
+
+In app6 every "no" from the user proxy makes the assistant regenerate, and
+the default unbounded context sends it every earlier draft again, so prompt
+size (and latency and cost) grows with each round. DraftCompactingContext
+sends only:
+
+    the original task
+    a short summary of the rejected drafts and the feedback on them
+    the latest draft
+    the feedback on the latest draft
+
+The summary is built locally (no extra model call) and is shortened, then
+dropped, if the prompt would exceed `token_limit`. Turn 20 therefore costs
+about as much as turn 2.
+"""
+import json
+from typing import List
+
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import AssistantMessage, LLMMessage, UserMessage
+
+
+def _text(message: LLMMessage) -> str:
+    content = getattr(message, "content", "")
+    return content if isinstance(content, str) else json.dumps(content, default=str)
+
+
+def _clip(text: str, chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= chars else text[: chars - 1].rstrip() + "…"
+
+
+class DraftCompactingContext(ChatCompletionContext):
+    """Keeps the task, the latest draft and its feedback; older drafts become a summary.
+
+    Args:
+        model_client: used for token counting when given (else ~4 characters per token).
+        token_limit: upper bound for the prompt built from this context, or None.
+        summary_drafts: how many of the most recent rejected drafts to quote in the summary.
+        summary_chars: how much of each rejected draft to quote.
+    """
+
+    def __init__(self, model_client=None, *, token_limit: int = None, summary_drafts: int = 3,
+                 summary_chars: int = 160,
+                 initial_messages: List[LLMMessage] = None):
+        super().__init__(initial_messages)
+        self._model_client = model_client
+        self._token_limit = token_limit
+        self._summary_drafts = summary_drafts
+        self._summary_chars = summary_chars
+
+    def _count(self, messages: List[LLMMessage]) -> int:
+        if self._model_client is not None:
+            try:
+                return self._model_client.count_tokens(messages)
+            except Exception:
+                pass
+        return sum(len(_text(m)) // 4 + 4 for m in messages)
+
+    def _summary(self, rounds: list, keep: int) -> UserMessage:
+        lines = [f"{len(rounds)} earlier draft(s) were rejected. Write something different from them."]
+        for number, (draft, feedback) in list(enumerate(rounds, 1))[len(rounds) - keep:]:
+            line = f"Draft {number}: \"{_clip(_text(draft), self._summary_chars)}\""
+            if feedback:
+                line += f" Feedback: \"{_clip(' / '.join(_text(f) for f in feedback), self._summary_chars)}\""
+            lines.append(line)
+        return UserMessage(content="\n".join(lines), source="context_summary")
+
+    async def get_messages(self) -> List[LLMMessage]:
+        messages = list(self._messages)
+        drafts = [i for i, m in enumerate(messages) if isinstance(m, AssistantMessage)]
+        if len(drafts) < 2:
+            return messages
+
+        # Everything before the first draft is the task (plus any system messages)
+        head = messages[: drafts[0]]
+        latest = messages[drafts[-1]:]
+        rounds = []
+        for start, end in zip(drafts, drafts[1:]):
+            feedback = [m for m in messages[start + 1:end] if isinstance(m, UserMessage)]
+            rounds.append((messages[start], feedback))
+
+        # Shorten the summary until the prompt fits, and drop it as a last resort
+        for keep in range(min(len(rounds), self._summary_drafts), -1, -1):
+            compacted = head + [self._summary(rounds, keep)] + latest
+            if self._token_limit is None or self._count(compacted) <= self._token_limit:
+                return compacted
+        return head + latest
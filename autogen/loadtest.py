@@ -0,0 +1,459 @@
+"""Concurrent-user load test for the agent apps, fully offline.
+
+Starts local HTTP stand-ins for the Azure OpenAI chat completions API and
+OpenWeatherMap (configurable latency, error rate and 429s), points the apps
+at them, and drives the apps' blocking entry points (run_agent,
+run_agent_query, run_async(triage_app(...)), ...) from N virtual users. The
+real model and weather clients are used, over real sockets. Each user is a
+thread, the way Streamlit runs one script thread per session. For every
+number of users it reports throughput, latency percentiles, errors, open
+sockets, memory growth and the lag of the shared runtime event loop.
+
+    python autogen/loadtest.py --users 1 8 32 64 --duration 10
+    python autogen/loadtest.py --scenarios app8_llm_triage --model-latency 0.8 --error-rate 0.02 --throttle-rate 0.05
+    python autogen/loadtest.py --rpm 600 --slo-ms 3000 --json loadtest.json
+    AZURE_OPENAI_RPM=550 python autogen/loadtest.py --rpm 600   # with the client-side rate limiter
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter, deque
+from dataclasses import dataclass
+
+from aiohttp import web
+from autogen_core.models import (
+    AssistantMessage,
+    FunctionExecutionResult,
+    FunctionExecutionResultMessage,
+    SystemMessage,
+    UserMessage,
+)
+
+import runtime
+from batch_runner import percentile
+from benchmark import demo_responder, load_app, write_books
+
+try:
+    import psutil
+except ImportError:  # optional: falls back to /proc (Linux only)
+    psutil = None
+
+
+@dataclass
+class Faults:
+    """How a stand-in service misbehaves."""
+    latency: float = 0.2        # seconds per response, with log-normal jitter
+    jitter: float = 0.3
+    error_rate: float = 0.0     # fraction of requests answered with HTTP 500
+    throttle_rate: float = 0.0  # fraction of requests answered with HTTP 429
+    rpm: float = None           # requests per minute before every request gets a 429
+    retry_after: float = 1.0    # seconds, sent with random 429s
+
+
+def _to_llm_message(message: dict):
+    """An OpenAI chat message as the autogen message demo_responder expects."""
+    role, content = message.get("role"), message.get("content")
+    if isinstance(content, list):
+        content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    content = content or ""
+    if role == "system":
+        return SystemMessage(content=content)
+    if role == "assistant":
+        return AssistantMessage(content=content, source=message.get("name", "assistant"))
+    if role == "tool":
+        return FunctionExecutionResultMessage(content=[FunctionExecutionResult(
+            content=content, call_id=message.get("tool_call_id", ""), name="", is_error=False)])
+    return UserMessage(content=content, source=message.get("name", "user"))
+
+
+class StandIns:
+    """Azure OpenAI and OpenWeatherMap stand-ins on one local aiohttp server.
+
+    The server runs on its own thread and event loop, so its work does not
+    show up as lag on the apps' runtime loop.
+    """
+
+    def __init__(self, model: Faults, weather: Faults):
+        self.faults = {"model": model, "weather": weather}
+        self.stats = Counter()
+        self._recent = {"model": deque(), "weather": deque()}
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self.port = None
+
+    def start(self) -> str:
+        """Start serving; returns the base URL."""
+        app = web.Application()
+        app.router.add_post("/openai/deployments/{deployment}/chat/completions", self.chat_completions)
+        app.router.add_get("/data/2.5/weather", self.weather)
+        app.router.add_get("/data/2.5/group", self.weather_group)
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        threading.Thread(target=self._loop.run_forever, name="loadtest-standins", daemon=True).start()
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _delay(self, faults: Faults) -> float:
+        return faults.latency * random.lognormvariate(0, faults.jitter) if faults.latency else 0.0
+
+    async def _fault(self, service: str, faults: Faults):
+        """An error response to send instead of the real one, or None."""
+        self.stats[f"{service}.requests"] += 1
+        if faults.rpm:
+            recent, now = self._recent[service], time.monotonic()
+            while recent and recent[0] <= now - 60:
+                recent.popleft()
+            if len(recent) >= faults.rpm:
+                return self._throttled(service, recent[0] + 60 - now, faults)
+            recent.append(now)
+        roll = random.random()
+        if roll < faults.throttle_rate:
+            return self._throttled(service, faults.retry_after, faults)
+        if roll < faults.throttle_rate + faults.error_rate:
+            self.stats[f"{service}.500"] += 1
+            await asyncio.sleep(self._delay(faults))
+            return web.json_response({"error": {"code": "InternalServerError", "message": "Injected failure"}},
+                                     status=500)
+        return None
+
+    def _throttled(self, service: str, wait: float, faults: Faults) -> web.Response:
+        self.stats[f"{service}.429"] += 1
+        headers = {"retry-after": str(max(1, round(wait))), "retry-after-ms": str(int(wait * 1000))}
+        if faults.rpm:
+            headers.update({"x-ratelimit-limit-requests": str(int(faults.rpm)),
+                            "x-ratelimit-remaining-requests": "0"})
+        return web.json_response({"error": {"code": "429", "message": "Rate limit exceeded"}},
+                                 status=429, headers=headers)
+
+    async def chat_completions(self, request: web.Request) -> web.Response:
+        faults = self.faults["model"]
+        fault = await self._fault("model", faults)
+        if fault is not None:
+            return fault
+        body = await request.json()
+        if body.get("stream"):
+            return web.json_response({"error": {"code": "400", "message": "The stand-in does not stream"}},
+                                     status=400)
+        messages = [_to_llm_message(m) for m in body.get("messages", [])]
+        tools = [t["function"] for t in body.get("tools", []) if "function" in t]
+        reply = demo_responder(messages, tools)
+        await asyncio.sleep(self._delay(faults))
+
+        if isinstance(reply, str):
+            message, finish, completion_tokens = {"role": "assistant", "content": reply}, "stop", len(reply) // 4 + 1
+        else:
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": call.id, "type": "function", "function": {"name": call.name, "arguments": call.arguments}}
+                for call in reply
+            ]}
+            finish, completion_tokens = "tool_calls", 12 * len(reply)
+        prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+        return web.json_response({
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or request.match_info["deployment"],
+            "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    @staticmethod
+    def _city(city_id: int, name: str) -> dict:
+        return {"id": city_id, "name": name,
+                "main": {"temp": round(city_id % 400 / 10 - 5, 1), "humidity": city_id % 70 + 30},
+                "weather": [{"description": ("clear sky", "light rain", "broken clouds")[city_id % 3]}],
+                "wind": {"speed": round(city_id % 120 / 10, 1)}}
+
+    async def weather(self, request: web.Request) -> web.Response:
+        faults = self.faults["weather"]
+        fault = await self._fault("weather", faults)
+        if fault is not None:
+            return fault
+        await asyncio.sleep(self._delay(faults))
+        name = request.query.get("q", "")
+        return web.json_response(self._city(zlib.crc32(name.casefold().encode()) % 10**6, name.title()))
+
+    async def weather_group(self, request: web.Request) -> web.Response:
+        faults = self.faults["weather"]
+        fault = await self._fault("weather", faults)
+        if fault is not None:
+            return fault
+        await asyncio.sleep(self._delay(faults))
+        ids = [int(i) for i in request.query.get("id", "").split(",") if i.strip().isdigit()]
+        return web.json_response({"cnt": len(ids), "list": [self._city(i, f"City {i}") for i in ids]})
+
+
+def configure(base_url: str) -> None:
+    """Point the apps' Azure OpenAI and OpenWeatherMap settings at the stand-ins.
+
+    Must run before the apps (and weather_client) are imported; .env values
+    never override variables that are already set.
+    """
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": base_url,
+        "AZURE_OPENAI_API_KEY": "loadtest",
+        "AZURE_OPENAI_API_VERSION": "2024-06-01",
+        "AZURE_OPENAI_MODEL": "gpt-4o-2024-08-06",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "gpt-4o",
+        "OPENWEATHER_API_KEY": "loadtest",
+        "OPENWEATHER_BASE_URL": f"{base_url}/data/2.5",
+    })
+    # Exercise the network path rather than the caches, unless asked otherwise
+    os.environ.setdefault("MODEL_CACHE", "0")
+    os.environ.setdefault("WEATHER_CACHE_TTL", "0")
+
+
+# Each setup returns a blocking request(i), called from a virtual user's thread
+def setup_app4():
+    os.environ["BOOKS_PATH"] = write_books()
+    app = load_app("app4_agent")
+    return lambda i: app.run_agent(f"search_book_by_author:Author {i % 200}")
+
+
+def setup_app5():
+    app = load_app("app5_agent")
+    return lambda i: app.run_agent_query(f"get_current_weather:City {i}")
+
+
+def setup_app5_bulk():
+    app = load_app("app5_agent")
+    return lambda i: app.run_agent_query("get_weather_many:" + "; ".join(f"City {i}-{j}" for j in range(20)))
+
+
+def setup_app7_round_robin():
+    app = load_app("app7_decentralized_pattern1")
+    return lambda i: app.run_async(app.translate_with_manager(f"The weather is nice today ({i})."))
+
+
+def setup_app7_concurrent():
+    app = load_app("app7_decentralized_pattern1")
+    return lambda i: app.run_async(app.translate_concurrently(f"The weather is nice today ({i})."))
+
+
+def setup_app8_routed():
+    app = load_app("app8_decentralized_pattern2")
+    return lambda i: app.run_async(app.triage_app(f"Where is my order #{i}?"))
+
+
+def setup_app8_llm_triage():
+    app = load_app("app8_decentralized_pattern2")
+    return lambda i: app.run_async(app.triage_app(f"I have a question about account {i}."))
+
+
+def setup_app9_agent():
+    app = load_app("app9_manager_pattern")
+    return lambda i: app.run_async(app.run_translator_agent(f"Good morning, friend number {i}."))
+
+
+SCENARIOS = {
+    "app4_book_search": setup_app4,
+    "app5_weather": setup_app5,
+    "app5_bulk_weather": setup_app5_bulk,
+    "app7_round_robin": setup_app7_round_robin,
+    "app7_concurrent": setup_app7_concurrent,
+    "app8_routed": setup_app8_routed,
+    "app8_llm_triage": setup_app8_llm_triage,
+    "app9_agent": setup_app9_agent,
+}
+
+
+def open_sockets(exclude_port: int = None) -> int:
+    """TCP sockets held by this process, leaving out the stand-ins' side when psutil is available."""
+    if psutil is not None:
+        connections = psutil.Process().net_connections(kind="tcp")
+        return sum(1 for c in connections if not (c.laddr and c.laddr.port == exclude_port))
+    try:
+        fds = os.listdir("/proc/self/fd")
+    except OSError:
+        return -1
+    count = 0
+    for fd in fds:
+        try:
+            count += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+        except OSError:
+            pass
+    return count
+
+
+def rss_bytes() -> int:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return -1
+
+
+class Monitor:
+    """Samples open sockets and memory from a thread, and the runtime loop's lag from inside it."""
+
+    def __init__(self, exclude_port: int = None, interval: float = 0.05):
+        self.exclude_port = exclude_port
+        self.interval = interval
+        self.sockets, self.rss, self.lags = [], [], []
+        self._stopped = threading.Event()
+
+    async def _watch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._stopped.is_set():
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(loop.time() - start - self.interval, 0.0))
+
+    def _watch_process(self) -> None:
+        while not self._stopped.wait(self.interval * 4):
+            self.sockets.append(open_sockets(self.exclude_port))
+            self.rss.append(rss_bytes())
+
+    def __enter__(self):
+        self._lag_future = asyncio.run_coroutine_threadsafe(self._watch_loop(), runtime.get_loop())
+        self._thread = threading.Thread(target=self._watch_process, name="loadtest-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stopped.set()
+        self._thread.join()
+        self._lag_future.result()
+
+
+def run_level(request, users: int, duration: float, think: float, stand_ins: StandIns) -> dict:
+    """`users` threads send requests back to back (plus think time) for `duration` seconds."""
+    latencies, errors = [], Counter()
+    sequence = itertools.count()
+    gc.collect()
+    stats_before, rss_before = Counter(stand_ins.stats), rss_bytes()
+    stop_at = time.perf_counter() + duration
+
+    def user():
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                request(next(sequence))
+            except Exception as e:
+                errors[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+            if think:
+                time.sleep(random.expovariate(1 / think))
+
+    with Monitor(exclude_port=stand_ins.port) as monitor:
+        start = time.perf_counter()
+        threads = [threading.Thread(target=user, name=f"virtual-user-{n}") for n in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    gc.collect()
+
+    served = stand_ins.stats - stats_before
+    latencies.sort()
+    lags = sorted(monitor.lags)
+    completed = len(latencies) - sum(errors.values())
+    return {
+        "users": users,
+        "requests": len(latencies),
+        "errors": dict(errors),
+        "throughput_per_s": completed / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1000,
+        "open_sockets": monitor.sockets[-1] if monitor.sockets else open_sockets(stand_ins.port),
+        "peak_sockets": max(monitor.sockets, default=0),
+        "rss_growth_mb": (rss_bytes() - rss_before) / 2**20,
+        "peak_rss_mb": max(monitor.rss, default=rss_before) / 2**20,
+        "loop_lag_p99_ms": percentile(lags, 99) * 1000,
+        "loop_lag_max_ms": (lags[-1] if lags else 0.0) * 1000,
+        "upstream": dict(served),
+    }
+
+
+def format_level(name: str, m: dict) -> str:
+    upstream = m["upstream"]
+    injected = "  ".join(f"{k}={v}" for k, v in sorted(upstream.items()) if not k.endswith(".requests"))
+    return (f"{name:<18} users={m['users']:<4} {m['throughput_per_s']:7.1f} req/s  "
+            f"p50={m['p50_ms']:7.0f}ms p95={m['p95_ms']:7.0f}ms p99={m['p99_ms']:7.0f}ms  "
+            f"errors={sum(m['errors'].values())}  sockets={m['open_sockets']} (peak {m['peak_sockets']})  "
+            f"rss {m['rss_growth_mb']:+.1f}MB  loop lag p99={m['loop_lag_p99_ms']:.1f}ms "
+            f"max={m['loop_lag_max_ms']:.1f}ms  model={upstream.get('model.requests', 0)} "
+            f"weather={upstream.get('weather.requests', 0)}" + (f"  {injected}" if injected else ""))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="*", help="subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--users", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=10, help="seconds per level")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between a user's requests (s)")
+    parser.add_argument("--model-latency", type=float, default=0.2, help="stand-in model latency (s)")
+    parser.add_argument("--weather-latency", type=float, default=0.05, help="stand-in OpenWeatherMap latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream requests failing with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction of upstream requests getting 429")
+    parser.add_argument("--rpm", type=float, help="model requests per minute before the stand-in answers 429")
+    parser.add_argument("--slo-ms", type=float, help="report the most users each scenario serves within this p95")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    stand_ins = StandIns(
+        Faults(args.model_latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate, rpm=args.rpm),
+        Faults(args.weather_latency, error_rate=args.error_rate, throttle_rate=args.throttle_rate),
+    )
+    base_url = stand_ins.start()
+    configure(base_url)
+    print(f"Stand-ins for Azure OpenAI and OpenWeatherMap at {base_url}")
+
+    results = {}
+    try:
+        for name, setup in SCENARIOS.items():
+            if args.scenarios and name not in args.scenarios:
+                continue
+            request = setup()
+            try:
+                request(-1)  # warm up: lazy imports, agent pools and connections
+            except Exception as e:
+                print(f"{name:<18} warm-up request failed: {type(e).__name__}: {e}")
+            results[name] = {}
+            for users in args.users:
+                metrics = run_level(request, users, args.duration, args.think, stand_ins)
+                results[name][str(users)] = metrics
+                print(format_level(name, metrics))
+                if metrics["errors"]:
+                    print(f"{'':<18} errors: {metrics['errors']}")
+    finally:
+        runtime.shutdown()
+        stand_ins.stop()
+
+    if args.slo_ms:
+        for name, levels in results.items():
+            within = [m["users"] for m in levels.values() if m["p95_ms"] <= args.slo_ms and not m["errors"]]
+            print(f"{name}: " + (f"up to {max(within)} users within p95 <= {args.slo_ms:.0f}ms"
+                                 if within else f"no tested level within p95 <= {args.slo_ms:.0f}ms"))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Scripted ChatCompletionClient for offline benchmarks and load tests.
+
+Replays scripted responses (text or tool calls) with configurable latency and
+token-count distributions, and counts calls and usage, so orchestration
+overhead can be measured without live model endpoints.
+"""
+import asyncio
+import json
+import random
+import uuid
+from itertools import cycle
+
+from autogen_core import FunctionCall
+from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage
+
+DEFAULT_MODEL_INFO = {
+    "vision": False,
+    "function_calling": True,
+    "json_output": True,
+    "structured_output": True,
+    "family": "unknown",
+}
+
+
+def estimate_tokens(value) -> int:
+    """Rough token count (~4 characters per token) for any message payload."""
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str)
+    return max(1, len(value) // 4)
+
+
+def call_all_tools(messages, tools):
+    """Responder that calls every tool once with the last user text as its argument."""
+    text = messages[-1].content if messages else ""
+    calls = []
+    for tool in tools:
+        schema = getattr(tool, "schema", tool)
+        required = schema.get("parameters", {}).get("required") or ["input"]
+        calls.append(FunctionCall(id=f"call_{uuid.uuid4().hex[:12]}", name=schema["name"],
+                                  arguments=json.dumps({required[0]: text})))
+    return calls
+
+
+class ScriptedChatCompletionClient(ChatCompletionClient):
+    """Fake model client.
+
+    Responses come from `responder(messages, tools)` when given, otherwise
+    from `script`, cycled. A response is a string or a list of FunctionCalls.
+    Latency is `latency` seconds with log-normal jitter plus `token_latency`
+    per completion token. Prompt tokens are estimated from the request;
+    completion tokens from the response, or drawn from `completion_tokens`
+    given as (mean, stddev).
+    """
+
+    def __init__(self, script=None, *, responder=None, latency: float = 0.05, jitter: float = 0.3,
+                 token_latency: float = 0.0, completion_tokens=None, model_info=None, seed=None):
+        self._script = cycle(script or ["OK"])
+        self._responder = responder
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.completion_tokens = completion_tokens
+        self._model_info = model_info or DEFAULT_MODEL_INFO
+        self._random = random.Random(seed)
+        self.calls = 0
+        self._total_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        self._actual_usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+
+    def _respond(self, messages, tools):
+        if self._responder is not None:
+            return self._responder(messages, tools)
+        return next(self._script)
+
+    def _usage(self, messages, tools, content) -> RequestUsage:
+        prompt = self.count_tokens(messages, tools=tools)
+        if self.completion_tokens is not None:
+            mean, stddev = self.completion_tokens
+            completion = max(1, int(self._random.gauss(mean, stddev)))
+        elif isinstance(content, str):
+            completion = estimate_tokens(content)
+        else:
+            completion = estimate_tokens([[call.name, call.arguments] for call in content])
+        return RequestUsage(prompt_tokens=prompt, completion_tokens=completion)
+
+    def _delay(self, usage: RequestUsage) -> float:
+        jitter = self._random.lognormvariate(0, self.jitter) if self.jitter else 1.0
+        return self.latency * jitter + self.token_latency * usage.completion_tokens
+
+    def _record(self, usage: RequestUsage) -> None:
+        self.calls += 1
+        self._actual_usage = usage
+        self._total_usage = RequestUsage(
+            prompt_tokens=self._total_usage.prompt_tokens + usage.prompt_tokens,
+            completion_tokens=self._total_usage.completion_tokens + usage.completion_tokens,
+        )
+
+    async def create(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                     extra_create_args={}, cancellation_token=None, **kwargs) -> CreateResult:
+        content = self._respond(messages, tools)
+        usage = self._usage(messages, tools, content)
+        await asyncio.sleep(self._delay(usage))
+        self._record(usage)
+        return CreateResult(
+            finish_reason="stop" if isinstance(content, str) else "function_calls",
+            content=content, usage=usage, cached=False,
+        )
+
+    async def create_stream(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                            extra_create_args={}, cancellation_token=None, **kwargs):
+        content = self._respond(messages, tools)
+        usage = self._usage(messages, tools, content)
+        if isinstance(content, str):
+            await asyncio.sleep(self.latency)
+            words = content.split(" ")
+            per_chunk = (self._delay(usage) - self.latency) / max(len(words), 1)
+            for i, word in enumerate(words):
+                await asyncio.sleep(max(per_chunk, 0))
+                yield word if i == 0 else " " + word
+        else:
+            await asyncio.sleep(self._delay(usage))
+        self._record(usage)
+        yield CreateResult(
+            finish_reason="stop" if isinstance(content, str) else "function_calls",
+            content=content, usage=usage, cached=False,
+        )
+
+    async def close(self) -> None:
+        pass
+
+    def actual_usage(self) -> RequestUsage:
+        return self._actual_usage
+
+    def total_usage(self) -> RequestUsage:
+        return self._total_usage
+
+    def count_tokens(self, messages, *, tools=[]) -> int:
+        payload = [m.model_dump() for m in messages]
+        tool_schemas = [getattr(t, "schema", t) for t in tools]
+        return estimate_tokens(payload) + (estimate_tokens(tool_schemas) if tool_schemas else 0)
+
+    def remaining_tokens(self, messages, *, tools=[]) -> int:
+        return 128000 - self.count_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self._model_info
+
+    @property
+    def model_info(self):
+        return self._model_info
+
@@ -0,0 +1,335 @@
+"""Client-side rate limiting for model clients that share one deployment quota.
+
+All apps talk to the same Azure OpenAI deployment, which enforces requests-
+and tokens-per-minute quotas. Without coordination, concurrent users all fire
+at once, get 429s and retry in lockstep. RateLimiter schedules requests
+instead:
+
+- token buckets for RPM and (estimated) TPM, refilled continuously;
+- a priority queue: interactive requests go ahead of batch jobs
+  (`with priority(BATCH): ...` around batch work that calls the model);
+- on a 429 every caller pauses for the server's Retry-After and the rate is
+  scaled down, then recovers gradually on success; rate-limit headers on the
+  error response (remaining/limit) resynchronize the buckets;
+- backpressure: at most `max_queue` requests wait; further callers block for
+  up to `queue_timeout` seconds and then get QueueFullError.
+
+runtime.get_client() wraps Azure clients when AZURE_OPENAI_RPM and/or
+AZURE_OPENAI_TPM are set; clients of the same deployment share one limiter.
+"""
+import asyncio
+import contextvars
+import email.utils
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from autogen_core.models import ChatCompletionClient, CreateResult
+
+INTERACTIVE = 0
+BATCH = 10
+
+_priority = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int):
+    """Model calls made inside this block (and tasks it starts) queue at `level`; lower goes first."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class QueueFullError(RuntimeError):
+    """Too many requests are already waiting for quota."""
+
+
+class TokenBucket:
+    """`per_minute` units per minute, refilled continuously, holding at most `burst` units."""
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.per_minute = per_minute
+        self.burst = burst or max(per_minute / 6, 1)  # Azure evaluates quotas over short windows
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float, scale: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.per_minute * scale / 60)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float, scale: float = 1.0) -> float:
+        self._refill(now, scale)
+        # A request larger than the burst goes through once the bucket is full
+        needed = min(amount, self.burst) - self.tokens
+        return 0.0 if needed <= 0 else needed * 60 / (self.per_minute * scale)
+
+    def take(self, amount: float) -> None:
+        # May go negative (e.g. actual usage above the estimate): later callers wait it off
+        self.tokens -= amount
+
+    def sync(self, remaining: float = None, limit: float = None) -> None:
+        if limit:
+            self.per_minute = limit
+            self.burst = max(limit / 6, 1)
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+
+
+def _duration(value: str) -> float:
+    """Seconds from '1.5', '20ms', '6m0s' or an HTTP date; None if unparseable."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = re.findall(r"([\d.]+)(ms|h|m|s)", value)
+    if parts:
+        unit = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+        return sum(float(n) * unit[u] for n, u in parts)
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(headers) -> float:
+    """Seconds to wait according to Retry-After style headers, or None."""
+    if not headers:
+        return None
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    waits = [_duration(headers.get(name)) for name in
+             ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    waits = [w for w in waits if w is not None]
+    return max(waits) if waits else None
+
+
+def _int(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    def __init__(self, rpm: float = None, tpm: float = None, *, max_queue: int = 256, queue_timeout: float = 60,
+                 min_scale: float = 0.1):
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.min_scale = min_scale
+        self.scale = 1.0  # multiplicative decrease on 429, additive increase on success
+        self.paused_until = 0.0
+        self.stats = {"admitted": 0, "rate_limited": 0, "queue_full": 0, "waited_s": 0.0}
+        self._seq = itertools.count()
+        self._loop = None
+
+    def _bind(self) -> None:
+        # Queue primitives belong to one event loop (the runtime's, or a benchmark's)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._heap = []
+            self._changed = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.max_queue)
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    def _wait_time(self, cost: float, now: float) -> float:
+        wait = self.paused_until - now
+        if self.requests:
+            wait = max(wait, self.requests.wait_time(1, now, self.scale))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(cost, now, self.scale))
+        return wait
+
+    async def _dispatch(self) -> None:
+        while True:
+            while not self._heap:
+                self._changed.clear()
+                await self._changed.wait()
+            _, _, cost, future = self._heap[0]
+            if future.done():  # caller gave up
+                heapq.heappop(self._heap)
+                continue
+            wait = self._wait_time(cost, time.monotonic())
+            if wait > 0:
+                # Re-check early if a higher-priority request arrives
+                self._changed.clear()
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(cost)
+            future.set_result(None)
+
+    async def acquire(self, cost: float) -> None:
+        """Wait until a request estimated at `cost` tokens may be sent."""
+        self._bind()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["queue_full"] += 1
+            raise QueueFullError(f"{self.max_queue} requests already waiting for model quota") from None
+        try:
+            future = self._loop.create_future()
+            heapq.heappush(self._heap, (_priority.get(), next(self._seq), cost, future))
+            self._changed.set()
+            await future
+        finally:
+            self._slots.release()
+        self.stats["admitted"] += 1
+        self.stats["waited_s"] += time.monotonic() - start
+
+    def settle(self, estimated: float, actual: float) -> None:
+        """Correct the token bucket once the real usage is known, and recover the rate."""
+        if self.tokens:
+            self.tokens.take(actual - estimated)
+        self.scale = min(1.0, self.scale + 0.02)
+
+    def throttled(self, headers) -> float:
+        """Record a 429: pause everyone, slow down, resync from headers. Returns the pause in seconds."""
+        self.stats["rate_limited"] += 1
+        self.scale = max(self.min_scale, self.scale * 0.7)
+        headers = headers or {}
+        if self.requests:
+            self.requests.sync(_int(headers, "x-ratelimit-remaining-requests"), _int(headers, "x-ratelimit-limit-requests"))
+        if self.tokens:
+            self.tokens.sync(_int(headers, "x-ratelimit-remaining-tokens"), _int(headers, "x-ratelimit-limit-tokens"))
+        pause = retry_after(headers)
+        if pause is None:
+            pause = 1.0
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._changed.set)
+        return pause
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key, rpm: float = None, tpm: float = None, **kwargs) -> RateLimiter:
+    """One limiter per quota (e.g. per Azure deployment), shared by every client using it."""
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = RateLimiter(rpm, tpm, **kwargs)
+        return limiter
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    # openai.RateLimitError (and any other HTTP client error exposing the status)
+    return getattr(error, "status_code", None) == 429
+
+
+def _is_transient(error: Exception) -> bool:
+    # 5xx responses, timeouts and dropped connections (openai.APIConnectionError and subclasses)
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status >= 500
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class RateLimitedChatCompletionClient(ChatCompletionClient):
+    """Sends every request through a RateLimiter and retries 429s after the server's Retry-After.
+
+    Transient errors (5xx, timeouts, connection errors) are retried with
+    exponential backoff too. This wrapper owns retries, so build the wrapped
+    client without its own (max_retries=0 for openai clients, as
+    runtime.get_client does); otherwise the attempts multiply.
+    """
+
+    def __init__(self, client: ChatCompletionClient, limiter: RateLimiter, *, max_retries: int = 5,
+                 expected_output_tokens: int = None):
+        self._client = client
+        self._limiter = limiter
+        self._max_retries = max_retries
+        create_args = dict(getattr(client, "_create_args", {}))
+        self._expected_output = expected_output_tokens or create_args.get("max_tokens") or 512
+
+    def _estimate(self, messages, tools) -> int:
+        try:
+            prompt = self._client.count_tokens(messages, tools=tools)
+        except Exception:
+            prompt = sum(len(str(getattr(m, "content", ""))) for m in messages) // 4
+        return prompt + self._expected_output
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        if _is_rate_limit(error):
+            response = getattr(error, "response", None)
+            return self._limiter.throttled(getattr(response, "headers", None))
+        # Same schedule as the openai SDK: 0.5s doubling up to 8s, with jitter
+        return min(0.5 * 2 ** attempt, 8.0) * random.uniform(0.75, 1.0)
+
+    async def create(self, messages, *, tools=[], **kwargs) -> CreateResult:
+        estimate = self._estimate(messages, tools)
+        for attempt in range(self._max_retries + 1):
+            await self._limiter.acquire(estimate)
+            try:
+                result = await self._client.create(messages, tools=tools, **kwargs)
+            except Exception as e:
+                if attempt == self._max_retries or not (_is_rate_limit(e) or _is_transient(e)):
+                    raise
+                await asyncio.sleep(self._backoff(e, attempt))
+                continue
+            self._limiter.settle(estimate, result.usage.prompt_tokens + result.usage.completion_tokens)
+            return result
+
+    async def create_stream(self, messages, *, tools=[], **kwargs):
+        estimate = self._estimate(messages, tools)
+        for attempt in range(self._max_retries + 1):
+            await self._limiter.acquire(estimate)
+            started = False
+            try:
+                async for chunk in self._client.create_stream(messages, tools=tools, **kwargs):
+                    started = True
+                    if isinstance(chunk, CreateResult):
+                        self._limiter.settle(estimate, chunk.usage.prompt_tokens + chunk.usage.completion_tokens)
+                    yield chunk
+                return
+            except Exception as e:
+                # Only retry before anything was streamed to the caller
+                if started or attempt == self._max_retries or not (_is_rate_limit(e) or _is_transient(e)):
+                    raise
+                await asyncio.sleep(self._backoff(e, attempt))
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def actual_usage(self):
+        return self._client.actual_usage()
+
+    def total_usage(self):
+        return self._client.total_usage()
+
+    def count_tokens(self, messages, *, tools=[]) -> int:
+        return self._client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages, *, tools=[]) -> int:
+        return self._client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self._client.capabilities
+
+    @property
+    def model_info(self):
+        return self._client.model_info
@@ -0,0 +1,273 @@
+"""Response cache for autogen ChatCompletionClients.
+
+Wrap any client (Azure OpenAI, OpenAI, Ollama, ...) so that identical requests
+(same messages, tools, model and parameters) are answered from an in-memory
+LRU, optionally backed by SQLite on disk, instead of calling the model again.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from autogen_core import CancellationToken
+from autogen_core.models import ChatCompletionClient, CreateResult, RequestUsage
+
+
+def _json_default(value):
+    # Images and other non-JSON payloads: use their base64 form when they have one
+    to_base64 = getattr(value, "to_base64", None)
+    return to_base64() if callable(to_base64) else repr(value)
+
+
+def _normalize(value):
+    """Strip surrounding whitespace from message text so trivially different prompts share a key."""
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+class ResponseCache:
+    """Two-level cache: in-memory LRU plus an optional SQLite store.
+
+    Entries expire after `ttl` seconds. The memory level is bounded by entry
+    count and total bytes; the disk level by total bytes (least recently used
+    rows are evicted first).
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 1000, max_bytes: int = 64 << 20,
+                 path: str = None, max_disk_bytes: int = 512 << 20):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires REAL NOT NULL, last_used REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+            self._db.commit()
+
+    def _remember(self, key: str, value: str, expires: float) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old[1])
+        self._memory[key] = (expires, value)
+        self._memory_bytes += len(value)
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes):
+            _, (_, evicted) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+                self._memory_bytes -= len(value)
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[1] > now:
+                    self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        expires = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, expires, last_used) "
+                    "VALUES (?, ?, ?, ?, ?)", (key, value, len(value), expires, now))
+                self._db.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+                total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+                if total > self.max_disk_bytes:
+                    # Drop least recently used rows until the store fits again
+                    excess = total - self.max_disk_bytes
+                    for row_key, size in self._db.execute(
+                            "SELECT key, size FROM responses ORDER BY last_used").fetchall():
+                        if excess <= 0:
+                            break
+                        self._db.execute("DELETE FROM responses WHERE key = ?", (row_key,))
+                        excess -= size
+                self._db.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._memory),
+            "bytes": self._memory_bytes,
+        }
+
+
+class _Flight:
+    """An upstream call shared by every concurrent identical request."""
+
+    def __init__(self, token: CancellationToken):
+        self.token = token
+        self.task = None
+        self.waiters = 0
+
+
+class CachedChatCompletionClient(ChatCompletionClient):
+    """ChatCompletionClient wrapper that serves repeated requests from a ResponseCache.
+
+    Concurrent identical requests share one upstream call. Cache hits come back
+    with `cached=True` and zero usage, since no tokens were billed for them.
+    """
+
+    def __init__(self, client: ChatCompletionClient, cache: ResponseCache, namespace: dict = None):
+        self._client = client
+        self._cache = cache
+        # Model name and create parameters (temperature, max_tokens, ...) are part of the key
+        self._namespace = namespace if namespace is not None else dict(getattr(client, "_create_args", {}))
+        self._inflight = {}
+
+    @property
+    def cache(self) -> ResponseCache:
+        return self._cache
+
+    def cache_key(self, messages, tools=(), tool_choice="auto", json_output=None, extra_create_args=None) -> str:
+        if json_output is not None and not isinstance(json_output, bool):
+            json_output = json_output.model_json_schema()
+        payload = {
+            "namespace": self._namespace,
+            "messages": _normalize([m.model_dump() for m in messages]),
+            "tools": [getattr(t, "schema", t) for t in tools],
+            "tool_choice": getattr(tool_choice, "name", tool_choice),
+            "json_output": json_output,
+            "extra_create_args": dict(extra_create_args or {}),
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=_json_default)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _from_cache(value: str) -> CreateResult:
+        result = CreateResult.model_validate_json(value)
+        result.cached = True
+        result.usage = RequestUsage(prompt_tokens=0, completion_tokens=0)
+        return result
+
+    async def create(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                     extra_create_args={}, cancellation_token=None, **kwargs) -> CreateResult:
+        key = self.cache_key(messages, tools, tool_choice, json_output, extra_create_args)
+        value = self._cache.get(key)
+        if value is not None:
+            return self._from_cache(value)
+        # Identical requests already in flight share the same upstream call. It has its
+        # own cancellation token, so one caller cancelling does not fail the others.
+        flight = self._inflight.get(key)
+        started = flight is None
+        if started:
+            flight = _Flight(CancellationToken())
+            flight.task = asyncio.ensure_future(self._create_and_store(
+                key, messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=flight.token, **kwargs))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        flight.waiters += 1
+        try:
+            waiter = asyncio.shield(flight.task)
+            if cancellation_token is not None:
+                cancellation_token.link_future(waiter)
+            result = await waiter
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # The last caller gave up: stop the upstream call instead of orphaning it
+                flight.token.cancel()
+                flight.task.cancel()
+        return result if started else self._from_cache(result.model_dump_json())
+
+    async def _create_and_store(self, key, messages, **kwargs) -> CreateResult:
+        result = await self._client.create(messages, **kwargs)
+        self._cache.set(key, result.model_dump_json())
+        return result
+
+    async def create_stream(self, messages, *, tools=[], tool_choice="auto", json_output=None,
+                            extra_create_args={}, cancellation_token=None, **kwargs):
+        key = self.cache_key(messages, tools, tool_choice, json_output, extra_create_args)
+        value = self._cache.get(key)
+        if value is not None:
+            result = self._from_cache(value)
+            if isinstance(result.content, str) and result.content:
+                yield result.content
+            yield result
+            return
+        async for chunk in self._client.create_stream(
+                messages, tools=tools, tool_choice=tool_choice, json_output=json_output,
+                extra_create_args=extra_create_args, cancellation_token=cancellation_token, **kwargs):
+            if isinstance(chunk, CreateResult):
+                self._cache.set(key, chunk.model_dump_json())
+            yield chunk
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def actual_usage(self) -> RequestUsage:
+        return self._client.actual_usage()
+
+    def total_usage(self) -> RequestUsage:
+        return self._client.total_usage()
+
+    def count_tokens(self, messages, *, tools=[]) -> int:
+        return self._client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages, *, tools=[]) -> int:
+        return self._client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self._client.capabilities
+
+    @property
+    def model_info(self):
+        return self._client.model_info
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache configured from MODEL_CACHE_* environment variables."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                ttl=float(os.getenv("MODEL_CACHE_TTL", "3600")),
+                max_entries=int(os.getenv("MODEL_CACHE_SIZE", "1000")),
+                max_bytes=int(os.getenv("MODEL_CACHE_MAX_BYTES", str(64 << 20))),
+                path=os.getenv("MODEL_CACHE_PATH") or None,
+            )
+        return _cache
@@ -0,0 +1,370 @@
+"""Process-wide async runtime shared by the Streamlit apps.
+
+Streamlit re-executes the app script on every interaction, but imported
+modules stay loaded. Keeping the event loop, model clients and connection
+pools here means they are created once per process and reused across
+reruns and sessions instead of being rebuilt (and leaked) per click.
+
+The same goes for settings (.env is read once), the heavy autogen imports
+(deferred until an app first needs them, and optionally prewarmed in the
+background so the page renders first) and agents/teams (built once per
+configuration by pool() and reset between uses). startup_summary() reports
+what the imports and startup cost.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import importlib
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+
+import tracing
+
+_lock = threading.Lock()
+_loop = None
+_thread = None
+_clients = {}
+_shutdown_hooks = []
+_client_factory = None
+_pools = {}
+_started = time.perf_counter()
+# Seconds spent on one-off startup work (imports, .env), by name
+timings = {}
+
+
+@contextmanager
+def timed(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.setdefault(name, time.perf_counter() - start)
+
+
+def load(module: str, attr: str = None):
+    """Import `module` (and return `attr` from it) on first use, recording how long the import took."""
+    with timed(f"import {module}"):
+        loaded = importlib.import_module(module)
+    return getattr(loaded, attr) if attr else loaded
+
+
+def prewarm(*modules: str) -> None:
+    """Import heavy modules in a background thread so the first request does not wait for them."""
+    missing = [m for m in modules if f"import {m}" not in timings]
+    if missing:
+        threading.Thread(target=lambda: [load(m) for m in missing], name="agent-prewarm", daemon=True).start()
+
+
+@dataclass(frozen=True)
+class AzureSettings:
+    api_key: str
+    endpoint: str
+    api_version: str
+    model: str
+    deployment: str
+
+
+@lru_cache(maxsize=None)
+def settings() -> AzureSettings:
+    """Load .env once per process (not on every Streamlit rerun) and return the Azure OpenAI settings.
+
+    Variables already set in the environment take precedence over .env (no
+    override). app6-app9 used to load .env with override=True; exporting a
+    variable now wins for every app, which is what lets loadtest.py and
+    deployments point the apps elsewhere without editing .env.
+    """
+    with timed("load .env"):
+        from dotenv import load_dotenv
+
+        load_dotenv()
+    return AzureSettings(
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        model=os.getenv("AZURE_OPENAI_MODEL"),
+        deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+    )
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the long-lived event loop, starting its thread on first use."""
+    global _loop, _thread
+    with _lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            _thread = threading.Thread(target=_loop.run_forever, name="agent-runtime-loop", daemon=True)
+            _thread.start()
+        return _loop
+
+
+def run(coro, timeout=None):
+    """Run a coroutine on the shared loop and block until it finishes.
+
+    Raises TimeoutError (and cancels the coroutine) if it takes longer than `timeout`.
+    """
+    loop = get_loop()
+    if threading.current_thread() is _thread:
+        raise RuntimeError("runtime.run() called from the runtime loop; await the coroutine instead")
+    if os.getenv("AGENT_PROFILE_SLOW_MS"):
+        coro = tracing.profiled(coro)
+    if timeout is not None:
+        coro = asyncio.wait_for(coro, timeout=timeout)
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def iterate(agen, timeout=None):
+    """Drive an async generator on the shared loop, yielding its items in the caller's thread.
+
+    Streamlit elements can only be written from the script thread, so UIs that
+    render results as they arrive consume them through this bridge.
+    """
+    loop = get_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+
+    async def _next():
+        remaining = None if deadline is None else max(deadline - loop.time(), 0)
+        try:
+            return False, await asyncio.wait_for(agen.__anext__(), timeout=remaining)
+        except StopAsyncIteration:
+            return True, None
+
+    try:
+        while True:
+            done, item = asyncio.run_coroutine_threadsafe(_next(), loop).result()
+            if done:
+                return
+            yield item
+    finally:
+        # Stopping early (or a timeout) cancels whatever the generator is still awaiting
+        try:
+            asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+        except (asyncio.CancelledError, concurrent.futures.CancelledError):
+            pass  # the generator ended by cancelling its own work, which is what closing asks for
+
+
+def set_client_factory(factory) -> None:
+    """Build every model client with `factory(cls, **kwargs)` instead of `cls(**kwargs)`.
+
+    Used by the benchmark and load-test tools to swap in scripted clients.
+    Pass None to restore the real clients. Pooled agents are dropped too.
+    """
+    global _client_factory
+    with _lock:
+        _client_factory = factory
+        _clients.clear()
+        _pools.clear()
+
+
+# Client arguments that are credentials, or objects with no stable value, and so not part of a cache key
+_UNKEYED_ARGS = ("api_key", "azure_ad_token", "azure_ad_token_provider", "http_client", "default_headers")
+
+
+def get_client(cls, cache: bool = True, **kwargs):
+    """Return a model client of `cls` built once per distinct configuration.
+
+    With MODEL_CACHE=1 (and `cache` left True), the client is wrapped in a
+    CachedChatCompletionClient so identical requests skip the model. It is
+    off by default: sampled replies (temperature > 0) would otherwise be
+    frozen to the first answer for MODEL_CACHE_TTL seconds. Unless
+    AGENT_TRACING=0, every call is also recorded as a tracing span. Azure
+    clients are rate limited when AZURE_OPENAI_RPM / AZURE_OPENAI_TPM are set,
+    with one shared limiter per deployment (cache hits skip the limiter).
+    """
+    cache = cache and os.getenv("MODEL_CACHE", "0") == "1"
+    traced = os.getenv("AGENT_TRACING", "1") != "0"
+    key = (cls.__module__, cls.__qualname__, cache, traced, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            # The wrappers import autogen_core, so load them with the first client
+            from rate_limiter import RateLimitedChatCompletionClient, get_rate_limiter
+            from response_cache import CachedChatCompletionClient, get_response_cache
+            from traced_client import TracedChatCompletionClient
+
+            rpm, tpm = os.getenv("AZURE_OPENAI_RPM"), os.getenv("AZURE_OPENAI_TPM")
+            limited = bool(rpm or tpm) and cls.__name__ == "AzureOpenAIChatCompletionClient"
+            # The rate limiter does the retrying; SDK retries on top would multiply the attempts
+            build_kwargs = {"max_retries": 0, **kwargs} if limited else kwargs
+            client = _client_factory(cls, **build_kwargs) if _client_factory else cls(**build_kwargs)
+            if limited:
+                deployment = (kwargs.get("azure_endpoint"), kwargs.get("azure_deployment") or kwargs.get("model"))
+                limiter = get_rate_limiter(deployment, rpm=float(rpm) if rpm else None,
+                                           tpm=float(tpm) if tpm else None)
+                client = RateLimitedChatCompletionClient(client, limiter)
+            if cache:
+                # Keyed on the configuration, not the wrapped client: the rate limiter has no create args
+                namespace = {"client": cls.__qualname__, **{k: v for k, v in kwargs.items() if k not in _UNKEYED_ARGS}}
+                client = CachedChatCompletionClient(client, get_response_cache(), namespace=namespace)
+            if traced:
+                client = TracedChatCompletionClient(client, model=kwargs.get("model"))
+            _clients[key] = client
+        return client
+
+
+def azure_client(**overrides):
+    """The shared Azure OpenAI client for the .env settings (see get_client)."""
+    config = settings()
+    cls = load("autogen_ext.models.openai", "AzureOpenAIChatCompletionClient")
+    kwargs = dict(model=config.model, api_key=config.api_key, azure_endpoint=config.endpoint,
+                  azure_deployment=config.deployment, api_version=config.api_version)
+    kwargs.update(overrides)
+    return get_client(cls, **kwargs)
+
+
+async def _reset(obj) -> None:
+    if isinstance(obj, dict):
+        obj = list(obj.values())
+    if isinstance(obj, (list, tuple)):
+        for item in obj:
+            await _reset(item)
+    elif hasattr(obj, "reset"):  # teams (also reset their agents and termination)
+        await obj.reset()
+    elif hasattr(obj, "on_reset"):  # agents
+        from autogen_core import CancellationToken
+
+        await obj.on_reset(CancellationToken())
+
+
+class Pool:
+    """Reusable agents or teams of one configuration.
+
+    Agents keep conversation state, so one instance must not serve two
+    requests at once. lease() hands out an idle instance (building one only
+    when none is free), reset just before reuse so per-run timers such as
+    TimeoutTermination start with the request. Instances whose request
+    failed (or timed out) are discarded.
+    """
+
+    def __init__(self, build, max_idle: int = 16):
+        self._build = build
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self.max_idle = max_idle
+        self.built = 0
+        self.leases = 0
+
+    @asynccontextmanager
+    async def lease(self):
+        with self._lock:
+            self.leases += 1
+            obj = self._idle.pop() if self._idle else None
+        while obj is not None:
+            try:
+                await _reset(obj)
+                break
+            except Exception:
+                with self._lock:
+                    obj = self._idle.pop() if self._idle else None
+        if obj is None:
+            obj = self._build()
+            with self._lock:
+                self.built += 1
+        try:
+            yield obj
+        except GeneratorExit:
+            # A stream consumer stopped early (e.g. at the final answer): the run
+            # was closed cleanly, so the instance can be reused
+            self._release(obj)
+            raise
+        # Only reached when the request succeeded
+        self._release(obj)
+
+    def _release(self, obj) -> None:
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(obj)
+
+
+@asynccontextmanager
+async def team_stream(team, task):
+    """team.run_stream(task=task), closed (and its run cancelled) when the block exits.
+
+    Lets a consumer stop reading early, e.g. at the final answer, without
+    leaving the team's stream for the garbage collector to finalize; the
+    team can then be reset and reused.
+    """
+    from autogen_core import CancellationToken
+
+    cancellation = CancellationToken()
+    stream = team.run_stream(task=task, cancellation_token=cancellation)
+    try:
+        yield stream
+    finally:
+        cancellation.cancel()
+        try:
+            await stream.aclose()
+        except asyncio.CancelledError:
+            # Raised by the run we just cancelled; only propagate a cancellation of this task
+            if asyncio.current_task().cancelling():
+                raise
+
+
+def pool(name: str, build, **config) -> Pool:
+    """The Pool of `build()` results for `name` and `config`, created once per process."""
+    key = (name, tuple(sorted((k, repr(v)) for k, v in config.items())))
+    with _lock:
+        existing = _pools.get(key)
+        if existing is None:
+            existing = _pools[key] = Pool(build)
+        return existing
+
+
+def startup_summary() -> str:
+    """One line on import/startup cost and agent reuse, for a sidebar caption or log."""
+    imports = sum(v for k, v in timings.items() if k.startswith("import "))
+    dotenv_ms = timings.get("load .env", 0) * 1000
+    built = sum(p.built for p in _pools.values())
+    leases = sum(p.leases for p in _pools.values())
+    return (f"Process up {time.perf_counter() - _started:.0f}s · imports {imports:.2f}s · "
+            f".env {dotenv_ms:.1f}ms · agents/teams built {built} for {leases} requests")
+
+
+def on_shutdown(close_fn) -> None:
+    """Register an async close function (e.g. an aiohttp session's) to await at exit."""
+    with _lock:
+        if close_fn not in _shutdown_hooks:
+            _shutdown_hooks.append(close_fn)
+
+
+async def aclose():
+    """Close every shared client and pool; await this when driving the apps from your own loop."""
+    closers = [client.close for client in _clients.values()] + list(_shutdown_hooks)
+    results = await asyncio.gather(*(close() for close in closers), return_exceptions=True)
+    _clients.clear()
+    _shutdown_hooks.clear()
+    return results
+
+
+async def _cancel_background_tasks():
+    # e.g. a rate limiter's dispatcher; lets them finish before the loop stops
+    tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def shutdown(timeout: float = 10) -> None:
+    """Close every client and pool, then stop the loop thread."""
+    global _loop, _thread
+    with _lock:
+        loop, thread = _loop, _thread
+    if loop is None or loop.is_closed():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(aclose(), loop).result(timeout)
+        asyncio.run_coroutine_threadsafe(_cancel_background_tasks(), loop).result(timeout)
+    except Exception:
+        pass
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout)
+    loop.close()
+    with _lock:
+        _loop = _thread = None
+
+
+atexit.register(shutdown)
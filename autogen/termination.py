@@ -0,0 +1,73 @@
+"""Hard usage caps for autogen teams, in the spirit of pydantic-ai's UsageLimits.
+
+Teams that only stop on a sentinel ("APPROVE", "FINAL_ANSWER", ...) keep
+cycling, and paying for tokens, when the model never says it. Combine the
+sentinel with caps on turns, tokens and elapsed time so the run always ends,
+and summarize what it used from the per-message model usage.
+"""
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class TeamUsageLimits:
+    turn_limit: Optional[int] = None  # messages, including the task message
+    prompt_tokens_limit: Optional[int] = None
+    completion_tokens_limit: Optional[int] = None
+    total_tokens_limit: Optional[int] = None
+    time_limit: Optional[float] = None  # seconds since the run started
+
+    def termination(self, sentinel=None):
+        """Sentinel text (or condition) OR any of the configured caps.
+
+        With sentinel=None only the caps apply; returns None if there are none.
+        """
+        # Imported here so apps can define their limits before autogen_agentchat is loaded
+        from autogen_agentchat.conditions import (
+            MaxMessageTermination,
+            TextMentionTermination,
+            TimeoutTermination,
+            TokenUsageTermination,
+        )
+
+        conditions = [TextMentionTermination(sentinel) if isinstance(sentinel, str) else sentinel]
+        if self.turn_limit is not None:
+            conditions.append(MaxMessageTermination(self.turn_limit))
+        if any(limit is not None for limit in
+               (self.prompt_tokens_limit, self.completion_tokens_limit, self.total_tokens_limit)):
+            # Reads models_usage from every model response in the team
+            conditions.append(TokenUsageTermination(
+                max_total_token=self.total_tokens_limit,
+                max_prompt_token=self.prompt_tokens_limit,
+                max_completion_token=self.completion_tokens_limit,
+            ))
+        if self.time_limit is not None:
+            conditions.append(TimeoutTermination(self.time_limit))
+        condition = None
+        for each in conditions:
+            if each is not None:
+                condition = each if condition is None else condition | each
+        return condition
+
+
+def usage_summary(messages, stop_reason: str = None, sentinel: str = None) -> dict:
+    """Token usage and turn count of a (possibly partial) transcript.
+
+    With `sentinel`, `stopped_early` tells whether a cap ended the run instead.
+    """
+    prompt_tokens = completion_tokens = model_calls = 0
+    for message in messages:
+        usage = getattr(message, "models_usage", None)
+        if usage is not None:
+            model_calls += 1
+            prompt_tokens += usage.prompt_tokens
+            completion_tokens += usage.completion_tokens
+    return {
+        "turns": sum(1 for m in messages if getattr(m, "source", "user") != "user"),
+        "model_calls": model_calls,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "stop_reason": stop_reason,
+        "stopped_early": bool(sentinel and stop_reason and sentinel not in stop_reason),
+    }
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The apps import their helper modules as top-level modules (run from autogen/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
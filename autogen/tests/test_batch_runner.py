@@ -0,0 +1,95 @@
+import asyncio
+import json
+
+import pytest
+
+from batch_runner import BatchStats, ResultWriter, percentile, read_sentences, run_batch
+
+
+def collect(items, worker, concurrency=4):
+    async def main():
+        return [item async for item in run_batch(items, worker, concurrency)]
+    return asyncio.run(main())
+
+
+def test_runs_every_item_within_the_concurrency_bound():
+    running, peak = 0, 0
+
+    async def worker(n):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01 * (n % 3))
+        running -= 1
+        return n * n
+
+    results = collect(range(20), worker, concurrency=4)
+    assert sorted((r.index, r.output) for r in results) == [(n, n * n) for n in range(20)]
+    assert peak == 4
+
+
+def test_worker_errors_are_recorded_per_item():
+    async def worker(n):
+        if n == 2:
+            raise ValueError("bad item")
+        return n
+
+    results = {r.index: r for r in collect(range(4), worker)}
+    assert results[2].error == "ValueError: bad item" and results[2].output is None
+    assert [results[i].error for i in (0, 1, 3)] == [None, None, None]
+
+
+def test_failing_input_is_reraised_after_the_items_already_read():
+    def items():
+        yield from range(3)
+        raise OSError("input file went away")
+
+    async def worker(n):
+        return n
+
+    done = []
+
+    async def main():
+        async for item in run_batch(items(), worker, concurrency=2):
+            done.append(item.index)
+
+    with pytest.raises(OSError, match="went away"):
+        asyncio.run(asyncio.wait_for(main(), timeout=5))
+    assert sorted(done) == [0, 1, 2]
+
+
+def test_stats_and_percentiles():
+    assert percentile([], 50) == 0.0
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2, 3, 4, 5], 99) == 5
+    stats = BatchStats()
+    for latency in (0.1, 0.2, 0.3):
+        stats.add(type("Item", (), {"latency": latency, "error": None})())
+    summary = stats.summary()
+    assert summary["items"] == 3 and summary["errors"] == 0
+    assert summary["p50_ms"] == pytest.approx(200)
+
+
+def test_read_sentences_skips_unreadable_jsonl_lines():
+    text = '{"text": "Hello"}\n"Bare string"\n\n{"title": "no text"}\nnot json\n{"text": "Bye"}\n'
+    sentences, skipped = read_sentences("batch.jsonl", text)
+    assert sentences == ["Hello", "Bare string", "Bye"]
+    assert skipped[0] == 'line 4: no "text" field'
+    assert skipped[1].startswith("line 5: invalid JSON")
+
+
+def test_read_sentences_txt_and_csv():
+    assert read_sentences("a.txt", "one\n\n two \n") == (["one", " two "], [])
+    assert read_sentences("a.csv", 'first,x\n"with, comma",y\n,z\n') == (["first", "with, comma"], [])
+
+
+def test_result_writer(tmp_path):
+    async def worker(text):
+        return {"upper": text.upper()}
+
+    path = tmp_path / "out.jsonl"
+    with ResultWriter(str(path)) as writer:
+        for item in collect(["a"], worker):
+            writer.write(item)
+    row = json.loads(path.read_text(encoding="utf-8"))
+    assert row["input"] == "a" and row["upper"] == "A" and row["error"] is None
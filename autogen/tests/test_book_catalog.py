@@ -0,0 +1,41 @@
+import json
+import os
+
+from book_catalog import BookCatalog, normalize_key, page
+
+
+def write(path, books):
+    path.write_text(json.dumps(books), encoding="utf-8")
+
+
+def test_lookups_are_normalized(tmp_path):
+    path = tmp_path / "books.json"
+    write(path, [{"title": "Emma", "author": "Jane  Austen", "category": "Novel"},
+                 {"title": "Dune", "author": "Frank Herbert", "category": "Science Fiction"}])
+    catalog = BookCatalog(str(path))
+    assert [b["title"] for b in catalog.by_author("jane austen")] == ["Emma"]
+    assert [b["title"] for b in catalog.by_category(" SCIENCE fiction ")] == ["Dune"]
+    assert catalog.by_author("Nobody") == []
+    assert normalize_key("Ｊａｎｅ") == "jane"
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "books.json"
+    write(path, [{"title": "Emma", "author": "Jane Austen"}])
+    catalog = BookCatalog(str(path))
+    assert len(catalog.by_author("Jane Austen")) == 1
+    write(path, [{"title": "Emma", "author": "Jane Austen"}, {"title": "Persuasion", "author": "Jane Austen"}])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert len(catalog.by_author("Jane Austen")) == 2
+
+
+def test_pages_follow_the_cursor():
+    books = [{"title": f"Book {i}"} for i in range(5)]
+    first = page(books, "", page_size=2)
+    second = page(books, first["next_cursor"], page_size=2)
+    last = page(books, second["next_cursor"], page_size=2)
+    assert [b["title"] for p in (first, second, last) for b in p["books"]] == [b["title"] for b in books]
+    assert last["next_cursor"] is None
+    assert page(books, "abc") == {"books": [], "next_cursor": None}
+    assert page([], "") == {"books": [], "next_cursor": None}
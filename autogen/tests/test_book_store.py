@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from book_store import BookStore, import_books, iter_json_array
+
+BOOKS = [
+    {"title": "Dune", "author": "Frank Herbert", "year": 1965, "rating": -1.5e-3},
+    {"title": "Emma", "author": "Jane Austen", "tags": ["a", "b"], "price": 12345},
+    {"title": "Persuasion", "author": "Jane Austen", "category": "Novel"},
+    17,
+]
+
+
+def write(tmp_path, text):
+    path = tmp_path / "books.json"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_iter_json_array_across_chunk_boundaries(tmp_path, chunk_size):
+    path = write(tmp_path, json.dumps(BOOKS, indent=1))
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == BOOKS
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "[\n]"])
+def test_iter_json_array_empty(tmp_path, text):
+    assert list(iter_json_array(write(tmp_path, text), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("text", ["{}", "[1 2]", "[1,]", "[,1]", "[1", "[1,2"])
+def test_iter_json_array_rejects_malformed_input(tmp_path, text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(write(tmp_path, text), chunk_size=1))
+
+
+@pytest.fixture
+def store(tmp_path):
+    books = [{"title": f"Book {i}", "author": "Jane Austen" if i % 2 else "Frank Herbert",
+              "category": "Novel"} for i in range(7)]
+    db_path = str(tmp_path / "books.db")
+    import_books(write(tmp_path, json.dumps(books)), db_path)
+    return BookStore(db_path, page_size=2)
+
+
+def test_pages_follow_the_cursor(store):
+    titles, cursor = [], ""
+    while True:
+        page = store.by_author("jane austen", cursor)
+        titles += [book["title"] for book in page["books"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert titles == ["Book 1", "Book 3", "Book 5"]
+
+
+@pytest.mark.parametrize("cursor", ["abc", "-1", "1.5", "١"])
+def test_invalid_cursor_is_an_empty_page(store, cursor):
+    assert store.by_category("Novel", cursor) == {"books": [], "next_cursor": None}
@@ -0,0 +1,50 @@
+import asyncio
+
+from autogen_core.models import AssistantMessage, SystemMessage, UserMessage
+
+from draft_context import DraftCompactingContext
+
+
+def conversation(rounds):
+    messages = [SystemMessage(content="You write poems."), UserMessage(content="Write a poem.", source="user")]
+    for i in range(1, rounds + 1):
+        messages.append(AssistantMessage(content=f"Draft number {i}. " + "verse " * 40, source="assistant"))
+        messages.append(UserMessage(content=f"No, try again ({i}).", source="user"))
+    return messages
+
+
+def compact(messages, **kwargs):
+    async def main():
+        context = DraftCompactingContext(initial_messages=messages, **kwargs)
+        return await context.get_messages()
+    return asyncio.run(main())
+
+
+def test_single_draft_is_sent_as_is():
+    messages = conversation(1)
+    assert compact(messages) == messages
+
+
+def test_older_drafts_become_a_summary():
+    messages = conversation(6)
+    compacted = compact(messages, summary_drafts=2)
+    assert compacted[:2] == messages[:2]
+    assert compacted[-2:] == messages[-2:]
+    summary = compacted[2].content
+    assert summary.startswith("5 earlier draft(s) were rejected")
+    assert "Draft 4:" in summary and "Draft 5:" in summary and "Draft 3:" not in summary
+    assert "No, try again (5)." in summary
+
+
+def test_summary_is_shortened_to_fit():
+    messages = conversation(6)
+    fits_header_only = sum(len(m.content) // 4 + 4 for m in messages[:2] + messages[-2:]) + 25
+    compacted = compact(messages, summary_drafts=3, token_limit=fits_header_only)
+    # keep=0: only the header line of the summary is left
+    assert compacted[2].source == "context_summary"
+    assert compacted[2].content == "5 earlier draft(s) were rejected. Write something different from them."
+
+
+def test_summary_is_dropped_when_nothing_fits():
+    messages = conversation(6)
+    assert compact(messages, token_limit=1) == messages[:2] + messages[-2:]
@@ -0,0 +1,40 @@
+import asyncio
+import time
+
+from rate_limiter import BATCH, RateLimiter, priority, retry_after
+
+
+def test_interactive_requests_go_ahead_of_batch():
+    async def main():
+        limiter = RateLimiter(rpm=600)
+        limiter.requests.tokens = 0  # next request is admitted after ~0.1s
+        order = []
+
+        async def request(name):
+            await limiter.acquire(1)
+            order.append(name)
+
+        # Tasks started inside the block inherit its priority
+        with priority(BATCH):
+            batch = [asyncio.create_task(request(f"batch{i}")) for i in range(3)]
+        await asyncio.sleep(0.01)
+        interactive = asyncio.create_task(request("interactive"))
+        await asyncio.gather(*batch, interactive)
+        return order
+
+    assert asyncio.run(main()) == ["interactive", "batch0", "batch1", "batch2"]
+
+
+def test_throttled_pauses_and_slows_down():
+    limiter = RateLimiter(rpm=60)
+    pause = limiter.throttled({"retry-after-ms": "250", "x-ratelimit-limit-requests": "120"})
+    assert pause == 0.25
+    assert limiter.paused_until > time.monotonic()
+    assert limiter.scale < 1.0
+    assert limiter.requests.per_minute == 120
+
+
+def test_retry_after():
+    assert retry_after({"retry-after": "2"}) == 2.0
+    assert retry_after({"x-ratelimit-reset-tokens": "6m0s", "retry-after": "1"}) == 360.0
+    assert retry_after({}) is None
@@ -0,0 +1,72 @@
+import asyncio
+
+from autogen_core import CancellationToken
+from autogen_core.models import UserMessage
+
+import runtime
+from mock_client import ScriptedChatCompletionClient
+from response_cache import CachedChatCompletionClient, ResponseCache
+
+
+class AzureOpenAIChatCompletionClient:
+    """Stands in for the real class: runtime.get_client only looks at its name."""
+
+
+def ask(client, text, cancellation_token=None):
+    return client.create([UserMessage(content=text, source="user")], cancellation_token=cancellation_token)
+
+
+def test_repeated_request_is_served_from_cache():
+    async def main():
+        upstream = ScriptedChatCompletionClient(["first", "second"], latency=0)
+        client = CachedChatCompletionClient(upstream, ResponseCache())
+        first = await ask(client, "What is a Sun?")
+        again = await ask(client, "  What is a Sun?  ")
+        other = await ask(client, "What is a Moon?")
+        return upstream.calls, first, again, other
+
+    calls, first, again, other = asyncio.run(main())
+    assert calls == 2
+    assert again.content == first.content == "first" and again.cached
+    assert again.usage.prompt_tokens == again.usage.completion_tokens == 0
+    assert other.content == "second"
+
+
+def test_concurrent_requests_share_one_call_and_survive_a_cancelled_waiter():
+    async def main():
+        upstream = ScriptedChatCompletionClient(["answer"], latency=0.05, jitter=0)
+        client = CachedChatCompletionClient(upstream, ResponseCache())
+        token = CancellationToken()
+        leaving = asyncio.ensure_future(ask(client, "hello", token))
+        staying = [asyncio.ensure_future(ask(client, "hello")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        token.cancel()
+        results = await asyncio.gather(*staying)
+        assert leaving.cancelled()
+        return upstream.calls, results
+
+    calls, results = asyncio.run(main())
+    assert calls == 1
+    assert [r.content for r in results] == ["answer"] * 3
+
+
+def test_clients_of_different_models_do_not_share_entries(monkeypatch):
+    monkeypatch.setenv("MODEL_CACHE", "1")
+    monkeypatch.setenv("AGENT_TRACING", "0")
+    # Rate limited clients wrap the raw client before the cache sees it
+    monkeypatch.setenv("AZURE_OPENAI_RPM", "6000")
+    runtime.set_client_factory(lambda cls, **kwargs: ScriptedChatCompletionClient(
+        [f"{kwargs['model']} at {kwargs.get('temperature')}"], latency=0))
+    try:
+        configs = [dict(model="gpt-4o", azure_deployment="a"), dict(model="gpt-4o-mini", azure_deployment="b"),
+                   dict(model="gpt-4o", azure_deployment="a", temperature=0.9)]
+        clients = [runtime.get_client(AzureOpenAIChatCompletionClient, api_key="key", **config)
+                   for config in configs]
+
+        async def main():
+            return [(await ask(client, "Same prompt for everyone")).content for client in clients]
+
+        assert asyncio.run(main()) == ["gpt-4o at None", "gpt-4o-mini at None", "gpt-4o at 0.9"]
+        assert len({client.cache_key([UserMessage(content="x", source="user")]) for client in clients}) == 3
+    finally:
+        runtime.set_client_factory(None)
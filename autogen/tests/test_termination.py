@@ -0,0 +1,54 @@
+import asyncio
+
+from autogen_agentchat.messages import TextMessage
+from autogen_core.models import RequestUsage
+
+from termination import TeamUsageLimits, usage_summary
+
+
+def reply(text, prompt_tokens=0, completion_tokens=0, source="assistant"):
+    return TextMessage(content=text, source=source,
+                       models_usage=RequestUsage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+
+
+def feed(condition, messages):
+    """The first stop message `condition` returns while fed `messages` one at a time, or None."""
+    async def main():
+        for message in messages:
+            stop = await condition([message])
+            if stop is not None:
+                return stop
+    return asyncio.run(main())
+
+
+def test_sentinel_stops_the_run():
+    condition = TeamUsageLimits(turn_limit=10).termination("APPROVE")
+    assert feed(condition, [reply("draft"), reply("APPROVE")]) is not None
+
+
+def test_turn_limit():
+    condition = TeamUsageLimits(turn_limit=3).termination("APPROVE")
+    stop = feed(condition, [reply(f"draft {i}") for i in range(5)])
+    assert "Maximum number of messages 3" in stop.content
+
+
+def test_token_limit():
+    condition = TeamUsageLimits(total_tokens_limit=100).termination("APPROVE")
+    stop = feed(condition, [reply("a", 40, 10), reply("b", 40, 20)])
+    assert "Token usage limit" in stop.content
+
+
+def test_caps_without_a_sentinel():
+    assert TeamUsageLimits().termination() is None
+    condition = TeamUsageLimits(turn_limit=2).termination()
+    assert feed(condition, [reply("APPROVE")]) is None
+    assert feed(condition, [reply("x")]) is not None
+
+
+def test_usage_summary():
+    messages = [TextMessage(content="task", source="user"), reply("a", 10, 5), reply("b", 20, 5)]
+    summary = usage_summary(messages, "Maximum number of messages 3 reached", "APPROVE")
+    assert summary["turns"] == 2 and summary["model_calls"] == 2
+    assert (summary["prompt_tokens"], summary["completion_tokens"], summary["total_tokens"]) == (30, 10, 40)
+    assert summary["stopped_early"]
+    assert not usage_summary(messages, "Text 'APPROVE' mentioned", "APPROVE")["stopped_early"]
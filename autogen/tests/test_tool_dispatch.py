@@ -0,0 +1,59 @@
+import asyncio
+
+from autogen_agentchat.messages import TextMessage
+from autogen_core import CancellationToken
+
+from mock_client import ScriptedChatCompletionClient
+from tool_dispatch import DirectToolAgent, parse_tool_call
+
+
+async def lookup(city: str) -> str:
+    """Look up a city."""
+    return f"sunny in {city}"
+
+
+async def broken(city: str) -> str:
+    """Always fails."""
+    raise RuntimeError(f"no data for {city}")
+
+
+def ask(agent, text):
+    async def main():
+        return await agent.on_messages([TextMessage(content=text, source="user")], CancellationToken())
+    return asyncio.run(main())
+
+
+def make_agent(client=None):
+    return DirectToolAgent(name="assistant", model_client=client or ScriptedChatCompletionClient(latency=0),
+                           tools=[lookup, broken])
+
+
+def test_parse_tool_call():
+    tools = {tool.name: tool for tool in make_agent()._direct_tools.values()}
+    assert parse_tool_call("lookup:London", tools)[1] == {"city": "London"}
+    assert parse_tool_call('lookup:{"city": "Paris"}', tools)[1] == {"city": "Paris"}
+    assert parse_tool_call("unknown:London", tools) is None
+    assert parse_tool_call("lookup:{not json", tools) is None
+    assert parse_tool_call("What is the weather in London?", tools) is None
+
+
+def test_direct_call_skips_the_model():
+    client = ScriptedChatCompletionClient(latency=0)
+    response = ask(make_agent(client), "lookup:London")
+    assert response.chat_message.content == "sunny in London"
+    assert client.calls == 0
+
+
+def test_failing_tool_returns_an_error_result():
+    client = ScriptedChatCompletionClient(latency=0)
+    response = ask(make_agent(client), "broken:London")
+    assert response.chat_message.content == "Error: no data for London"
+    assert response.chat_message.metadata == {"is_error": "true"}
+    assert client.calls == 0
+
+
+def test_free_text_goes_to_the_model():
+    client = ScriptedChatCompletionClient(["Hello!"], latency=0)
+    response = ask(make_agent(client), "hi there")
+    assert response.chat_message.content == "Hello!"
+    assert client.calls == 1
@@ -0,0 +1,32 @@
+from triage_router import TriageRouter, stem
+
+
+def test_stem_folds_inflections():
+    assert {stem(w) for w in ("ship", "ships", "shipped", "shipping")} == {"ship"}
+    assert stem("tracking") == stem("tracked") == "track"
+    assert stem("packages") == stem("package")
+
+
+def test_routes_clear_queries():
+    router = TriageRouter()
+    assert router.route("Where is my order #42?").route == "Orders_Agent"
+    assert router.route("Is this available, and is there a discount?").route == "Sales_Agent"
+    assert router.route("The screen cracked and it stopped working").route == "Issues_Repairs_Agent"
+
+
+def test_longest_phrase_wins():
+    router = TriageRouter()
+    assert router.match("it does not work") == [("does not work", "Issues_Repairs_Agent")]
+
+
+def test_ambiguous_or_unknown_queries_fall_back():
+    router = TriageRouter()
+    assert router.route("I bought it but it is broken").route is None
+    decision = router.route("Hello there")
+    assert decision.route is None and decision.scores == {}
+
+
+def test_margin():
+    router = TriageRouter(rules={"a": ["apple"], "b": ["banana"]}, margin=2.0)
+    assert router.route("apple apple banana").route == "a"
+    assert router.route("apple apple apple banana banana").route is None
@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import weather_client
+from weather_client import WeatherClient
+
+API_KEY = "secret-key"
+CITIES = {"london": 2643743, "paris": 2988507}
+
+
+def city_json(name, city_id):
+    return {"id": city_id, "name": name.title(), "main": {"temp": 12.5, "humidity": 70},
+            "weather": [{"description": "light rain"}], "wind": {"speed": 4.1}}
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Runs `main(client, requests)` against a stand-in OpenWeatherMap API."""
+    def run(main, delay=0.0):
+        requests = []
+
+        async def weather(request):
+            requests.append(dict(request.query))
+            await asyncio.sleep(delay)
+            if "id" in request.query:
+                match = [n for n, i in CITIES.items() if str(i) == request.query["id"]]
+            else:
+                match = [n for n in CITIES if n == request.query["q"].lower()]
+            if not match:
+                raise web.HTTPNotFound()
+            return web.json_response(city_json(match[0], CITIES[match[0]]))
+
+        async def group(request):
+            requests.append(dict(request.query))
+            ids = request.query["id"].split(",")
+            return web.json_response({"list": [city_json(n, i) for n, i in CITIES.items() if str(i) in ids]})
+
+        async def serve():
+            app = web.Application()
+            app.router.add_get("/weather", weather)
+            app.router.add_get("/group", group)
+            async with TestServer(app) as test_server:
+                monkeypatch.setattr(weather_client, "OPENWEATHER_URL", str(test_server.make_url("/weather")))
+                monkeypatch.setattr(weather_client, "OPENWEATHER_GROUP_URL", str(test_server.make_url("/group")))
+                client = WeatherClient(API_KEY)
+                try:
+                    return await main(client, requests)
+                finally:
+                    await client.close()
+        return asyncio.run(serve())
+    return run
+
+
+def test_lookups_are_cached_per_city(server):
+    async def main(client, requests):
+        first = await client.get("London")
+        again = await client.get("  london ")
+        return first, again, len(requests), client.stats
+
+    first, again, sent, stats = server(main)
+    assert first == again == {"city": "London", "temp": 12.5, "humidity": 70, "conditions": "light rain",
+                              "wind": 4.1}
+    assert sent == 1 and stats["hits"] == 1
+
+
+def test_concurrent_lookups_share_one_request(server):
+    async def main(client, requests):
+        results = await asyncio.gather(*(client.get("Paris") for _ in range(5)))
+        return results, len(requests), client.stats["coalesced"]
+
+    results, sent, coalesced = server(main, delay=0.05)
+    assert all(r["city"] == "Paris" for r in results)
+    assert sent == 1 and coalesced == 4
+
+
+def test_errors_do_not_leak_the_api_key(server):
+    async def main(client, requests):
+        try:
+            await client.get("Atlantis")
+        except Exception as e:
+            return weather_client.error_message(e), await client.get_many(["Atlantis"])
+
+    message, rows = server(main)
+    assert message == "404 Not Found"
+    assert rows == [{"city": "Atlantis", "error": "404 Not Found"}]
+
+
+def test_session_follows_the_event_loop():
+    client = WeatherClient(API_KEY)
+
+    async def session():
+        return client._get_session()
+
+    first = asyncio.run(session())
+    second = asyncio.run(session())
+    assert second is not first and first.closed
+    asyncio.run(client.close())
+
+
+def test_get_many_groups_known_ids_and_keeps_input_order(server):
+    async def main(client, requests):
+        await client.get("Paris")  # learns Paris's city ID
+        client.cache = weather_client.TTLCache(ttl=300, maxsize=16)
+        rows = await client.get_many(["Paris", "2643743", "paris", "Atlantis"])
+        return rows, requests[1:], client.stats["group_requests"]
+
+    rows, requests, groups = server(main)
+    assert [r["city"] for r in rows] == ["Paris", "London", "Paris", "Atlantis"]
+    assert rows[3]["error"] == "404 Not Found"
+    assert groups == 1
+    assert sorted(r.get("q") or r["id"] for r in requests) == ["2988507,2643743", "Atlantis"]
+
+
+def test_get_many_falls_back_to_an_id_lookup(server, monkeypatch):
+    async def failing_group(self, ids):
+        raise RuntimeError("group endpoint down")
+
+    monkeypatch.setattr(WeatherClient, "_fetch_group", failing_group)
+
+    async def main(client, requests):
+        return await client.get_many(["2643743"]), requests
+
+    rows, requests = server(main)
+    assert rows[0]["city"] == "London"
+    assert requests[0]["id"] == "2643743" and "q" not in requests[0]
@@ -0,0 +1,70 @@
+"""Fast path for explicit tool calls.
+
+The apps build prompts such as ``search_book_by_author:Jane Austen`` or
+``get_current_weather:London``. Asking the model to turn that into a tool call
+costs a full round trip and returns free text. DirectToolAgent recognizes the
+``name:args`` syntax for its own tools, calls the tool directly and replies
+with the tool's result unchanged (or "Error: ..." if the tool raises);
+anything else goes to the model as usual.
+"""
+import json
+import re
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.base import Response
+from autogen_agentchat.messages import TextMessage
+from autogen_core.models import AssistantMessage, UserMessage
+
+_CALL = re.compile(r"^\s*([A-Za-z_]\w*)\s*:(.*)$", re.DOTALL)
+
+
+def parse_tool_call(text: str, tools: dict):
+    """Return (tool, args) if `text` is `name:args` for a known tool, else None.
+
+    `args` is either a JSON object or a bare value for the tool's single
+    required parameter.
+    """
+    match = _CALL.match(text or "")
+    if not match or match.group(1) not in tools:
+        return None
+    tool = tools[match.group(1)]
+    raw = match.group(2).strip()
+    if raw.startswith("{"):
+        try:
+            args = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        return (tool, args) if isinstance(args, dict) else None
+    parameters = tool.schema.get("parameters", {})
+    required = parameters.get("required") or list(parameters.get("properties", {}))[:1]
+    if len(required) != 1 or not raw:
+        return None
+    return tool, {required[0]: raw}
+
+
+class DirectToolAgent(AssistantAgent):
+    """AssistantAgent that executes explicit `tool_name:args` messages without the model."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._direct_tools = {tool.name: tool for tool in getattr(self, "_tools", [])}
+
+    async def on_messages_stream(self, messages, cancellation_token):
+        last = messages[-1] if messages else None
+        call = parse_tool_call(last.content, self._direct_tools) if isinstance(last, TextMessage) else None
+        if call is None:
+            async for item in super().on_messages_stream(messages, cancellation_token):
+                yield item
+            return
+
+        tool, args = call
+        try:
+            result = await tool.run_json(args, cancellation_token)
+            content, metadata = tool.return_value_as_string(result), {}
+        except Exception as e:
+            # Like AssistantAgent: a failing tool becomes an error result, not an exception
+            content, metadata = f"Error: {e}", {"is_error": "true"}
+        # Keep the exchange in the model context so later free-form turns can refer to it
+        await self._model_context.add_message(UserMessage(content=last.content, source=last.source))
+        await self._model_context.add_message(AssistantMessage(content=content, source=self.name))
+        yield Response(chat_message=TextMessage(content=content, source=self.name, metadata=metadata))
@@ -0,0 +1,64 @@
+"""Model client wrapper that records every call as a tracing span.
+
+Kept apart from tracing.py so the apps can import tracing (spans, metrics,
+the sidebar) without loading autogen_core.
+"""
+import time
+
+from autogen_core.models import ChatCompletionClient, CreateResult
+
+from tracing import Span, tracer
+
+
+class TracedChatCompletionClient(ChatCompletionClient):
+    """Records a "model.create" span with token usage and the cached flag for every call."""
+
+    def __init__(self, client: ChatCompletionClient, model: str = None):
+        self._client = client
+        self._model = model or dict(getattr(client, "_create_args", {})).get("model", type(client).__name__)
+
+    @staticmethod
+    def _record(span: Span, result: CreateResult) -> None:
+        span.set(prompt_tokens=result.usage.prompt_tokens,
+                 completion_tokens=result.usage.completion_tokens,
+                 cached=bool(result.cached))
+
+    async def create(self, messages, **kwargs) -> CreateResult:
+        with tracer.span("model.create", model=self._model, messages=len(messages)) as s:
+            result = await self._client.create(messages, **kwargs)
+            self._record(s, result)
+            return result
+
+    async def create_stream(self, messages, **kwargs):
+        with tracer.span("model.create_stream", model=self._model, messages=len(messages)) as s:
+            first = True
+            async for chunk in self._client.create_stream(messages, **kwargs):
+                if first:
+                    s.set(ttft_ms=(time.time() - s.start) * 1000)
+                    first = False
+                if isinstance(chunk, CreateResult):
+                    self._record(s, chunk)
+                yield chunk
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def actual_usage(self):
+        return self._client.actual_usage()
+
+    def total_usage(self):
+        return self._client.total_usage()
+
+    def count_tokens(self, messages, *, tools=[]) -> int:
+        return self._client.count_tokens(messages, tools=tools)
+
+    def remaining_tokens(self, messages, *, tools=[]) -> int:
+        return self._client.remaining_tokens(messages, tools=tools)
+
+    @property
+    def capabilities(self):
+        return self._client.capabilities
+
+    @property
+    def model_info(self):
+        return self._client.model_info
@@ -0,0 +1,274 @@
+"""Per-request tracing and metrics for the agent apps.
+
+Spans (name, duration, parent, attributes such as token usage and the cached
+flag) are kept in memory for the Streamlit sidebar and can be exported:
+
+    AGENT_TRACE_FILE=traces.jsonl       append every finished span as one JSON line
+    AGENT_METRICS_PORT=9464             serve Prometheus text format at :9464/metrics
+    AGENT_PROFILE_SLOW_MS=2000          cProfile sampled requests, keep those slower than this
+    AGENT_PROFILE_SAMPLE=0.1            fraction of requests to profile (default 0.1)
+    AGENT_PROFILE_DIR=profiles          where .prof files go (default ./profiles)
+
+Model clients are wrapped by runtime.get_client() (see traced_client.py),
+tools with @traced_tool, and the apps open a "request" span around each
+interaction.
+"""
+import cProfile
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# Histogram buckets in seconds, covering tool calls (ms) to long team runs
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str = None
+    start: float = 0.0  # wall clock, seconds since the epoch
+    duration_ms: float = 0.0
+    status: str = "ok"
+    attributes: dict = field(default_factory=dict)
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+
+class Metrics:
+    """Prometheus-style aggregates of finished spans."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = defaultdict(int)
+        self._errors = defaultdict(int)
+        self._sum = defaultdict(float)
+        self._buckets = defaultdict(lambda: [0] * len(BUCKETS))
+        self._tokens = defaultdict(int)
+        self._cached = defaultdict(int)
+
+    def observe(self, span: Span) -> None:
+        seconds = span.duration_ms / 1000
+        with self._lock:
+            self._count[span.name] += 1
+            self._sum[span.name] += seconds
+            if span.status != "ok":
+                self._errors[span.name] += 1
+            buckets = self._buckets[span.name]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            for kind in ("prompt_tokens", "completion_tokens"):
+                if kind in span.attributes:
+                    self._tokens[(span.name, kind)] += span.attributes[kind] or 0
+            if span.attributes.get("cached"):
+                self._cached[span.name] += 1
+
+    def render(self) -> str:
+        lines = [
+            "# HELP agent_span_duration_seconds Duration of traced operations.",
+            "# TYPE agent_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name in sorted(self._count):
+                for bound, count in zip(BUCKETS, self._buckets[name]):
+                    lines.append(f'agent_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'agent_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {self._count[name]}')
+                lines.append(f'agent_span_duration_seconds_sum{{span="{name}"}} {self._sum[name]:.6f}')
+                lines.append(f'agent_span_duration_seconds_count{{span="{name}"}} {self._count[name]}')
+            lines += ["# HELP agent_span_errors_total Traced operations that raised.",
+                      "# TYPE agent_span_errors_total counter"]
+            for name in sorted(self._errors):
+                lines.append(f'agent_span_errors_total{{span="{name}"}} {self._errors[name]}')
+            lines += ["# HELP agent_tokens_total Model tokens by span and kind.",
+                      "# TYPE agent_tokens_total counter"]
+            for (name, kind), value in sorted(self._tokens.items()):
+                lines.append(f'agent_tokens_total{{span="{name}",kind="{kind}"}} {value}')
+            lines += ["# HELP agent_cached_total Operations answered from cache.",
+                      "# TYPE agent_cached_total counter"]
+            for name in sorted(self._cached):
+                lines.append(f'agent_cached_total{{span="{name}"}} {self._cached[name]}')
+        return "\n".join(lines) + "\n"
+
+
+class Tracer:
+    def __init__(self, trace_file: str = None, keep: int = 5000):
+        self.metrics = Metrics()
+        self._recent = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._trace_file = trace_file
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start=time.time(),
+            attributes=attributes,
+        )
+        token = _current_span.set(span)
+        start = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.set(error=f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # An async generator closed from another task/context
+                pass
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        self.metrics.observe(span)
+        with self._lock:
+            self._recent.append(span)
+            if self._trace_file:
+                with open(self._trace_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(asdict(span), default=str) + "\n")
+
+    def recent_traces(self, limit: int = 5) -> list:
+        """Most recent root traces, each as a list of spans ordered by start time."""
+        with self._lock:
+            spans = list(self._recent)
+        by_trace = defaultdict(list)
+        for span in spans:
+            by_trace[span.trace_id].append(span)
+        roots = [s for s in spans if s.parent_id is None]
+        roots.sort(key=lambda s: s.start, reverse=True)
+        return [sorted(by_trace[root.trace_id], key=lambda s: s.start) for root in roots[:limit]]
+
+
+tracer = Tracer(trace_file=os.getenv("AGENT_TRACE_FILE") or None)
+span = tracer.span
+
+
+def traced_tool(fn):
+    """Record a span for every call of a tool function (sync or async), keeping its signature."""
+    name = f"tool.{fn.__name__}"
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with tracer.span(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+# ---------------- Sampled profiling of slow requests ----------------
+_profile_lock = threading.Lock()
+
+
+async def profiled(coro, name: str = "request"):
+    """Await `coro`, profiling a sample of calls and keeping profiles of slow ones.
+
+    cProfile sees the whole loop thread while enabled, so at most one request
+    is profiled at a time; concurrent ones run unprofiled.
+    """
+    slow_ms = os.getenv("AGENT_PROFILE_SLOW_MS")
+    sample = float(os.getenv("AGENT_PROFILE_SAMPLE", "0.1"))
+    if not slow_ms or random.random() >= sample or not _profile_lock.acquire(blocking=False):
+        return await coro
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        profiler.enable()
+        return await coro
+    finally:
+        profiler.disable()
+        _profile_lock.release()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= float(slow_ms):
+            out_dir = os.getenv("AGENT_PROFILE_DIR", "profiles")
+            os.makedirs(out_dir, exist_ok=True)
+            path = os.path.join(out_dir, f"{name}-{int(time.time())}-{int(elapsed_ms)}ms.prof")
+            profiler.dump_stats(path)
+            current = _current_span.get()
+            if current is not None:
+                current.set(profile=path)
+
+
+# ---------------- Prometheus endpoint ----------------
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1"):
+    """Serve tracer metrics in Prometheus text format at http://host:port/metrics (once per process)."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=_server.serve_forever, name="metrics-endpoint", daemon=True).start()
+        return _server
+
+
+if os.getenv("AGENT_METRICS_PORT"):
+    serve_metrics(int(os.getenv("AGENT_METRICS_PORT")))
+
+
+# ---------------- Streamlit sidebar ----------------
+def render_sidebar(st, limit: int = 5) -> None:
+    """Optional sidebar panel with waterfalls of the most recent requests."""
+    if not st.sidebar.checkbox("Show request traces", value=False):
+        return
+    for trace in tracer.recent_traces(limit):
+        root = next((s for s in trace if s.parent_id is None), trace[0])
+        total = max(root.duration_ms, 1e-6)
+        depth = {root.span_id: 0}
+        with st.sidebar.expander(f"{root.name} · {root.duration_ms:.0f} ms", expanded=False):
+            lines = []
+            for s in trace:
+                level = depth.setdefault(s.span_id, depth.get(s.parent_id, 0) + 1)
+                offset = int((s.start - root.start) * 1000 / total * 20)
+                width = max(1, int(s.duration_ms / total * 20))
+                extra = ""
+                if "prompt_tokens" in s.attributes:
+                    extra = f" {s.attributes['prompt_tokens']}+{s.attributes['completion_tokens']} tok"
+                    if s.attributes.get("cached"):
+                        extra += " (cached)"
+                lines.append(f"{' ' * offset}{'█' * width} {'  ' * level}{s.name} {s.duration_ms:.0f} ms{extra}")
+            st.code("\n".join(lines), language=None)
@@ -0,0 +1,97 @@
+"""Local keyword router for the customer-support triage bot.
+
+Applies the same rules the Support_Agent system message spells out, but
+without a model call: the query is tokenized and stemmed, then matched in a
+single pass against a compiled table of keywords, synonyms and phrases.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+# Route name -> keywords and synonyms (single words or short phrases)
+DEFAULT_RULES = {
+    "Orders_Agent": [
+        "order", "shipping", "ship", "shipment", "delivery", "deliver", "track", "tracking",
+        "package", "parcel", "courier", "dispatch", "eta", "where is my",
+    ],
+    "Sales_Agent": [
+        "price", "pricing", "cost", "buy", "buying", "bought", "purchase", "discount",
+        "coupon", "promo", "promotion", "deal", "offer", "sale", "cheap", "expensive",
+        "available", "availability", "in stock", "how much",
+    ],
+    "Issues_Repairs_Agent": [
+        "broken", "break", "broke", "damage", "damaged", "repair", "fix", "faulty", "defect",
+        "defective", "crack", "cracked", "malfunction", "complaint", "replace", "replacement",
+        "not working", "stopped working", "doesn't work", "does not work",
+    ],
+}
+
+_TOKEN = re.compile(r"[a-z0-9']+")
+_SUFFIXES = ("ings", "ing", "ed", "es", "s")
+
+
+def stem(word: str) -> str:
+    """Very small suffix stripper: ship/ships/shipped/shipping -> ship."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[: -len(suffix)]
+            # shipp -> ship, but keep "ll"/"ss" endings (install, address)
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "ls":
+                word = word[:-1]
+            break
+    if len(word) > 3 and word.endswith("e"):
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> list:
+    return [stem(token) for token in _TOKEN.findall(text.lower())]
+
+
+@dataclass
+class RouteDecision:
+    route: str = None  # None means ambiguous: fall back to LLM triage
+    scores: dict = field(default_factory=dict)
+    matches: list = field(default_factory=list)
+
+
+class TriageRouter:
+    def __init__(self, rules: dict = None, margin: float = 2.0):
+        # Winning route must score at least `margin` times the runner-up
+        self.margin = margin
+        self._patterns = {}
+        self._max_len = 1
+        for route, keywords in (rules or DEFAULT_RULES).items():
+            for keyword in keywords:
+                pattern = tuple(tokenize(keyword))
+                self._patterns[pattern] = (keyword, route)
+                self._max_len = max(self._max_len, len(pattern))
+
+    def match(self, text: str) -> list:
+        """Return (keyword, route) pairs, longest match first at each position."""
+        tokens = tokenize(text)
+        matches = []
+        i = 0
+        while i < len(tokens):
+            for n in range(min(self._max_len, len(tokens) - i), 0, -1):
+                pattern = tuple(tokens[i:i + n])
+                hit = self._patterns.get(pattern)
+                if hit is not None:
+                    matches.append(hit)
+                    i += n
+                    break
+            else:
+                i += 1
+        return matches
+
+    def route(self, text: str) -> RouteDecision:
+        matches = self.match(text)
+        scores = Counter(route for _, route in matches)
+        ranked = scores.most_common(2)
+        if not ranked:
+            return RouteDecision(scores=dict(scores), matches=matches)
+        best, best_score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        if best_score >= self.margin * runner_up and best_score > runner_up:
+            return RouteDecision(route=best, scores=dict(scores), matches=matches)
+        return RouteDecision(scores=dict(scores), matches=matches)
@@ -0,0 +1,231 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+# Point OPENWEATHER_BASE_URL elsewhere to use a stand-in (see loadtest.py)
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5").rstrip("/")
+OPENWEATHER_URL = f"{OPENWEATHER_BASE_URL}/weather"
+# Current weather for up to GROUP_SIZE city IDs in one request
+OPENWEATHER_GROUP_URL = f"{OPENWEATHER_BASE_URL}/group"
+GROUP_SIZE = 20
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+def _key(city: str) -> str:
+    return " ".join(city.casefold().split())
+
+
+def _parse(data: dict) -> dict:
+    return {
+        "city": data["name"],
+        "temp": data["main"]["temp"],
+        "humidity": data["main"]["humidity"],
+        "conditions": data["weather"][0]["description"],
+        "wind": data["wind"]["speed"],
+    }
+
+
+def error_message(error: Exception) -> str:
+    """A lookup error as text that is safe to show or hand to the model."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        # str(error) includes the request URL, and with it the API key
+        return f"{error.status} {error.message}"
+    return str(error) or type(error).__name__
+
+
+class WeatherClient:
+    """OpenWeatherMap client with a per-city TTL cache, request coalescing
+    and one pooled keep-alive session.
+
+    get_many() looks up a list of cities with bounded concurrency; cities
+    whose OpenWeatherMap ID is known (given as a number, or learned from an
+    earlier lookup) are fetched GROUP_SIZE at a time from the group endpoint.
+    """
+
+    def __init__(self, api_key: str, ttl: float = 300, maxsize: int = 1024, timeout: float = 10):
+        self.api_key = api_key
+        self.cache = TTLCache(ttl, maxsize)
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session = None
+        self._session_loop = None
+        self._inflight = {}
+        self._ids = {}  # normalized city name -> OpenWeatherMap city ID
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "group_requests": 0}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # aiohttp sessions are bound to the loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._close_stale_session()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, keepalive_timeout=60, ttl_dns_cache=300),
+                timeout=self.timeout,
+            )
+            self._session_loop = loop
+            self._inflight = {}
+        return self._session
+
+    def _close_stale_session(self) -> None:
+        """Close the session of a previous loop instead of leaking its connector and sockets."""
+        session, loop = self._session, self._session_loop
+        if session is None or session.closed:
+            return
+        if loop.is_closed():
+            # Its transports went down with the loop; close() only has bookkeeping left, which any loop can run
+            asyncio.ensure_future(session.close())
+        else:
+            # close() has to run on the session's own loop; a stopped loop runs it when it next runs
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+
+    async def _fetch(self, city: str) -> dict:
+        # A numeric city is an OpenWeatherMap city ID, which `q` would search for as a name
+        query = {"id": city} if city.strip().isdigit() else {"q": city}
+        params = {**query, "appid": self.api_key, "units": "metric"}
+        async with self._get_session().get(OPENWEATHER_URL, params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+        if "id" in data:
+            self._ids[_key(city)] = data["id"]
+        return _parse(data)
+
+    async def _fetch_group(self, ids: list) -> dict:
+        """{city ID: weather} for up to GROUP_SIZE IDs, in one request."""
+        params = {"id": ",".join(str(i) for i in ids), "appid": self.api_key, "units": "metric"}
+        self.stats["group_requests"] += 1
+        async with self._get_session().get(OPENWEATHER_GROUP_URL, params=params) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return {item["id"]: _parse(item) for item in data.get("list", [])}
+
+    async def get(self, city: str) -> dict:
+        key = _key(city)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["hits"] += 1
+            return cached
+        self._get_session()
+        # Singleflight: concurrent lookups for the same city share one request
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(task)
+        self.stats["misses"] += 1
+        task = asyncio.ensure_future(self._fetch(city))
+        self._inflight[key] = task
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+        # Errors are not cached, so the next call retries upstream
+        self.cache.set(key, result)
+        return result
+
+    async def get_many(self, cities, concurrency: int = 8) -> list:
+        """Weather for every city, in input order; failed lookups become {"city": ..., "error": ...}.
+
+        Duplicates are looked up once, cache hits cost nothing, known city
+        IDs go through the group endpoint and the rest are fetched
+        individually, at most `concurrency` requests at a time over the
+        shared session.
+        """
+        cities = [c.strip() for c in cities if c and c.strip()]
+        unique = list(dict.fromkeys(_key(c) for c in cities))
+        names = {_key(c): c for c in reversed(cities)}  # first spelling wins
+        results = {}
+        for key in unique:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.stats["hits"] += 1
+                results[key] = cached
+
+        missing = [k for k in unique if k not in results]
+        by_id = {}
+        for key in missing:
+            city_id = int(key) if key.isdigit() else self._ids.get(key)
+            if city_id is not None:
+                by_id.setdefault(city_id, []).append(key)
+        ids = list(by_id)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def group(chunk):
+            async with semaphore:
+                try:
+                    found = await self._fetch_group(chunk)
+                except Exception:
+                    return  # those cities fall back to single lookups below
+            for city_id, weather in found.items():
+                for key in by_id.get(city_id, []):
+                    self.cache.set(key, weather)
+                    results[key] = weather
+
+        async def single(key):
+            async with semaphore:
+                try:
+                    results[key] = await self.get(names[key])
+                except Exception as e:
+                    results[key] = {"city": names[key], "error": error_message(e)}
+
+        grouped = {key for keys in by_id.values() for key in keys}
+        await asyncio.gather(
+            *(group(ids[i:i + GROUP_SIZE]) for i in range(0, len(ids), GROUP_SIZE)),
+            *(single(k) for k in missing if k not in grouped),
+        )
+        # Cities a group request failed for or did not return
+        await asyncio.gather(*(single(k) for k in missing if k not in results))
+        return [results[_key(c)] for c in cities]
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_weather_client(api_key: str) -> WeatherClient:
+    """Process-wide client, so the cache survives Streamlit reruns."""
+    global _client
+    with _client_lock:
+        if _client is None or _client.api_key != api_key:
+            _client = WeatherClient(
+                api_key,
+                ttl=float(os.getenv("WEATHER_CACHE_TTL", "300")),
+                maxsize=int(os.getenv("WEATHER_CACHE_SIZE", "1024")),
+            )
+        return _client
+
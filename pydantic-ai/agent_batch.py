@@ -0,0 +1,117 @@
+"""Run many prompts through a pydantic-ai agent concurrently.
+
+    from agent_batch import BatchUsage, run_batch
+    totals = BatchUsage()
+    async for item in run_batch(agent, prompts, concurrency=16,
+                                usage_limits=UsageLimits(output_tokens_limit=200)):
+        totals.add(item)
+        print(item.index, item.output if item.error is None else item.error)
+    print(totals)
+
+Results (and exceptions such as UsageLimitExceeded) stream back in completion
+order, so throughput scales with `concurrency` instead of one `run_sync` at a
+time. Prompts are pulled lazily from the iterable.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from pydantic_ai.usage import RunUsage
+
+
+@dataclass
+class BatchResult:
+    index: int
+    prompt: str
+    output: object = None
+    error: Exception = None
+    usage: RunUsage = field(default_factory=RunUsage)  # also filled in for failed runs
+    latency: float = 0.0
+
+
+@dataclass
+class BatchUsage:
+    """Usage aggregated over a batch."""
+    runs: int = 0
+    failed: int = 0
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    tool_calls: int = 0
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def add(self, result: BatchResult) -> None:
+        self.runs += 1
+        self.failed += result.error is not None
+        usage = result.usage
+        self.requests += usage.requests
+        self.input_tokens += usage.input_tokens
+        self.output_tokens += usage.output_tokens
+        self.tool_calls += usage.tool_calls
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def throughput_per_s(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.runs / elapsed if elapsed > 0 else 0.0
+
+
+async def run_batch(agent, prompts, *, concurrency: int = 8, usage_limits=None, **run_kwargs):
+    """`agent.run(prompt, ...)` for every prompt with at most `concurrency` in flight.
+
+    `usage_limits` applies to each run separately; pass a callable
+    `usage_limits(prompt)` for per-item limits. Yields BatchResults in
+    completion order; failed runs carry the exception in `error`. If
+    `prompts` raises, the runs already started are yielded first and the
+    exception is then re-raised.
+    """
+    async def run(item):
+        limits = usage_limits(item.prompt) if callable(usage_limits) else usage_limits
+        start = time.perf_counter()
+        try:
+            # The run updates item.usage in place, so failed runs still report what they used
+            result = await agent.run(item.prompt, usage_limits=limits, usage=item.usage, **run_kwargs)
+            item.output = result.output
+        except Exception as e:
+            item.error = e
+        item.latency = time.perf_counter() - start
+        return item
+
+    prompts = enumerate(prompts)
+    pending, failure, exhausted = set(), None, False
+    try:
+        while True:
+            # Start runs as slots free up, pulling prompts lazily
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    index, prompt = next(prompts)
+                except StopIteration:
+                    exhausted = True
+                except Exception as e:
+                    failure, exhausted = e, True
+                else:
+                    pending.add(asyncio.ensure_future(run(BatchResult(index, prompt))))
+            if not pending:
+                break
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    if failure is not None:
+        raise failure
+
+
+def run_batch_sync(agent, prompts, **kwargs) -> tuple:
+    """Blocking run_batch(): returns (results in completion order, BatchUsage). Use nest_asyncio in notebooks."""
+    async def collect():
+        results, totals = [], BatchUsage()
+        async for item in run_batch(agent, prompts, **kwargs):
+            results.append(item)
+            totals.add(item)
+        return results, totals
+    return asyncio.run(collect())
@@ -0,0 +1,161 @@
+"""Circuit breaker for pydantic-ai tools stuck in retry loops.
+
+A tool that keeps failing the same way (like `infinite_retry_tool` in the
+notebook) makes the agent spend a full model request on every retry until
+`retries` or `request_limit` stops it. The breaker watches each
+(tool, arguments) pair. After `failure_threshold` consecutive identical
+failures (same error type and message) the circuit opens. The failing call
+then raises CircuitOpenError instead of ModelRetry, which ends the run
+without another model request. Later calls with the same arguments, in this
+run or any other that shares the breaker, fail fast without running the tool.
+
+After `reset_timeout` seconds the circuit is half-open: one probe call runs
+the tool. Success closes the circuit; failure opens it again.
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    @agent.tool_plain(retries=5)
+    @breaker.protect
+    def flaky_tool(city: str) -> str:
+        ...
+"""
+import functools
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from pydantic_ai import RunContext
+from pydantic_ai.exceptions import AgentRunError
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+
+class CircuitOpenError(AgentRunError):
+    """A tool's circuit is open: it kept failing identically, so the run stops instead of retrying."""
+
+    def __init__(self, tool: str, args: str, last_error: str, failures: int):
+        self.tool = tool
+        self.args = args
+        self.last_error = last_error
+        self.failures = failures
+        super().__init__(f"Circuit open for tool {tool!r} with args {args}: "
+                         f"{failures} identical failures ({last_error})")
+
+
+@dataclass
+class _Circuit:
+    state: str = CLOSED
+    failures: int = 0
+    last_error: str = None
+    opened_at: float = 0.0
+    probing: bool = False
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0, *, key_on_args: bool = True,
+                 max_circuits: int = 1024, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.key_on_args = key_on_args
+        self.max_circuits = max_circuits
+        self._clock = clock
+        self._circuits = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"tripped": 0, "short_circuited": 0, "recovered": 0}
+
+    def _circuit(self, key) -> _Circuit:
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit()
+            if len(self._circuits) > self.max_circuits:
+                self._circuits.popitem(last=False)
+        else:
+            self._circuits.move_to_end(key)
+        return circuit
+
+    def state(self, tool: str, args: str = "") -> str:
+        with self._lock:
+            circuit = self._circuits.get((tool, args if self.key_on_args else ""))
+            if circuit is None:
+                return CLOSED
+            if circuit.state == OPEN and self._clock() - circuit.opened_at >= self.reset_timeout:
+                return HALF_OPEN
+            return circuit.state
+
+    def before_call(self, tool: str, args: str) -> None:
+        """Raise CircuitOpenError if the call must not run; claim the probe when half-open."""
+        with self._lock:
+            circuit = self._circuit((tool, args if self.key_on_args else ""))
+            if circuit.state == OPEN and self._clock() - circuit.opened_at >= self.reset_timeout:
+                circuit.state = HALF_OPEN
+            if circuit.state == OPEN or (circuit.state == HALF_OPEN and circuit.probing):
+                self.stats["short_circuited"] += 1
+                raise CircuitOpenError(tool, args, circuit.last_error, circuit.failures)
+            if circuit.state == HALF_OPEN:
+                circuit.probing = True
+
+    def record_success(self, tool: str, args: str) -> None:
+        with self._lock:
+            circuit = self._circuit((tool, args if self.key_on_args else ""))
+            if circuit.state == HALF_OPEN:
+                self.stats["recovered"] += 1
+            circuit.state, circuit.failures, circuit.last_error, circuit.probing = CLOSED, 0, None, False
+
+    def record_failure(self, tool: str, args: str, error: BaseException) -> bool:
+        """Count a failure; returns True if the circuit is (now) open."""
+        signature = f"{type(error).__name__}: {error}"
+        with self._lock:
+            circuit = self._circuit((tool, args if self.key_on_args else ""))
+            circuit.failures = circuit.failures + 1 if signature == circuit.last_error else 1
+            circuit.last_error = signature
+            if circuit.state == HALF_OPEN or circuit.failures >= self.failure_threshold:
+                if circuit.state != OPEN:
+                    self.stats["tripped"] += 1
+                circuit.state, circuit.opened_at, circuit.probing = OPEN, self._clock(), False
+                return True
+            return False
+
+    def protect(self, fn):
+        """Decorate a tool function (sync or async, with or without RunContext), keeping its signature."""
+        tool = fn.__name__
+        signature = inspect.signature(fn)
+
+        def fingerprint(args, kwargs) -> str:
+            bound = signature.bind_partial(*args, **kwargs)
+            values = {k: v for k, v in bound.arguments.items() if not isinstance(v, RunContext)}
+            return json.dumps(values, sort_keys=True, default=str)
+
+        def failed(key: str, error: Exception):
+            if self.record_failure(tool, key, error):
+                # Raising anything but ModelRetry ends the run here, saving the retry request
+                raise CircuitOpenError(tool, key, f"{type(error).__name__}: {error}",
+                                       self.failure_threshold) from error
+            raise error
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                key = fingerprint(args, kwargs)
+                self.before_call(tool, key)
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as e:
+                    failed(key, e)
+                self.record_success(tool, key)
+                return result
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = fingerprint(args, kwargs)
+            self.before_call(tool, key)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                failed(key, e)
+            self.record_success(tool, key)
+            return result
+        return wrapper
@@ -180,6 +180,40 @@ def _(Agent, UsageLimitExceeded, UsageLimits, model):
     return
 
 
+@app.cell
+def _(mo):
+    mo.md(
+        r"""
+    Each of those retries above was a full model request. A circuit breaker notices that the tool keeps failing
+    in exactly the same way and stops the run after 2 identical failures, without asking the model again.
+    Later runs calling the tool with the same arguments fail fast until the breaker tries the tool again (after 60s).
+    """
+    )
+    return
+
+
+@app.cell
+def _(Agent, UsageLimits, model):
+    from circuit_breaker import CircuitBreaker, CircuitOpenError
+    # ModelRetry is imported (not exported) by the retry-loop cell above; "_" keeps this one cell-local
+    from pydantic_ai import ModelRetry as _ModelRetry
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    guarded_agent = Agent(model, retries=3)
+
+    @guarded_agent.tool_plain(retries=5)
+    @breaker.protect
+    def guarded_retry_tool() -> int:
+        raise _ModelRetry('Please try again.')
+
+    try:
+        guarded_agent.run_sync('Call guarded_retry_tool until it works!', usage_limits=UsageLimits(request_limit=3))
+    except CircuitOpenError as e:
+        print(e)
+    print(breaker.stats)
+    return
+
+
 @app.cell
 def _(mo):
     mo.md(r"""##Let's see capping tool_calls example""")
@@ -217,6 +251,141 @@ def _(Agent, UsageLimitExceeded, UsageLimits, model):
     return
 
 
+@app.cell
+def _(mo):
+    mo.md(
+        r"""
+    ## Sharing one budget across many runs
+    <br>
+    `UsageLimits` only applies to a single run. With `CostLedger` every run is recorded in a small SQLite file,
+    priced per model (in USD), and checked against per-user, per-agent and global budgets over rolling windows.
+    A run whose budget is already used up is rejected **before** anything is sent to the model.
+    """
+    )
+    return
+
+
+@app.cell
+def _(UsageLimitExceeded, UsageLimits, agent):
+    from cost_ledger import Budget, BudgetExceeded, CostLedger
+
+    ledger = CostLedger("cost_ledger.db", budgets=[
+        Budget("global", limit=1.00, window=24 * 3600),  # $1 a day for everything
+        Budget("user", limit=0.001, window=3600),        # $0.001 an hour for each user
+    ])
+
+    for question in ['Who Invented Computer?', 'What is a Sun?', 'What is a Moon?']:
+        try:
+            ledger_result = ledger.run_sync(
+                agent, question, user='alice',
+                usage_limits=UsageLimits(response_tokens_limit=200)
+            )
+            print(ledger_result.output)
+        except BudgetExceeded as e:
+            # Also a UsageLimitExceeded, so existing handlers keep working
+            print(e)
+        except UsageLimitExceeded as e:
+            print(e)
+
+    # Spend per user / agent / model over the last day
+    print(ledger.report())
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(
+        r"""
+    ## Checking the budget before the request is sent
+    <br>
+    `UsageLimitExceeded` above is raised only after the model has generated (and we have paid for) the long answer.
+    `preflight` estimates the tokens locally first: it caps `max_tokens` at the response limit, and refuses
+    (or, with `on_exceed="downgrade"`, trims old history from) a request that would not fit, without any network call.
+    """
+    )
+    return
+
+
+@app.cell
+def _(UsageLimitExceeded, UsageLimits, agent):
+    import preflight
+
+    try:
+        preflight_result = preflight.run_sync(
+            agent, 'What is a Sun?',
+            usage_limits=UsageLimits(response_tokens_limit=200)
+        )
+        # The answer is cut at 200 tokens instead of failing after the fact
+        print(preflight_result.output)
+        print(preflight_result.usage())
+    except UsageLimitExceeded as e:
+        print(e)
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(
+        r"""
+    ## Stopping a runaway answer while it streams
+    <br>
+    With streaming we can count the tokens as they arrive and close the connection the moment the limit is crossed,
+    so we neither wait for nor pay for the rest of the answer. We either get an error carrying the partial answer,
+    or (with `on_limit="truncate"`) the truncated answer itself.
+    """
+    )
+    return
+
+
+@app.cell
+def _(UsageLimits, agent):
+    from stream_guard import StreamLimitExceeded, run_stream_guarded_sync
+
+    try:
+        run_stream_guarded_sync(agent, 'Explain the Sun in detail.',
+                                usage_limits=UsageLimits(response_tokens_limit=200))
+    except StreamLimitExceeded as e:
+        print(e)
+        print(e.partial_output)
+
+    truncated_result = run_stream_guarded_sync(agent, 'Explain the Sun in detail.',
+                                               output_tokens_limit=200, on_limit="truncate")
+    print(truncated_result.truncated, truncated_result.output)
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(
+        r"""
+    ## Running many prompts at once
+    <br>
+    `run_sync` handles one prompt at a time. `run_batch` sends prompts through `agent.run` concurrently
+    (here 8 at a time), applies the usage limits to every single run, and gives back each result, or its error,
+    as soon as it finishes, together with the total usage of the batch.
+    """
+    )
+    return
+
+
+@app.cell
+def _(UsageLimitExceeded, UsageLimits, agent):
+    from agent_batch import run_batch_sync
+
+    batch_prompts = ['Who Invented Computer?', 'What is a Sun?', 'What is a Moon?', 'Who wrote Hamlet?']
+    batch_results, batch_usage = run_batch_sync(
+        agent, batch_prompts, concurrency=8,
+        usage_limits=UsageLimits(response_tokens_limit=200)
+    )
+    for batch_item in batch_results:
+        if isinstance(batch_item.error, UsageLimitExceeded):
+            print(batch_item.prompt, '->', batch_item.error)
+        else:
+            print(batch_item.prompt, '->', batch_item.output)
+    print(batch_usage)
+    return
+
+
 @app.cell
 def _():
     return
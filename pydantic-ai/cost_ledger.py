@@ -0,0 +1,251 @@
+"""Shared cost ledger and currency budgets across pydantic-ai agent runs.
+
+`UsageLimits` caps a single run. The ledger records the usage of every run in
+SQLite, prices it per model, and enforces per-user, per-agent and global
+budgets over rolling windows:
+
+    from cost_ledger import Budget, CostLedger
+    ledger = CostLedger("costs.db", budgets=[
+        Budget("global", limit=5.00, window=24 * 3600),
+        Budget("user", limit=0.50, window=3600),        # each user, per hour
+        Budget("agent", key="cap_agent", limit=1.00),   # one agent, per day
+    ])
+    result = ledger.run_sync(agent, "What is a Sun?", user="alice",
+                             usage_limits=UsageLimits(output_tokens_limit=200))
+
+A run is rejected with BudgetExceeded before any request is sent if its
+budget is already spent. While a run is in flight the ledger holds a
+reservation priced from the token limits in `usage_limits`, so concurrent
+runs (threads or processes sharing the database) see each other's expected
+spend; the reservation is replaced by the actual cost when the run ends,
+including runs that fail part-way.
+
+The reservation is a best-effort estimate, not a hard cap. Tokens that
+`usage_limits` leaves unbounded (input tokens when only an output limit is
+set, everything when there are no limits) reserve nothing, and pydantic-ai
+checks its limits only after each response. Concurrent runs can therefore
+together overshoot a budget by what they use beyond their reservations.
+"""
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from pydantic_ai import UsageLimitExceeded
+from pydantic_ai.usage import RunUsage
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    input_per_mtok: float  # USD per million input tokens
+    output_per_mtok: float  # USD per million output tokens
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.input_per_mtok + output_tokens * self.output_per_mtok) / 1_000_000
+
+
+# OpenRouter list prices in USD; check https://openrouter.ai/models and adjust
+DEFAULT_PRICES = {
+    "openai/gpt-oss-20b": ModelPrice(input_per_mtok=0.03, output_per_mtok=0.15),
+    "openai/gpt-oss-20b:free": ModelPrice(input_per_mtok=0.0, output_per_mtok=0.0),
+    "openai/gpt-oss-120b": ModelPrice(input_per_mtok=0.05, output_per_mtok=0.25),
+}
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Spending cap in USD over a rolling `window` of seconds.
+
+    scope is "global", "user" or "agent". With key=None a user/agent budget
+    applies to each user/agent separately; with a key, only to that one.
+    """
+    scope: str
+    limit: float
+    window: float = 24 * 3600
+    key: str = None
+
+    def applies(self, user: str, agent: str) -> bool:
+        if self.scope == "global":
+            return True
+        subject = user if self.scope == "user" else agent
+        return subject is not None and (self.key is None or self.key == subject)
+
+
+class BudgetExceeded(UsageLimitExceeded):
+    """Raised before a run when it would exceed a ledger budget."""
+
+    def __init__(self, budget: Budget, subject: str, spent: float, reserve: float):
+        self.budget = budget
+        self.subject = subject
+        self.spent = spent
+        self.reserve = reserve
+        who = budget.scope if budget.scope == "global" else f"{budget.scope} {subject!r}"
+        super().__init__(
+            f"Budget for {who} exhausted: ${spent:.6f} spent of ${budget.limit:.6f} "
+            f"in the last {budget.window:.0f}s (this run reserves ${reserve:.6f})"
+        )
+
+
+def usage_tokens(usage) -> tuple:
+    """(input, output, requests) from a RunUsage of any pydantic-ai version."""
+    input_tokens = getattr(usage, "input_tokens", None)
+    if input_tokens is None:
+        input_tokens = getattr(usage, "request_tokens", 0)
+    output_tokens = getattr(usage, "output_tokens", None)
+    if output_tokens is None:
+        output_tokens = getattr(usage, "response_tokens", 0)
+    return input_tokens or 0, output_tokens or 0, getattr(usage, "requests", 0) or 0
+
+
+def model_name(agent) -> str:
+    model = getattr(agent, "model", None)
+    return getattr(model, "model_name", None) or str(model)
+
+
+class CostLedger:
+    def __init__(self, path: str = "cost_ledger.db", *, prices: dict = None, budgets=(),
+                 default_price: ModelPrice = None):
+        self.path = path
+        self.prices = dict(DEFAULT_PRICES if prices is None else prices)
+        self.default_price = default_price
+        self.budgets = list(budgets)
+        # SQLite serializes writers across processes; the lock avoids busy
+        # retries between threads of this process
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS charges (
+                    id TEXT PRIMARY KEY,
+                    ts REAL NOT NULL,
+                    user TEXT,
+                    agent TEXT,
+                    model TEXT NOT NULL,
+                    input_tokens INTEGER NOT NULL DEFAULT 0,
+                    output_tokens INTEGER NOT NULL DEFAULT 0,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    cost REAL NOT NULL,
+                    status TEXT NOT NULL  -- 'reserved' while the run is in flight, then 'settled'
+                );
+                CREATE INDEX IF NOT EXISTS charges_ts ON charges (ts);
+                CREATE INDEX IF NOT EXISTS charges_user_ts ON charges (user, ts);
+                CREATE INDEX IF NOT EXISTS charges_agent_ts ON charges (agent, ts);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            yield db
+        finally:
+            db.close()
+
+    def price(self, model: str) -> ModelPrice:
+        price = self.prices.get(model) or self.default_price
+        if price is None:
+            raise KeyError(f"No price configured for model {model!r}; add it to CostLedger(prices=...)")
+        return price
+
+    def max_cost(self, model: str, usage_limits=None) -> float:
+        """Estimated cost of a run from the token limits in `usage_limits`.
+
+        Only limited tokens are priced: an output-only limit reserves no input
+        cost, and no limits reserve $0.
+        """
+        if usage_limits is None:
+            return 0.0
+        price = self.price(model)
+        input_limit = usage_limits.input_tokens_limit
+        output_limit = usage_limits.output_tokens_limit
+        total_limit = usage_limits.total_tokens_limit
+        if total_limit is not None:
+            return price.cost(0, total_limit) if price.output_per_mtok >= price.input_per_mtok else price.cost(total_limit, 0)
+        return price.cost(input_limit or 0, output_limit or 0)
+
+    def _spent(self, db, budget: Budget, user: str, agent: str, now: float) -> tuple:
+        query = "SELECT COALESCE(SUM(cost), 0) FROM charges WHERE ts >= ?"
+        params = [now - budget.window]
+        subject = None
+        if budget.scope != "global":
+            subject = user if budget.scope == "user" else agent
+            query += f" AND {budget.scope} = ?"
+            params.append(subject)
+        return db.execute(query, params).fetchone()[0], subject
+
+    def reserve(self, *, user: str = None, agent: str = None, model: str, amount: float = 0.0) -> str:
+        """Check every applicable budget and hold `amount` USD; returns the charge id."""
+        charge_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for budget in self.budgets:
+                    if not budget.applies(user, agent):
+                        continue
+                    spent, subject = self._spent(db, budget, user, agent, now)
+                    if spent >= budget.limit or spent + amount > budget.limit:
+                        raise BudgetExceeded(budget, subject, spent, amount)
+                db.execute(
+                    "INSERT INTO charges (id, ts, user, agent, model, cost, status) VALUES (?, ?, ?, ?, ?, ?, 'reserved')",
+                    (charge_id, now, user, agent, model, amount),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return charge_id
+
+    def settle(self, charge_id: str, usage) -> float:
+        """Replace a reservation with the actual cost of `usage`; returns that cost."""
+        input_tokens, output_tokens, requests = usage_tokens(usage)
+        with self._lock, self._connect() as db:
+            model = db.execute("SELECT model FROM charges WHERE id = ?", (charge_id,)).fetchone()[0]
+            cost = self.price(model).cost(input_tokens, output_tokens)
+            db.execute(
+                "UPDATE charges SET input_tokens = ?, output_tokens = ?, requests = ?, cost = ?, status = 'settled' "
+                "WHERE id = ?",
+                (input_tokens, output_tokens, requests, cost, charge_id),
+            )
+        return cost
+
+    @contextmanager
+    def charge(self, *, user: str = None, agent: str = None, model: str, usage_limits=None):
+        """Reserve before a run and settle after it. Yields the RunUsage to pass to the run."""
+        charge_id = self.reserve(user=user, agent=agent, model=model, amount=self.max_cost(model, usage_limits))
+        usage = RunUsage()
+        try:
+            yield usage
+        finally:
+            # The run updates `usage` in place, so failed runs are billed for what they used
+            self.settle(charge_id, usage)
+
+    async def run(self, agent, user_prompt, *, user: str = None, agent_name: str = None, **kwargs):
+        """`agent.run(...)` under the ledger's budgets."""
+        with self.charge(user=user, agent=agent_name or agent.name, model=model_name(agent),
+                         usage_limits=kwargs.get("usage_limits")) as usage:
+            return await agent.run(user_prompt, usage=usage, **kwargs)
+
+    def run_sync(self, agent, user_prompt, *, user: str = None, agent_name: str = None, **kwargs):
+        """`agent.run_sync(...)` under the ledger's budgets."""
+        with self.charge(user=user, agent=agent_name or agent.name, model=model_name(agent),
+                         usage_limits=kwargs.get("usage_limits")) as usage:
+            return agent.run_sync(user_prompt, usage=usage, **kwargs)
+
+    def spent(self, *, scope: str = "global", key: str = None, window: float = 24 * 3600) -> float:
+        """USD spent (including in-flight reservations) in the last `window` seconds."""
+        budget = Budget(scope, limit=0, window=window, key=key)
+        with self._connect() as db:
+            return self._spent(db, budget, key, key, time.time())[0]
+
+    def report(self, window: float = 24 * 3600) -> list:
+        """Settled spend per user and agent over the last `window` seconds."""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT user, agent, model, COUNT(*), SUM(input_tokens), SUM(output_tokens), SUM(cost) "
+                "FROM charges WHERE ts >= ? AND status = 'settled' GROUP BY user, agent, model ORDER BY SUM(cost) DESC",
+                (time.time() - window,),
+            ).fetchall()
+        keys = ("user", "agent", "model", "runs", "input_tokens", "output_tokens", "cost")
+        return [dict(zip(keys, row)) for row in rows]
@@ -0,0 +1,91 @@
+"""Scripted pydantic-ai model for offline benchmarks and tests.
+
+    from mock_model import ScriptedModel
+    model = ScriptedModel(["Charles Babbage"], latency=0.2)
+    agent = Agent(model)
+
+Responses are replayed from a script (or computed by a responder) with
+configurable latency and output-token counts, so agent runs, usage limits
+and retry loops can be exercised without OpenRouter calls.
+"""
+import asyncio
+import json
+import random
+from itertools import cycle
+
+from pydantic_ai.messages import ModelMessagesTypeAdapter, ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import AgentInfo, DeltaToolCall, FunctionModel
+from pydantic_ai.usage import RequestUsage
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+class ScriptedModel(FunctionModel):
+    """FunctionModel that replays scripted responses.
+
+    A script item is a string (text reply) or a dict ``{"tool": name, "args": {...}}``
+    (tool call). `responder(messages, info)` overrides the script when given.
+    Each request takes `latency` seconds with log-normal jitter plus
+    `token_latency` per output token; streamed replies are split on words.
+    """
+
+    def __init__(self, script=None, *, responder=None, latency: float = 0.05, jitter: float = 0.3,
+                 token_latency: float = 0.0, output_tokens=None, seed=None, model_name: str = "scripted"):
+        super().__init__(self._request, stream_function=self._stream, model_name=model_name)
+        self._script = cycle(script or ["OK"])
+        self._responder = responder
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.output_tokens = output_tokens  # (mean, stddev), or None to estimate from the text
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.tokens = 0
+
+    def _next(self, messages, info: AgentInfo):
+        if self._responder is not None:
+            return self._responder(messages, info)
+        return next(self._script)
+
+    def _count_output(self, item) -> int:
+        if self.output_tokens is not None:
+            mean, stddev = self.output_tokens
+            return max(1, int(self._random.gauss(mean, stddev)))
+        return estimate_tokens(item if isinstance(item, str) else str(item))
+
+    def _delay(self, output_tokens: int) -> float:
+        jitter = self._random.lognormvariate(0, self.jitter) if self.jitter else 1.0
+        return self.latency * jitter + self.token_latency * output_tokens
+
+    async def _request(self, messages, info: AgentInfo) -> ModelResponse:
+        item = self._next(messages, info)
+        output_tokens = self._count_output(item)
+        await asyncio.sleep(self._delay(output_tokens))
+        input_tokens = estimate_tokens(ModelMessagesTypeAdapter.dump_json(messages).decode())
+        self.calls += 1
+        self.tokens += input_tokens + output_tokens
+        if isinstance(item, str):
+            part = TextPart(item)
+        else:
+            part = ToolCallPart(item["tool"], item.get("args", {}))
+        return ModelResponse(parts=[part], usage=RequestUsage(input_tokens=input_tokens,
+                                                              output_tokens=output_tokens))
+
+    async def _stream(self, messages, info: AgentInfo):
+        item = self._next(messages, info)
+        output_tokens = self._count_output(item)
+        self.calls += 1
+        self.tokens += estimate_tokens(ModelMessagesTypeAdapter.dump_json(messages).decode()) + output_tokens
+        if not isinstance(item, str):
+            await asyncio.sleep(self._delay(output_tokens))
+            yield {0: DeltaToolCall(name=item["tool"], json_args=json.dumps(item.get("args", {})))}
+            return
+        await asyncio.sleep(self.latency)
+        words = item.split(" ")
+        per_word = (self._delay(output_tokens) - self.latency) / max(len(words), 1)
+        for i, word in enumerate(words):
+            await asyncio.sleep(max(per_word, 0))
+            yield word if i == 0 else " " + word
@@ -0,0 +1,214 @@
+"""Pre-flight token checks for pydantic-ai agent runs.
+
+`UsageLimits` is enforced on the usage the provider reports, i.e. after an
+oversized request has already been sent (and billed). The pre-flight check
+estimates request and response tokens locally before any network call:
+
+    from preflight import run_sync
+    result = run_sync(agent, 'What is a Sun?',
+                      usage_limits=UsageLimits(output_tokens_limit=200))
+
+- the response is capped by setting `max_tokens` to the output-token limit,
+  so the model stops instead of overrunning it;
+- a request whose estimate exceeds the input or total token limit is refused
+  with UsageLimitExceeded (on_exceed="refuse"), or downgraded by dropping the
+  oldest history and lowering `max_tokens` to what is left (on_exceed="downgrade").
+
+Tokens are counted with tiktoken when it and its encoding files are available,
+otherwise estimated as ~4 characters per token. Counts are cached per message
+part, so re-checking a growing conversation only tokenizes the new parts.
+"""
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+
+from pydantic_ai import UsageLimitExceeded
+from pydantic_ai.messages import ModelRequest, UserPromptPart
+
+# Chat-format overhead per message (role markers, separators)
+PER_MESSAGE_OVERHEAD = 4
+# Expected response size when neither max_tokens nor an output limit says otherwise
+DEFAULT_EXPECTED_OUTPUT = 256
+# Never lower max_tokens below this when downgrading
+MIN_OUTPUT_TOKENS = 16
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to the character estimate
+    tiktoken = None
+
+
+@lru_cache(maxsize=None)
+def _encoding(name: str = "o200k_base"):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception:
+        # Encoding files are downloaded on first use; offline, estimate instead
+        return None
+
+
+@lru_cache(maxsize=16384)
+def count_text(text: str) -> int:
+    """Tokens in `text` (cached: repeated history parts are only counted once)."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def _part_text(part) -> str:
+    for attr in ("content", "args"):
+        value = getattr(part, attr, None)
+        if value is None:
+            continue
+        if isinstance(value, str):
+            return value
+        return json.dumps(value, default=str, ensure_ascii=False)
+    return ""
+
+
+def count_message(message) -> int:
+    return PER_MESSAGE_OVERHEAD + sum(count_text(_part_text(part)) for part in message.parts)
+
+
+def count_messages(messages) -> int:
+    return sum(count_message(m) for m in messages)
+
+
+@dataclass
+class Preflight:
+    """Outcome of a pre-flight check: the (possibly trimmed) inputs to run with."""
+    message_history: list
+    model_settings: dict
+    input_tokens: int
+    output_tokens: int
+    dropped_messages: int = 0
+
+
+def _trim_history(history: list, excess: int) -> tuple:
+    """Drop the oldest exchanges until `excess` tokens are freed.
+
+    Cuts only before a user prompt so tool calls stay paired with their
+    results; system prompts in the first request are kept.
+    """
+    if not history:
+        return history, 0
+    first = history[0]
+    system_parts = [p for p in getattr(first, "parts", []) if p.part_kind == "system-prompt"]
+    # The system prompt is re-attached below, so dropping it frees nothing
+    freed = -count_message(ModelRequest(parts=system_parts)) if system_parts else 0
+    cut = 0
+    for i in range(1, len(history) + 1):
+        freed += count_message(history[i - 1])
+        at_boundary = i == len(history) or (
+            isinstance(history[i], ModelRequest)
+            and any(isinstance(p, UserPromptPart) for p in history[i].parts)
+        )
+        if at_boundary:
+            cut = i
+            if freed >= excess:
+                break
+    trimmed = history[cut:]
+    if system_parts and cut:
+        # Keep the system prompt by re-attaching it to a request of its own
+        trimmed = [ModelRequest(parts=system_parts)] + trimmed
+    return trimmed, cut
+
+
+def _prompt_tokens(history: list, system_tokens: int = None) -> int:
+    """Tokens of the system prompt and instructions sent with the next request.
+
+    With history, the system prompt is already a part of its first request
+    (and counted with the history); the instructions are resent with every
+    request, so the latest ones recorded in the history are counted.
+    pydantic-ai has no public accessor for an agent's prompts, so a run
+    without history counts `system_tokens` (0 if not given).
+    """
+    for message in reversed(history):
+        if isinstance(message, ModelRequest) and message.instructions:
+            return count_text(message.instructions)
+    return 0 if history else system_tokens or 0
+
+
+def check(agent, user_prompt: str, *, message_history=None, usage_limits=None, model_settings=None,
+          on_exceed: str = "refuse", expected_output_tokens: int = None, system_tokens: int = None) -> Preflight:
+    """Estimate a run's tokens and apply `usage_limits` before anything is sent.
+
+    Raises UsageLimitExceeded if the request cannot fit. The returned
+    Preflight carries the message history and model settings to run with.
+    `system_tokens` estimates the agent's system prompt and instructions for
+    a run without history (e.g. count_text(prompt)); with history they are
+    read from it.
+    """
+    if on_exceed not in ("refuse", "downgrade"):
+        raise ValueError("on_exceed must be 'refuse' or 'downgrade'")
+    history = list(message_history or [])
+    settings = {**(getattr(agent, "model_settings", None) or {}), **(model_settings or {})}
+
+    input_limit = getattr(usage_limits, "input_tokens_limit", None)
+    output_limit = getattr(usage_limits, "output_tokens_limit", None)
+    total_limit = getattr(usage_limits, "total_tokens_limit", None)
+
+    # Let the model stop at the output limit instead of failing after it
+    if output_limit is not None and settings.get("max_tokens", output_limit) >= output_limit:
+        settings["max_tokens"] = output_limit
+
+    fixed = count_text(user_prompt or "") + PER_MESSAGE_OVERHEAD + _prompt_tokens(history, system_tokens)
+    input_tokens = fixed + count_messages(history)
+    output_tokens = expected_output_tokens or settings.get("max_tokens") or DEFAULT_EXPECTED_OUTPUT
+
+    # Downgrading may shrink the response, down to MIN_OUTPUT_TOKENS
+    needed_output = min(output_tokens, MIN_OUTPUT_TOKENS) if on_exceed == "downgrade" else output_tokens
+
+    def over() -> int:
+        excess = 0
+        if input_limit is not None:
+            excess = max(excess, input_tokens - input_limit)
+        if total_limit is not None:
+            excess = max(excess, input_tokens + needed_output - total_limit)
+        return excess
+
+    dropped = 0
+    if over() > 0 and on_exceed == "downgrade" and history:
+        history, dropped = _trim_history(history, over())
+        input_tokens = fixed + count_messages(history)
+
+    if over() > 0:
+        raise UsageLimitExceeded(
+            f"Pre-flight: request needs ~{input_tokens} input + {output_tokens} output tokens, "
+            f"exceeding the limits (input={input_limit}, total={total_limit}); not sent"
+        )
+    if total_limit is not None and input_tokens + output_tokens > total_limit:
+        # Only reachable when downgrading: shrink the response to what is left
+        output_tokens = total_limit - input_tokens
+        settings["max_tokens"] = output_tokens
+    return Preflight(history, settings, input_tokens, output_tokens, dropped)
+
+
+def _prepare(agent, user_prompt, kwargs, on_exceed, expected_output_tokens, system_tokens):
+    result = check(agent, user_prompt, message_history=kwargs.get("message_history"),
+                   usage_limits=kwargs.get("usage_limits"), model_settings=kwargs.get("model_settings"),
+                   on_exceed=on_exceed, expected_output_tokens=expected_output_tokens,
+                   system_tokens=system_tokens)
+    if kwargs.get("message_history") is not None:
+        kwargs["message_history"] = result.message_history
+    kwargs["model_settings"] = result.model_settings
+    return kwargs
+
+
+async def run(agent, user_prompt, *, on_exceed: str = "refuse", expected_output_tokens: int = None,
+              system_tokens: int = None, **kwargs):
+    """`agent.run(...)` after a pre-flight check."""
+    kwargs = _prepare(agent, user_prompt, kwargs, on_exceed, expected_output_tokens, system_tokens)
+    return await agent.run(user_prompt, **kwargs)
+
+
+def run_sync(agent, user_prompt, *, on_exceed: str = "refuse", expected_output_tokens: int = None,
+             system_tokens: int = None, **kwargs):
+    """`agent.run_sync(...)` after a pre-flight check."""
+    kwargs = _prepare(agent, user_prompt, kwargs, on_exceed, expected_output_tokens, system_tokens)
+    return agent.run_sync(user_prompt, **kwargs)
@@ -0,0 +1,99 @@
+"""Stop a streamed agent run as soon as it crosses its output-token limit.
+
+`UsageLimits(output_tokens_limit=...)` is checked when the response is
+complete, so a runaway answer is generated, waited for and billed in full
+before the error. Here the run is streamed and output tokens are counted as
+they arrive; when the limit is crossed the stream is closed, which cancels
+the upstream HTTP response:
+
+    from stream_guard import run_stream_guarded
+    result = await run_stream_guarded(agent, 'What is a Sun?',
+                                      usage_limits=UsageLimits(output_tokens_limit=200))
+    # raises StreamLimitExceeded (a UsageLimitExceeded) carrying .partial_output
+
+    result = await run_stream_guarded(agent, 'What is a Sun?', output_tokens_limit=200,
+                                      on_limit="truncate")
+    result.output, result.truncated
+
+Applies to text output.
+"""
+import asyncio
+from contextlib import aclosing
+from dataclasses import dataclass
+
+from pydantic_ai import UsageLimitExceeded
+
+from preflight import count_text
+
+
+class StreamLimitExceeded(UsageLimitExceeded):
+    """Raised when a streamed response crosses its output-token limit; the stream is already closed."""
+
+    def __init__(self, limit: int, output_tokens: int, partial_output: str):
+        self.limit = limit
+        self.output_tokens = output_tokens
+        self.partial_output = partial_output
+        super().__init__(
+            f"Stopped the response stream at ~{output_tokens} output tokens "
+            f"(output_tokens_limit={limit}); {len(partial_output)} characters received"
+        )
+
+
+class _Abort(Exception):
+    pass
+
+
+@dataclass
+class GuardedResult:
+    output: str
+    truncated: bool
+    output_tokens: int  # counted locally while streaming
+    usage: object  # RunUsage as reported so far (providers often report usage only at the end)
+    messages: list
+
+
+async def run_stream_guarded(agent, user_prompt, *, output_tokens_limit: int = None, on_limit: str = "raise",
+                             **kwargs) -> GuardedResult:
+    """Stream `agent.run_stream(...)`, aborting once the output passes the limit.
+
+    The limit is `output_tokens_limit`, or else the output token limit of
+    `usage_limits`. `on_limit` is "raise" (StreamLimitExceeded with the
+    partial output) or "truncate" (return the partial output, truncated=True).
+    """
+    if on_limit not in ("raise", "truncate"):
+        raise ValueError("on_limit must be 'raise' or 'truncate'")
+    limit = output_tokens_limit or getattr(kwargs.get("usage_limits"), "output_tokens_limit", None)
+
+    chunks, tokens, truncated = [], 0, False
+    try:
+        async with agent.run_stream(user_prompt, **kwargs) as result:
+            try:
+                # aclosing: breaking out must close the text stream, not leave it to the loop teardown
+                async with aclosing(result.stream_text(delta=True, debounce_by=None)) as deltas:
+                    async for delta in deltas:
+                        chunks.append(delta)
+                        tokens += count_text(delta)
+                        if limit is not None and tokens > limit:
+                            truncated = True
+                            break
+            except UsageLimitExceeded:
+                # pydantic-ai's own check fired first (the provider reported usage mid-stream)
+                truncated = True
+            usage = result.usage()
+            messages = result.all_messages()
+            if truncated:
+                # Exiting run_stream() normally would drain the rest of the response;
+                # leaving with an exception closes the model stream and its HTTP response
+                raise _Abort
+    except _Abort:
+        pass
+
+    output = "".join(chunks)
+    if truncated and on_limit == "raise":
+        raise StreamLimitExceeded(limit, tokens, output)
+    return GuardedResult(output=output, truncated=truncated, output_tokens=tokens, usage=usage, messages=messages)
+
+
+def run_stream_guarded_sync(agent, user_prompt, **kwargs) -> GuardedResult:
+    """Blocking run_stream_guarded(), like `agent.run_sync` (use nest_asyncio in notebooks)."""
+    return asyncio.run(run_stream_guarded(agent, user_prompt, **kwargs))
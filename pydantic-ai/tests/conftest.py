@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The notebook imports its helper modules as top-level modules (run from pydantic-ai/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
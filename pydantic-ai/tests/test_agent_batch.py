@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from pydantic_ai import Agent, UsageLimitExceeded, UsageLimits
+
+from agent_batch import BatchUsage, run_batch, run_batch_sync
+from mock_model import ScriptedModel
+
+
+def echo_model():
+    def respond(messages, info):
+        return f"echo {messages[-1].parts[-1].content}"
+    return ScriptedModel(responder=respond, latency=0.01, jitter=0)
+
+
+def test_every_prompt_runs_once_within_the_concurrency_bound():
+    model = echo_model()
+    running, peak = 0, 0
+    request = model.function
+
+    async def counting(messages, info):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            return await request(messages, info)
+        finally:
+            running -= 1
+
+    model.function = counting
+    results, totals = run_batch_sync(Agent(model), [f"p{i}" for i in range(12)], concurrency=3)
+    assert sorted((r.index, r.output) for r in results) == [(i, f"echo p{i}") for i in range(12)]
+    assert peak == 3
+    assert totals.runs == 12 and totals.failed == 0 and totals.requests == 12
+    assert totals.output_tokens > 0 and totals.total_tokens == totals.input_tokens + totals.output_tokens
+
+
+def test_failed_runs_carry_the_error_and_their_usage():
+    def limits(prompt):
+        return UsageLimits(output_tokens_limit=10) if prompt == "long" else None
+
+    model = ScriptedModel(["a fairly long answer"], latency=0, jitter=0, output_tokens=(50, 0))
+    results, totals = run_batch_sync(Agent(model), ["short", "long"], usage_limits=limits)
+    by_prompt = {r.prompt: r for r in results}
+    assert by_prompt["short"].error is None
+    assert isinstance(by_prompt["long"].error, UsageLimitExceeded)
+    assert by_prompt["long"].usage.output_tokens == 50
+    assert totals.failed == 1 and totals.output_tokens == 100
+
+
+def test_prompts_are_pulled_lazily_and_a_failing_source_is_reraised():
+    pulled, seen = [], []
+
+    def prompts():
+        for i in range(4):
+            pulled.append(i)
+            yield f"p{i}"
+        raise OSError("prompt file went away")
+
+    async def main():
+        async for item in run_batch(Agent(echo_model()), prompts(), concurrency=2):
+            # Never more than `concurrency` prompts ahead of the results
+            assert len(pulled) <= len(seen) + 2
+            seen.append(item.index)
+
+    with pytest.raises(OSError, match="went away"):
+        asyncio.run(asyncio.wait_for(main(), timeout=5))
+    assert sorted(seen) == [0, 1, 2, 3]
+
+
+def test_stopping_early_cancels_the_runs_in_flight():
+    model = echo_model()
+
+    async def main():
+        async for item in run_batch(Agent(model), [f"p{i}" for i in range(10)], concurrency=4):
+            break
+        await asyncio.sleep(0.05)
+        return model.calls
+
+    assert asyncio.run(main()) <= 4
+
+
+def test_batch_usage_starts_empty():
+    totals = BatchUsage()
+    assert totals.runs == totals.failed == totals.total_tokens == 0
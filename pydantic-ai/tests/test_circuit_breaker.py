@@ -0,0 +1,82 @@
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+
+
+def test_opens_after_identical_failures(breaker):
+    assert breaker.record_failure("tool", "a", ValueError("boom")) is False
+    assert breaker.state("tool", "a") == CLOSED
+    # A different error restarts the count
+    assert breaker.record_failure("tool", "a", ValueError("other")) is False
+    assert breaker.record_failure("tool", "a", ValueError("other")) is True
+    assert breaker.state("tool", "a") == OPEN
+    assert breaker.state("tool", "b") == CLOSED
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("tool", "a")
+    assert breaker.stats["tripped"] == 1 and breaker.stats["short_circuited"] == 1
+
+
+def test_success_resets_the_count(breaker):
+    breaker.record_failure("tool", "a", ValueError("boom"))
+    breaker.record_success("tool", "a")
+    assert breaker.record_failure("tool", "a", ValueError("boom")) is False
+
+
+def test_half_open_probe_recovers(breaker, clock):
+    for _ in range(2):
+        breaker.record_failure("tool", "a", ValueError("boom"))
+    clock.now = 10
+    assert breaker.state("tool", "a") == HALF_OPEN
+    breaker.before_call("tool", "a")  # claims the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call("tool", "a")  # only one probe at a time
+    breaker.record_success("tool", "a")
+    assert breaker.state("tool", "a") == CLOSED
+    assert breaker.stats["recovered"] == 1
+
+
+def test_failed_probe_reopens(breaker, clock):
+    for _ in range(2):
+        breaker.record_failure("tool", "a", ValueError("boom"))
+    clock.now = 10
+    breaker.before_call("tool", "a")
+    assert breaker.record_failure("tool", "a", ValueError("boom")) is True
+    assert breaker.state("tool", "a") == OPEN
+    clock.now = 15
+    assert breaker.state("tool", "a") == OPEN
+
+
+def test_protect_stops_retrying(breaker):
+    calls = []
+
+    @breaker.protect
+    def flaky(city: str) -> str:
+        calls.append(city)
+        raise ValueError(f"no data for {city}")
+
+    with pytest.raises(ValueError):
+        flaky("Paris")
+    with pytest.raises(CircuitOpenError) as exc:
+        flaky("Paris")
+    assert exc.value.failures == 2
+    with pytest.raises(CircuitOpenError):
+        flaky(city="Paris")  # same arguments, so the tool does not run
+    assert calls == ["Paris", "Paris"]
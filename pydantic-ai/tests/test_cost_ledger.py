@@ -0,0 +1,57 @@
+import pytest
+from pydantic_ai import UsageLimits
+from pydantic_ai.usage import RunUsage
+
+from cost_ledger import Budget, BudgetExceeded, CostLedger, ModelPrice
+
+PRICES = {"test-model": ModelPrice(input_per_mtok=1.0, output_per_mtok=2.0)}
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return CostLedger(str(tmp_path / "costs.db"), prices=PRICES,
+                      budgets=[Budget("user", limit=0.001), Budget("global", limit=0.0015)])
+
+
+def test_max_cost_prices_only_limited_tokens(ledger):
+    assert ledger.max_cost("test-model") == 0.0
+    assert ledger.max_cost("test-model", UsageLimits(output_tokens_limit=100)) == pytest.approx(0.0002)
+    assert ledger.max_cost("test-model", UsageLimits(input_tokens_limit=100, output_tokens_limit=100)) == \
+        pytest.approx(0.0003)
+    # A total limit is priced at the dearer token kind
+    assert ledger.max_cost("test-model", UsageLimits(total_tokens_limit=100)) == pytest.approx(0.0002)
+
+
+def test_reservation_counts_until_settled(ledger):
+    charge = ledger.reserve(user="alice", model="test-model", amount=0.0008)
+    assert ledger.spent(scope="user", key="alice") == pytest.approx(0.0008)
+    # The in-flight reservation leaves no room for another one this size
+    with pytest.raises(BudgetExceeded):
+        ledger.reserve(user="alice", model="test-model", amount=0.0008)
+
+    cost = ledger.settle(charge, RunUsage(input_tokens=100, output_tokens=50, requests=1))
+    assert cost == pytest.approx(0.0002)
+    assert ledger.spent(scope="user", key="alice") == pytest.approx(0.0002)
+    assert ledger.report()[0]["runs"] == 1
+    ledger.reserve(user="alice", model="test-model", amount=0.0008)
+
+
+def test_budgets_are_per_user_and_global(ledger):
+    ledger.reserve(user="alice", model="test-model", amount=0.001)
+    with pytest.raises(BudgetExceeded) as exc:
+        ledger.reserve(user="alice", model="test-model")
+    assert exc.value.subject == "alice"
+    ledger.reserve(user="bob", model="test-model", amount=0.0005)
+    with pytest.raises(BudgetExceeded) as exc:
+        ledger.reserve(user="carol", model="test-model", amount=0.0001)
+    assert exc.value.budget.scope == "global"
+
+
+def test_charge_settles_failed_runs(ledger):
+    with pytest.raises(RuntimeError):
+        with ledger.charge(user="alice", model="test-model",
+                           usage_limits=UsageLimits(output_tokens_limit=100)) as usage:
+            usage.input_tokens, usage.output_tokens = 200, 0
+            raise RuntimeError("model failed")
+    assert ledger.spent(scope="user", key="alice") == pytest.approx(0.0002)
+    assert ledger.report()[0]["input_tokens"] == 200
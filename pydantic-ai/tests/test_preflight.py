@@ -0,0 +1,92 @@
+import pytest
+from pydantic_ai import Agent, UsageLimitExceeded, UsageLimits
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+import preflight
+from mock_model import ScriptedModel
+from preflight import PER_MESSAGE_OVERHEAD, check
+
+
+@pytest.fixture(autouse=True)
+def one_token_per_word(monkeypatch):
+    monkeypatch.setattr(preflight, "count_text", lambda text: len(text.split()))
+
+
+def words(n):
+    return " ".join(["word"] * n)
+
+
+def history(exchanges, size=10):
+    messages = []
+    for i in range(exchanges):
+        parts = [UserPromptPart(words(size))]
+        if i == 0:
+            parts.insert(0, SystemPromptPart("Be brief."))
+        messages += [ModelRequest(parts=parts), ModelResponse(parts=[TextPart(words(size))])]
+    return messages
+
+
+def agent():
+    return Agent(ScriptedModel(["ok"], latency=0))
+
+
+def test_output_limit_caps_max_tokens():
+    result = check(agent(), "hi there", usage_limits=UsageLimits(output_tokens_limit=50))
+    assert result.model_settings["max_tokens"] == 50
+    assert result.input_tokens == 2 + PER_MESSAGE_OVERHEAD
+
+
+def test_system_tokens_count_for_a_run_without_history():
+    result = check(agent(), "hi", system_tokens=30)
+    assert result.input_tokens == 1 + PER_MESSAGE_OVERHEAD + 30
+
+
+def test_refuses_an_oversized_request():
+    with pytest.raises(UsageLimitExceeded, match="not sent"):
+        check(agent(), words(100), usage_limits=UsageLimits(input_tokens_limit=50))
+
+
+def test_total_limit_includes_the_expected_output():
+    limits = UsageLimits(total_tokens_limit=100)
+    check(agent(), "hi", usage_limits=limits, expected_output_tokens=80)
+    with pytest.raises(UsageLimitExceeded):
+        check(agent(), "hi", usage_limits=limits, expected_output_tokens=100)
+
+
+def test_downgrade_drops_the_oldest_exchanges_and_keeps_the_system_prompt():
+    messages = history(4)
+    full = check(agent(), "next", message_history=messages).input_tokens
+    limit = full - 30  # one exchange frees 24 tokens net of the re-attached system prompt
+    result = check(agent(), "next", message_history=messages, on_exceed="downgrade",
+                   usage_limits=UsageLimits(input_tokens_limit=limit))
+    assert result.dropped_messages == 4
+    assert result.input_tokens <= limit
+    # The system prompt is re-attached in a request of its own, ahead of a user prompt
+    assert [p.part_kind for p in result.message_history[0].parts] == ["system-prompt"]
+    assert isinstance(result.message_history[1].parts[0], UserPromptPart)
+    assert len(result.message_history) == 1 + 4
+
+
+def test_downgrade_shrinks_the_response_to_what_is_left():
+    result = check(agent(), words(50), on_exceed="downgrade", expected_output_tokens=100,
+                   usage_limits=UsageLimits(total_tokens_limit=100))
+    assert result.output_tokens == result.model_settings["max_tokens"] == 100 - result.input_tokens
+
+
+def test_run_sync_sends_the_checked_settings():
+    model = ScriptedModel(["ok"], latency=0)
+    result = preflight.run_sync(Agent(model), "hi", usage_limits=UsageLimits(output_tokens_limit=20))
+    assert result.output == "ok" and model.calls == 1
+    with pytest.raises(UsageLimitExceeded):
+        preflight.run_sync(Agent(model), words(100), usage_limits=UsageLimits(input_tokens_limit=10))
+    assert model.calls == 1
+
+
+def test_instructions_are_read_from_the_history():
+    messages = history(1)
+    messages[0].instructions = "Answer in French please"
+    with_instructions = check(agent(), "hi", message_history=messages, system_tokens=1000).input_tokens
+    messages[0].instructions = None
+    without = check(agent(), "hi", message_history=messages, system_tokens=1000).input_tokens
+    # system_tokens only stands in for a run without history
+    assert with_instructions - without == 4
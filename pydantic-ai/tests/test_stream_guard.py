@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from pydantic_ai import Agent, UsageLimits
+
+import stream_guard
+from mock_model import ScriptedModel
+from stream_guard import StreamLimitExceeded, run_stream_guarded
+
+REPLY = "one two three four five six seven eight"  # 8 words
+
+
+@pytest.fixture(autouse=True)
+def one_token_per_word(monkeypatch):
+    monkeypatch.setattr(stream_guard, "count_text", lambda text: len(text.split()))
+
+
+def run(limit, **kwargs):
+    agent = Agent(ScriptedModel([REPLY], latency=0, jitter=0))
+    return asyncio.run(run_stream_guarded(agent, "Count to eight", output_tokens_limit=limit, **kwargs))
+
+
+def test_under_the_limit():
+    result = run(9)
+    assert result.output == REPLY
+    assert not result.truncated and result.output_tokens == 8
+
+
+def test_exactly_at_the_limit():
+    result = run(8)
+    assert result.output == REPLY
+    assert not result.truncated
+
+
+def test_over_the_limit_raises_with_the_partial_output():
+    with pytest.raises(StreamLimitExceeded) as exc:
+        run(7)
+    assert exc.value.limit == 7 and exc.value.output_tokens == 8
+    assert exc.value.partial_output == REPLY
+
+
+def test_over_the_limit_stops_the_stream():
+    result = run(3, on_limit="truncate")
+    assert result.truncated
+    assert result.output == "one two three four"
+
+
+def test_limit_from_usage_limits():
+    agent = Agent(ScriptedModel([REPLY], latency=0, jitter=0))
+    result = asyncio.run(run_stream_guarded(agent, "Count", usage_limits=UsageLimits(output_tokens_limit=4),
+                                            on_limit="truncate"))
+    assert result.truncated and result.output_tokens == 5